@@ -1,11 +1,20 @@
-import io, json
-from copy import deepcopy
+import io, os, json
 
-import pandas as pd
+import numpy as np
 import streamlit as st
 
-# Import simulator without triggering __main__
+# Import simulator without triggering __main__. pandas (~0.5 s) is imported where a
+# frame is built and the service client (asyncio) only when OB_STR_SERVICE is set, so
+# the first page renders before either is loaded.
 import runner.run_suite_full_V23 as simmod
+import runner.cache_V23 as rcache
+import runner.probe_V23 as rprobe
+import runner.branch_V23 as rbranch
+import runner.overrides_V23 as roverrides
+import runner.montecarlo_V23 as rmc
+import runner.view_V23 as rview
+import runner.analytics_V23 as ranalytics
+from runner.sweep_V23 import get_path
 
 st.set_page_config(page_title="OB STR – MVP Runner (V2_3)", layout="wide")
 
@@ -56,8 +65,9 @@ else:
 if not load_ok:
     st.stop()
 
-# Work on a mutable copy
-e = deepcopy(engine_obj)
+# Edits are collected as {dotted path: value} and layered over the loaded engine
+# (overrides_V23.Overlay); nothing below copies or mutates engine_obj.
+edits = {}
 
 # ============ Editable constants UI ============
 st.divider()
@@ -66,12 +76,10 @@ st.subheader("Edit engine constants")
 def numeric_editor_dict(section_name: str, d: dict, help_map=None):
     """
     Render number inputs for numeric leaf fields in dict d.
-    Returns updated dict.
+    Changed values are recorded in ``edits`` under their dotted path.
     """
     if help_map is None:
         help_map = {}
-    changed = False
-    out = deepcopy(d)
     for k, v in d.items():
         key_label = f"{section_name}.{k}"
         if isinstance(v, (int, float)):
@@ -88,20 +96,18 @@ def numeric_editor_dict(section_name: str, d: dict, help_map=None):
                 help=help_map.get(k, None)
             )
             if new_v != v:
-                out[k] = float(new_v)
-                changed = True
+                edits[key_label] = float(new_v)
         elif isinstance(v, dict):
             with st.expander(f"{key_label} (nested)", expanded=False):
-                out[k] = numeric_editor_dict(f"{section_name}.{k}", v, help_map=help_map.get(k, {}))
+                numeric_editor_dict(f"{section_name}.{k}", v, help_map=help_map.get(k, {}))
         else:
             # Non-numeric leaves are shown but not edited here
             st.text(f"{key_label}: {v}")
-    return out
 
 # Known editable sections (present in your engine)
 sections = []
 for name in ["constants","calendar","banking","market","portfolio"]:
-    if name in e:
+    if name in engine_obj:
         sections.append(name)
 
 colA, colB = st.columns(2, gap="large")
@@ -155,44 +161,55 @@ HELP = {
 }
 
 # constants sub-sections laid out nicely
-if "constants" in e:
+if "constants" in engine_obj:
     st.markdown("### constants")
-    c = e["constants"]
+    c = engine_obj["constants"]
     subcols = st.columns(2, gap="large")
 
     with subcols[0]:
         if "financial" in c:
             st.markdown("**constants.financial**")
-            c["financial"] = numeric_editor_dict("constants.financial", c["financial"], HELP["constants"].get("financial", {}))
+            numeric_editor_dict("constants.financial", c["financial"], HELP["constants"].get("financial", {}))
         if "operations" in c:
             st.markdown("**constants.operations**")
-            c["operations"] = numeric_editor_dict("constants.operations", c["operations"], HELP["constants"].get("operations", {}))
+            numeric_editor_dict("constants.operations", c["operations"], HELP["constants"].get("operations", {}))
 
     with subcols[1]:
         if "acquisition" in c:
             st.markdown("**constants.acquisition**")
-            c["acquisition"] = numeric_editor_dict("constants.acquisition", c["acquisition"], HELP["constants"].get("acquisition", {}))
+            numeric_editor_dict("constants.acquisition", c["acquisition"], HELP["constants"].get("acquisition", {}))
         if "debt" in c:
             st.markdown("**constants.debt**")
-            c["debt"] = numeric_editor_dict("constants.debt", c["debt"], HELP["constants"].get("debt", {}))
+            numeric_editor_dict("constants.debt", c["debt"], HELP["constants"].get("debt", {}))
         if "reserves" in c:
             st.markdown("**constants.reserves**")
-            c["reserves"] = numeric_editor_dict("constants.reserves", c["reserves"], HELP["constants"].get("reserves", {}))
+            numeric_editor_dict("constants.reserves", c["reserves"], HELP["constants"].get("reserves", {}))
+
+    # banking / market / portfolio / reserveYields / savings live here in the V2_3 engine
+    # (a top-level section of the same name, edited below, overrides them key by key)
+    nested = [name for name in ["banking", "market", "portfolio", "reserveYields", "savings"] if name in c]
+    for i, name in enumerate(nested):
+        with subcols[i % 2]:
+            st.markdown(f"**constants.{name}**")
+            numeric_editor_dict(f"constants.{name}", c[name], HELP.get(name, {}))
 
 # banking / market / portfolio
 st.markdown("### other sections")
 two = st.columns(2, gap="large")
 with two[0]:
-    if "banking" in e:
+    if "banking" in engine_obj:
         st.markdown("**banking**")
-        e["banking"] = numeric_editor_dict("banking", e["banking"], HELP.get("banking", {}))
-    if "market" in e:
+        numeric_editor_dict("banking", engine_obj["banking"], HELP.get("banking", {}))
+    if "market" in engine_obj:
         st.markdown("**market**")
-        e["market"] = numeric_editor_dict("market", e["market"], HELP.get("market", {}))
+        numeric_editor_dict("market", engine_obj["market"], HELP.get("market", {}))
 with two[1]:
-    if "portfolio" in e:
+    if "portfolio" in engine_obj:
         st.markdown("**portfolio**")
-        e["portfolio"] = numeric_editor_dict("portfolio", e["portfolio"], HELP.get("portfolio", {}))
+        numeric_editor_dict("portfolio", engine_obj["portfolio"], HELP.get("portfolio", {}))
+
+overlay = roverrides.Overlay(engine_obj, edits)
+e = overlay.materialize()  # shares every untouched section with engine_obj
 
 st.divider()
 
@@ -204,80 +221,222 @@ with rcol1:
 with rcol2:
     # Your simulate currently stops only via mmax; readiness stop handled internally in V2_3.
     stop_note = st.caption("Readiness stop is enforced inside your simulator when present.")
+with rcol3:
+    diag = st.checkbox("Collect diagnostics", value=False,
+                       help="Re-run once with per-phase timers and counters (the cached run is not timed).")
 
 run_btn = st.button("▶ Run with edited constants", type="primary")
 
 # ============ Run + Show ============
-monthly_df_slot = st.empty()
-yoy_df_slot = st.empty()
 dl_cols = st.columns(2)
 
-def rollup_yoy(rows):
-    if not rows:
-        return pd.DataFrame()
-
-    df = pd.DataFrame(rows)
-    df["_Year"] = df["YYYY-MM"].str.extract(r"Y(\d+)-", expand=False).astype(int)
-
-    # fields to take the last value of within the year
-    snapshot_fields = ["End Cash", "Loan Balance (End)", "Units Owned"]   # <- include Units Owned
-
-    # sum everything numeric except helper + snapshot fields
-    sum_cols = df.select_dtypes(include=["number"]).columns.tolist()
-    for c in ["_Year"] + snapshot_fields:
-        if c in sum_cols:
-            sum_cols.remove(c)
-
-    agg = df.groupby("_Year")[sum_cols].sum()
-    last_vals = (
-        df.sort_values(["_Year", "YYYY-MM"])
-          .groupby("_Year")[snapshot_fields]
-          .last()
-    )
-
-    out = pd.concat([agg, last_vals], axis=1).reset_index()
-    out.insert(0, "YYYY-MM", out["_Year"].apply(lambda y: f"Year {y}"))
-    out.insert(1, "UnitID", "TOTAL")
-    out.drop(columns=["_Year"], inplace=True)
-
-    # Optional: ensure Units Owned is int
-    if "Units Owned" in out.columns:
-        out["Units Owned"] = out["Units Owned"].astype(int)
-
-    # Column order (put Units Owned near the front)
-    monthly_cols = list(rows[0].keys())
-    preferred = ["YYYY-MM", "UnitID", "Units Owned"]
-    order = preferred + [c for c in monthly_cols if c not in preferred]
-    out = out.reindex(columns=[c for c in order if c in out.columns])
+def numeric_paths(d, prefix=""):
+    """Dotted paths of every numeric leaf in d."""
+    out = []
+    for k, v in d.items():
+        p = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out += numeric_paths(v, p + ".")
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out.append(p)
     return out
 
+# ============ Memoized results ============
+# Keyed by the edited engine's content hash + max months. st.cache_data is shared by
+# every session on this server; cached_simulate adds the on-disk cache underneath, so
+# flipping an input back to a value already run (by anyone) is instant. With
+# OB_STR_SERVICE=host:port set, runs go to that service's warm workers instead (and fall
+# back to running here if it is not reachable).
+@st.cache_data(max_entries=64, show_spinner=False)
+def run_cached(engine_key: str, mmax: int, _engine: dict):
+    if os.getenv("OB_STR_SERVICE"):
+        import runner.service_V23 as rservice
+        try:
+            rows, _ = rservice.run_remote({"engine": _engine, "months": mmax})
+            return rows
+        except OSError:
+            pass
+    rows, _ = rcache.cached_simulate(_engine, mmax)
+    return rows
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def monthly_frame(engine_key: str, mmax: int, _rows):
+    import pandas as pd
+    return pd.DataFrame(_rows)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def yoy_frame(engine_key: str, mmax: int, period: str, _rows):
+    # runner/view_V23.py: analytics rollup (flows summed, Starting Cash first month,
+    # snapshots last month) with Units Owned near the front
+    return rview.rollup_frame(_rows, period)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def invariant_report(engine_key: str, mmax: int, _rows):
+    return ranalytics.check_invariants(_rows)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def profile_report(engine_key: str, mmax: int, _engine: dict):
+    probe = rprobe.Probe()
+    for _ in simmod.iter_simulate(_engine, mmax, probe=probe):
+        pass
+    return probe.report()
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def csv_bytes(engine_key: str, mmax: int, which: str, _df):
+    buf = io.StringIO()
+    _df.to_csv(buf, index=False)
+    return buf.getvalue()
+
+# Only what is on screen goes to the browser: tables as column-pruned Arrow (one year of
+# months at a time unless "All" is picked), charts thinned to ~CHART_POINTS per series.
+VIEW_COLUMNS = ["YYYY-MM", "Units Owned", "Starting Cash", "Gross Revenue", "Ops Net",
+                "Debt Service (Total)", "Feeder Prepay", "Purchase Out (Total)", "Loan Balance (End)", "End Cash"]
+CHART_COLUMNS = ["End Cash", "Loan Balance (End)", "Units Owned"]
+MAX_PINNED = 12
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def table_view(engine_key: str, mmax: int, which: str, columns: tuple, year, _df):
+    return rview.arrow_table(_df, list(columns), year)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def mc_bands(engine_key: str, mmax: int, n_paths: int, seed: int, spec_json: str, _engine: dict):
+    mc = rmc.run_montecarlo(_engine, n_paths, mmax=mmax, seed=seed, spec=json.loads(spec_json), workers=1)
+    return rmc.bands(mc)
+
+engine_key = rcache.engine_hash(e)
+run_key = f"{engine_key}:{int(max_months)}"
+ran = st.session_state.setdefault("ran_keys", set())
 if run_btn:
+    ran.add(run_key)
+elif ran and run_key not in ran:
+    st.info("Inputs changed since the last run — click Run to simulate them.")
+
+if run_key in ran:
     try:
-        # Respect max months
-        simmod.MAX_MONTHS = int(max_months)
-        rows = simmod.simulate(e, mmax=int(max_months))
+        rows = run_cached(engine_key, int(max_months), e)
 
         if not rows:
             st.warning("Simulation returned no rows.")
         else:
-            monthly_df = pd.DataFrame(rows)
-            yoy_df = rollup_yoy(rows)
+            mmax_i = int(max_months)
+            monthly_df = monthly_frame(engine_key, mmax_i, rows)
+            period = st.radio("Roll up by", ["year", "quarter"], horizontal=True, format_func=str.title)
+            yoy_df = yoy_frame(engine_key, mmax_i, period, rows)
+
+            all_cols = list(monthly_df.columns)
+            view_cols = st.multiselect("Columns shown", all_cols, default=[c for c in VIEW_COLUMNS if c in all_cols])
+            view_cols = tuple(["YYYY-MM"] + [c for c in view_cols if c != "YYYY-MM"])
+
+            st.subheader("Year-over-Year (rolled up)" if period == "year" else "Quarterly (rolled up)")
+            st.dataframe(table_view(engine_key, mmax_i, period, view_cols, None, yoy_df),
+                         use_container_width=True, height=360)
+            failed = {k: r for k, r in invariant_report(engine_key, mmax_i, rows).items() if not r["ok"]}
+            for k, r in failed.items():
+                shown = ", ".join(r["months"][:12]) + (" …" if r["n"] > 12 else "")
+                st.warning(f"{k} failed" + (f" in {r['n']} month(s): {shown}" if r["months"] else ""))
 
             st.subheader("Monthly timeline")
-            monthly_df_slot.dataframe(monthly_df, use_container_width=True, height=430)
-
-            st.subheader("Year-over-Year (rolled up)")
-            yoy_df_slot.dataframe(yoy_df, use_container_width=True, height=360)
+            n_years = (len(rows) + 11)//12
+            year_pick = st.selectbox("Months of year", ["All"] + list(range(1, n_years + 1)), index=1 if n_years else 0,
+                                     help="Drill into one year; 'All' sends every month to the browser.")
+            st.dataframe(table_view(engine_key, mmax_i, "monthly", view_cols,
+                                    None if year_pick == "All" else year_pick, monthly_df),
+                         use_container_width=True, height=430)
+
+            chart_cols = st.multiselect("Chart", [c for c in all_cols if c not in ("YYYY-MM", "UnitID")],
+                                        default=CHART_COLUMNS[:2])
+            if chart_cols:
+                st.line_chart(rview.chart_frame({c: monthly_df[c].to_numpy() for c in chart_cols}))
+
+            # ---- scenario overlay: pin runs, then plot one column across all of them ----
+            pinned = st.session_state.setdefault("pinned_runs", {})
+            pc = st.columns([2, 1, 1])
+            pin_label = pc[0].text_input("Scenario name", value=f"Run {len(pinned) + 1}")
+            if pc[1].button("📌 Pin this run"):
+                pinned[pin_label] = (engine_key, mmax_i, e)
+                while len(pinned) > MAX_PINNED:
+                    pinned.pop(next(iter(pinned)))
+            if pinned and pc[2].button("Clear pinned"):
+                pinned.clear()
+            if pinned:
+                cmp_col = st.selectbox("Compare scenarios on", CHART_COLUMNS +
+                                       [c for c in all_cols if c not in CHART_COLUMNS + ["YYYY-MM", "UnitID"]])
+                series = {"Current": monthly_df[cmp_col].to_numpy()}
+                for label, (k, mm, eng) in pinned.items():
+                    series[label] = monthly_frame(k, mm, run_cached(k, mm, eng))[cmp_col].to_numpy()
+                T = max(len(v) for v in series.values())
+                series = {k: np.pad(v.astype(float), (0, T - len(v)), constant_values=np.nan) for k, v in series.items()}
+                st.line_chart(rview.chart_frame(series))
+
+            with st.expander("Monte Carlo bands", expanded=False):
+                # Seeded ADR / occupancy / appreciation paths (runner/montecarlo_V23.py); only
+                # the percentile bands (T values each) reach the browser, never the paths.
+                mc_cols = st.columns(5)
+                mc_paths = mc_cols[0].number_input("Paths", 100, 20000, value=1000, step=100)
+                mc_seed = mc_cols[1].number_input("Seed", 0, 2**31 - 1, value=7, step=1)
+                adr_vol = mc_cols[2].number_input("ADR vol (annual)", 0.0, 1.0, value=0.10, step=0.01)
+                occ_vol = mc_cols[3].number_input("Occupancy vol", 0.0, 1.0, value=0.05, step=0.01)
+                app_vol = mc_cols[4].number_input("Appreciation vol", 0.0, 1.0, value=0.05, step=0.01)
+                mc_col = st.selectbox("Band column", rmc.KPI_COLUMNS)
+                spec = dict(e.get("stochastic") or {
+                    "adr": {"model": "gbm", "drift": 0.0, "vol": adr_vol},
+                    "occupancy": {"model": "ou", "reversion": 2.0, "vol": occ_vol, "min": 0.0, "max": 1.0},
+                    "appreciation": {"model": "gbm", "vol": app_vol}})
+                mc_key = (engine_key, mmax_i, int(mc_paths), int(mc_seed), json.dumps(spec, sort_keys=True))
+                mc_ran = st.session_state.setdefault("mc_ran", set())
+                if st.button("Run Monte Carlo"):
+                    mc_ran.add(mc_key)
+                if mc_key in mc_ran:
+                    bd = mc_bands(*mc_key, e)[mc_col]
+                    st.line_chart(rview.chart_frame({**bd, "This run": monthly_df[mc_col].to_numpy()}))
+                    st.caption(f"{int(mc_paths):,} paths, seed {int(mc_seed)}; "
+                               f"{'engine stochastic section' if e.get('stochastic') else 'volatilities above'}.")
 
             with dl_cols[0]:
-                buf = io.StringIO()
-                monthly_df.to_csv(buf, index=False)
-                st.download_button("⬇ Download Monthly CSV", buf.getvalue(), "V2_3_Monthly.csv", "text/csv")
+                st.download_button("⬇ Download Monthly CSV", csv_bytes(engine_key, int(max_months), "monthly", monthly_df),
+                                   "V2_3_Monthly.csv", "text/csv")
 
             with dl_cols[1]:
-                buf2 = io.StringIO()
-                yoy_df.to_csv(buf2, index=False)
-                st.download_button("⬇ Download YoY CSV", buf2.getvalue(), "V2_3_YearOverYear.csv", "text/csv")
+                st.download_button("⬇ Download YoY CSV" if period == "year" else "⬇ Download Quarterly CSV",
+                                   csv_bytes(engine_key, int(max_months), period, yoy_df),
+                                   "V2_3_YearOverYear.csv" if period == "year" else "V2_3_Quarterly.csv", "text/csv")
+
+            if diag:
+                import pandas as pd
+                rep = profile_report(engine_key, int(max_months), e)
+                with st.expander("Diagnostics", expanded=True):
+                    m1, m2, m3, m4 = st.columns(4)
+                    m1.metric("Simulate", f"{rep['total_seconds']*1e3:.1f} ms")
+                    m2.metric("Rows / s", f"{rep['rows_per_second'] or 0:,.0f}")
+                    m3.metric("Purchases", rep["counters"].get("purchases", 0))
+                    m4.metric("Prepays", rep["counters"].get("prepays", 0))
+                    st.dataframe(pd.DataFrame([{"Phase": k, "Seconds": v["seconds"], "Calls": v["calls"], "Share": v["share"]}
+                                               for k, v in rep["timers"].items()]),
+                                 use_container_width=True, hide_index=True)
+                    st.json(rep["counters"])
+                    st.download_button("⬇ Download diagnostics JSON", json.dumps(rep, indent=2),
+                                       "V2_3_Profile.json", "application/json")
+
+            with st.expander("What-if from a later month", expanded=False):
+                # Branches resume from a stored mid-run state instead of month 1
+                # (see runner/branch_V23.py); the cache lives for this session.
+                fcache = st.session_state.setdefault("fork_cache", rbranch.ForkCache(max_states=512))
+                paths = numeric_paths(e)
+                wc = st.columns(3)
+                w_path = wc[0].selectbox("Engine value", paths,
+                                         index=paths.index("constants.debt.mortgageRate") if "constants.debt.mortgageRate" in paths else 0)
+                w_month = wc[1].number_input("From month", 2, max(2, int(max_months)), value=min(85, max(2, int(max_months))), step=1)
+                w_val = wc[2].number_input("New value", value=float(get_path(e, w_path)), format="%.6g")
+                if st.button("Run what-if"):
+                    v = int(w_val) if isinstance(get_path(e, w_path), int) else float(w_val)
+                    base_rows = fcache.run(e, [], int(max_months), snaps=[int(w_month)])
+                    what_rows = fcache.run(e, [(int(w_month), {w_path: v})], int(max_months))
+                    for col in CHART_COLUMNS:
+                        st.caption(col)
+                        st.line_chart(rview.chart_frame({"Base": [r[col] for r in base_rows],
+                                                         "What-if": [r[col] for r in what_rows]}))
+                    st.caption(f"Months simulated this session: {fcache.months_simulated} "
+                               f"(reused from stored states: {fcache.months_reused}).")
 
             st.success("Run complete.")
     except AssertionError as ae:
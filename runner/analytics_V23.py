@@ -0,0 +1,223 @@
+# analytics_V23.py — period rollups and T-* invariants as whole-array operations
+#
+#   yoy = rollup(rows)                                   # {column: array}, one entry per year
+#   q = rollup(simmod.simulate(e, columnar=True), "quarter")
+#   write_csv(yoy, "runner/V2_3_YearOverYear.csv")
+#   rep = check_invariants(rows, tol=1)                  # {check id: {"ok", "months", "off", "n"}}
+#   assert_invariants(rows)                              # {"T-DS-1": "PASS", ...} or AssertionError
+#   st = InvariantState(); st.add(chunk); ...; st.report()   # the same checks, chunk by chunk
+#
+# Used by the CLI (through sinks_V23), the app and the sweeps, so the YoY numbers and the
+# checks are defined once. Months are grouped into contiguous segments (a year or a
+# quarter of the "Yy-mm" labels); each column is reduced with one numpy call per segment
+# kind: flows are summed in integer cents (np.add.reduceat, exact like the old Decimal
+# sums), opening balances take the first month and closing snapshots the last month.
+
+import csv
+from pathlib import Path
+
+import numpy as np
+
+PERIODS = {"year": 12, "quarter": 3}
+LABEL_COLUMNS = ["YYYY-MM", "UnitID"]
+FIRST_COLUMNS = ["Starting Cash"]                                 # opening balance of the period
+LAST_COLUMNS = ["Loan Balance (End)", "End Cash", "Units Owned"]  # closing snapshots
+
+# -------- inputs --------
+def as_columns(data):
+    """(labels, {column: array}) from simulate() rows, a ColumnarResult or a column dict.
+
+    Row values are the rounded ledger figures; a ColumnarResult is rounded the same way.
+    """
+    if hasattr(data, "rounded"):  # run_suite_full_V23.ColumnarResult
+        cols = data.rounded()
+        return list(data.labels), {c: v for c, v in cols.items() if c not in LABEL_COLUMNS}
+    if isinstance(data, dict):
+        return list(data["YYYY-MM"]), {c: np.asarray(v) for c, v in data.items() if c not in LABEL_COLUMNS}
+    rows = list(data)
+    if not rows:
+        return [], {}
+    labels = [r["YYYY-MM"] for r in rows]
+    return labels, {c: np.asarray([r[c] for r in rows]) for c in rows[0] if c not in LABEL_COLUMNS}
+
+def to_cents(a):
+    """Rounded money values -> int64 cents (x*100 is within an ulp of the integer)."""
+    a = np.asarray(a)
+    if a.dtype.kind in "iu":
+        return a.astype(np.int64)*100
+    return np.rint(a*100).astype(np.int64)
+
+def month_numbers(labels):
+    """1-based month index of each "Yy-mm" label."""
+    return np.array([(int(s[1:s.index("-")]) - 1)*12 + int(s[-2:]) for s in labels], dtype=np.int64)
+
+# -------- segments --------
+def period_key(label, period="year"):
+    """Period number (0-based) of one "Yy-mm" label, for streaming consumers."""
+    return ((int(label[1:label.index("-")]) - 1)*12 + int(label[-2:]) - 1)//PERIODS[period]
+
+def segments(months, period="year"):
+    """(starts, names) for the contiguous runs of ``months`` (1-based) in each period."""
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {sorted(PERIODS)} (got {period!r})")
+    months = np.asarray(months, dtype=np.int64)
+    if not len(months):
+        return np.zeros(0, dtype=np.int64), []
+    key = (months - 1)//PERIODS[period]
+    starts = np.flatnonzero(np.concatenate([[True], key[1:] != key[:-1]]))
+    if period == "year":
+        names = [f"Year {k + 1}" for k in key[starts].tolist()]
+    else:
+        names = [f"Year {k//4 + 1} Q{k%4 + 1}" for k in key[starts].tolist()]
+    return starts, names
+
+def month_segments(mmax, period="year"):
+    """segments() for months 1..mmax (batch / sweep arrays carry no labels)."""
+    return segments(np.arange(1, mmax + 1), period)
+
+def reduce_segments(a, starts, how, axis=-1):
+    """Per-segment "sum", "first" or "last" of ``a`` along ``axis``."""
+    a = np.asarray(a)
+    if how == "sum":
+        return np.add.reduceat(a, starts, axis=axis)
+    n = a.shape[axis]
+    idx = starts if how == "first" else np.concatenate([starts[1:] - 1, [n - 1]]).astype(np.int64)
+    return np.take(a, idx, axis=axis)
+
+# -------- rollups --------
+def rollup(data, period="year"):
+    """Period rollup of a run as {column: array} in the input's column order:
+    "YYYY-MM" holds "Year N" (or "Year N Qk"), UnitID is "TOTAL", flows are summed,
+    Starting Cash is the period's first month and the closing snapshots its last."""
+    labels, cols = as_columns(data)
+    starts, names = segments(month_numbers(labels), period)
+    out = {"YYYY-MM": np.array(names, dtype=object), "UnitID": np.full(len(names), "TOTAL", dtype=object)}
+    for c, a in cols.items():
+        if c in FIRST_COLUMNS:
+            out[c] = reduce_segments(a, starts, "first")
+        elif c in LAST_COLUMNS:
+            out[c] = reduce_segments(a, starts, "last")
+        else:
+            out[c] = reduce_segments(to_cents(a), starts, "sum")/100
+    return out
+
+def table_rows(table):
+    """{column: array} -> list of row dicts with plain Python values."""
+    cols = {c: np.asarray(v).tolist() for c, v in table.items()}
+    return [dict(zip(cols, vals)) for vals in zip(*cols.values())]
+
+def write_csv(table, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=list(table))
+        w.writeheader()
+        w.writerows(table_rows(table))
+    return str(path)
+
+# -------- T-* invariants --------
+INVARIANTS = ["T-DS-1", "T-AMORT-1", "T-CASH-1"]
+DS_MONTHS_KEPT = 12  # T-DS-1 lists this many of its months; "n" counts them all
+
+def check_invariants(data, tol=1):
+    """{check id: {"ok": bool, "months": [labels], "off": [cents], "n": int}} for every
+    T-* check; "n" is the number of months behind "months".
+
+    T-DS-1     debt service > 0 in some month after a purchase ("months": the first
+               DS_MONTHS_KEPT post-purchase months, all with DS == 0, when it fails)
+    T-AMORT-1  prev_end - principal - feeder + new_loan + refi_draw == curr_end
+    T-CASH-1   End = Start + Savings + Yield + Ops Net + Refi Draw - Refi Costs
+               - Feeder - Purchase
+    Identities are evaluated in integer cents with ``tol`` cents of slack (0 for the
+    exact-cents ledger); "off" is each violating month's discrepancy.
+    """
+    st = InvariantState(tol)
+    st.add(data)
+    return st.report()
+
+class InvariantState:
+    """check_invariants() over a run fed in consecutive chunks of months.
+
+    Between chunks only the previous month's Loan Balance (End) in cents, whether a
+    purchase has happened yet, the violating months and a count plus the first
+    DS_MONTHS_KEPT months of T-DS-1's are kept, so memory does not grow with the
+    horizon (streaming sinks flush a chunk at a time).
+    """
+
+    def __init__(self, tol=1):
+        self.tol = tol
+        self.n = 0
+        self.prev_lb = None   # last month's Loan Balance (End), cents
+        self.bought = False   # a purchase in an earlier chunk
+        self.ds_ok = False
+        self.ds_months = []   # first post-purchase months with DS == 0, until DS > 0 shows up
+        self.ds_n = 0         # all of them
+        self.bad = {"T-AMORT-1": ([], []), "T-CASH-1": ([], [])}
+
+    def add(self, data):
+        """Check the next months (rows, a ColumnarResult or a column dict)."""
+        if hasattr(data, "cents"):  # ColumnarResult: skip the rounded float round-trip
+            labels, c = list(data.labels), data.cents()
+        else:
+            labels, cols = as_columns(data)
+            c = {k: to_cents(cols[k]) for k in cols if k != "Units Owned"}
+        if not labels:
+            return
+        labels = np.array(labels, dtype=object)
+        for k in ("Yield Income", "Refi Draw", "Refi Costs"):  # rows written before refis existed
+            if k not in c: c[k] = np.zeros(len(labels), dtype=np.int64)
+
+        bought = c["Purchase Out (Total)"] > 0
+        after = (np.maximum.accumulate(bought) | self.bought) & ~bought
+        if not self.ds_ok:
+            if (after & (c["Debt Service (Total)"] > 0)).any():
+                self.ds_ok = True; self.ds_months = []; self.ds_n = 0
+            else:
+                idle = labels[after]
+                self.ds_months += idle[:DS_MONTHS_KEPT - len(self.ds_months)].tolist()
+                self.ds_n += len(idle)
+        self.bought = self.bought or bool(bought.any())
+
+        lb = c["Loan Balance (End)"]
+        k = 1 if self.prev_lb is None else 0  # the first month has no previous balance
+        prev = lb[:-1] if k else np.concatenate([[self.prev_lb], lb[:-1]])
+        amort = (prev - c["Scheduled Principal"][k:] - c["Feeder Prepay"][k:] + c["New Loan Principal"][k:]
+                 + c["Refi Draw"][k:] - lb[k:])
+        self._keep("T-AMORT-1", labels[k:], amort)
+
+        cash = (c["Starting Cash"] + c["Savings In"] + c["Yield Income"] + c["Ops Net"] + c["Refi Draw"] - c["Refi Costs"]
+                - c["Feeder Prepay"] - c["Purchase Out (Total)"] - c["End Cash"])
+        self._keep("T-CASH-1", labels, cash)
+        self.prev_lb = int(lb[-1]); self.n += len(labels)
+
+    def _keep(self, check, labels, off):
+        bad = np.flatnonzero(np.abs(off) > self.tol)
+        months, offs = self.bad[check]
+        months += labels[bad].tolist(); offs += off[bad].tolist()
+
+    def report(self):
+        """The check_invariants() report for every month added so far."""
+        if not self.n:
+            return {"T-DS-1": {"ok": False, "months": [], "off": [], "n": 0},
+                    "T-AMORT-1": {"ok": True, "months": [], "off": [], "n": 0},
+                    "T-CASH-1": {"ok": True, "months": [], "off": [], "n": 0}}
+        rep = {"T-DS-1": {"ok": self.ds_ok, "months": list(self.ds_months), "off": [], "n": self.ds_n}}
+        for k, (months, offs) in self.bad.items():
+            rep[k] = {"ok": not months, "months": list(months), "off": list(offs), "n": len(months)}
+        return rep
+
+def assert_invariants(data, tol=1):
+    """check_invariants(), raising AssertionError on the first failing check."""
+    return assert_report(check_invariants(data, tol))
+
+def assert_report(rep):
+    """{"T-DS-1": "PASS", ...} for a check_invariants() report, or AssertionError."""
+    for k in INVARIANTS:
+        r = rep[k]
+        if r["ok"]:
+            continue
+        if k == "T-DS-1":
+            raise AssertionError("T-DS-1 FAIL: no DS>0 after purchase")
+        raise AssertionError(f"{k} FAIL {r['months'][0]} off by {r['off'][0]/100:.2f} "
+                             f"({len(r['months'])} month(s) violate)")
+    return {k: "PASS" for k in INVARIANTS}
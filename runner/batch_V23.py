@@ -0,0 +1,327 @@
+# batch_V23.py — vectorized multi-scenario engine (NumPy)
+#
+# simulate_batch() advances S engine variants together along a scenario axis.
+# Every arithmetic step mirrors run_suite_full_V23.simulate operation-for-operation
+# (same order, same masks), so each scenario matches the scalar run to the cent.
+# Cash-out refis and reserve yields are vectorized too: a scenario's refi candidates
+# are found by scanning its whole (<= maxLoans) book each month instead of through a
+# RefiQueue, which selects the same loans; the few whole-cent roundings go through
+# Python's round() element by element.
+
+import numpy as np
+
+try:
+    from runner import run_suite_full_V23 as simmod
+except ImportError:  # executed from inside runner/
+    import run_suite_full_V23 as simmod
+
+FLOAT_COLUMNS = [c for c in simmod.MONTHLY_COLUMNS if c not in ("YYYY-MM", "UnitID", "Units Owned")]
+
+BATCH_PARAMS = list(simmod.Params.__slots__)
+
+def compile_params(engines):
+    """Params record per engine; each distinct object is compiled once (Monte Carlo
+    passes the same engine S times)."""
+    compiled = {}
+    per = []
+    for e in engines:
+        P = compiled.get(id(e))
+        if P is None:
+            P = compiled[id(e)] = simmod.engine_params(e)
+        per.append(P)
+    return per
+
+def stack_params(engines):
+    """Stack per-engine parameters into (S,) arrays (``mdays`` becomes (S, 12)).
+
+    ``engines`` may hold engine dicts, overrides_V23 overlays or Params records.
+    """
+    per = compile_params(engines)
+    out = {}
+    for k in BATCH_PARAMS:
+        out[k] = np.array([getattr(p, k) for p in per], dtype=float)
+    out["maxLoans"] = out["maxLoans"].astype(np.int64)
+    return out
+
+def _pmt_denominators(rate_m, nper):
+    # 1-(1+r)**(-n) with Python pow, so the result is bit-identical to pmt()
+    return np.array([(1-(1+r)**(-n)) if r!=0 else 0.0 for r, n in zip(rate_m.tolist(), nper.tolist())])
+
+def _neg_pmt(rate_m, den, nper, pv):
+    # -pmt(rate_m, nper, pv), elementwise
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(rate_m!=0, (rate_m*pv)/np.where(den!=0, den, 1.0), pv/np.where(nper!=0, nper, 1.0))
+
+def _appreciation(APP, mmax):
+    # (1+APP)**((y-1)+(m-1)/12.0) for each scenario and month, from the same per-APP memo
+    # the scalar loop uses (simmod.appreciation_factors); a sweep usually carries only a
+    # handful of distinct APP values, and repeated sweeps reuse them.
+    uniq, inv = np.unique(APP, return_inverse=True)
+    table = np.array([simmod.appreciation_factors(a, mmax) for a in uniq.tolist()]).reshape(len(uniq), mmax)
+    return table[inv.reshape(-1)]
+
+def _value_growth(APP, mmax):
+    # (1+APP)**(k/12.0) for k = 0..mmax months held: RefiQueue.value's factor, Python pow
+    uniq, inv = np.unique(APP, return_inverse=True)
+    table = np.array([[(1 + a)**(k/12.0) for k in range(mmax+1)] for a in uniq.tolist()]).reshape(len(uniq), mmax+1)
+    return table[inv.reshape(-1)]
+
+def _round2(x, mask):
+    # round(v, 2) where mask holds (Python's correctly rounded rule), x elsewhere
+    out = x.copy()
+    ix = np.flatnonzero(mask)
+    if len(ix):
+        out[ix] = [round(v, 2) for v in x[ix].tolist()]
+    return out
+
+class BatchResult:
+    """Column arrays of shape (S, T), unrounded. ``rows(i)`` rebuilds scenario i as simulate() rows."""
+
+    def __init__(self, labels, columns, n_scenarios):
+        self.labels = labels
+        self.columns = columns
+        self.n_scenarios = n_scenarios
+
+    def __len__(self):
+        return self.n_scenarios
+
+    def final(self, col):
+        return self.columns[col][:, -1] if len(self.labels) else np.empty(0)
+
+    def rows(self, i):
+        cols = [c for c in FLOAT_COLUMNS if c in self.columns]
+        units = self.columns.get("Units Owned")
+        out = []
+        for t, lab in enumerate(self.labels):
+            r = {"YYYY-MM": lab, "UnitID": "TOTAL"}
+            for c in cols:
+                r[c] = round(float(self.columns[c][i, t]), 2)
+            if units is not None:
+                n = int(units[i, t])
+                if n == 0 and "Loan Balance (End)" in r:
+                    r["Loan Balance (End)"] = 0  # sum() over no units
+                r["Units Owned"] = n
+            out.append(r)
+        return out
+
+def simulate_batch(engines, mmax=simmod.MAX_MONTHS, record=None, paths=None):
+    """Run every engine in ``engines`` for ``mmax`` months in one vectorized pass.
+
+    ``record`` limits which monthly columns are kept (default: all). For very large
+    sweeps record only the KPIs you need — each column costs S*mmax*8 bytes.
+    ``paths`` optionally replaces fixed inputs with per-month (S, mmax) arrays:
+    "ADR", "OCC" and "APP_F" (the appreciation index applied to the parity price).
+    With an APP_F path a unit's value for the refi trigger grows along the path
+    (price * APP_F[t] / APP_F[month bought]) instead of at annualAppreciation.
+    """
+    paths = paths or {}
+    S = len(engines)
+    per = compile_params(engines)
+    record = list(simmod.MONTHLY_COLUMNS[2:]) if record is None else list(record)
+    cols = {c: np.zeros((S, mmax)) for c in record if c in FLOAT_COLUMNS}
+    if "Units Owned" in record:
+        cols["Units Owned"] = np.zeros((S, mmax), dtype=np.int64)
+    labels = [f"Y{t//12+1}-{t%12+1:02d}" for t in range(mmax)]
+
+    P = stack_params(per)
+
+    ADR=P["ADR"]; OCC=P["OCC"]; MGMT=P["MGMT"]; CAPX=P["CAPX"]; HOA_INF=P["HOA_INF"]
+    INS=P["INS"]; TAX=P["TAX"]; TARGET=P["TARGET"]; RATE=P["RATE"]; CLOSE=P["CLOSE"]
+    DOWN1=P["DOWN1"]; DOWNN=P["DOWNN"]; rainyMonths=P["rainyMonths"]; maxLoans=P["maxLoans"]
+    mdays=P["mdays"]; amort_yrs=P["amort_yrs"]; CAPEX_M=P["CAPEX_M"]
+    SEASON=P["SEASON"]; ADVANCE=P["ADVANCE"]; CASHOUT=P["CASHOUT"]; REFI_LTV=P["REFI_LTV"]
+    RAINY_YLD=P["RAINY_YLD"]/12.0; CAPEX_YLD=P["CAPEX_YLD"]/12.0; SAV_YLD=P["SAV_YLD"]/12.0
+    refi_on = np.array([p.refi_on() for p in per], dtype=bool)
+    yields_on = np.array([p.yields_on() for p in per], dtype=bool)
+
+    rate_m = RATE/12.0
+    nper_pf = amort_yrs*12
+    nper_loan = np.array([int(a*12) for a in amort_yrs.tolist()], dtype=float)
+    den_pf = _pmt_denominators(rate_m, nper_pf)
+    den_loan = _pmt_denominators(rate_m, nper_loan)
+    app_f = paths["APP_F"] if "APP_F" in paths else _appreciation(P["APP"], mmax)
+    adr_path = paths.get("ADR"); occ_path = paths.get("OCC")
+    growth = None if "APP_F" in paths or not refi_on.any() else _value_growth(P["APP"], mmax)
+
+    L = int(maxLoans.max()) if S else 0
+    L = max(L, 0)
+    price = np.zeros((S, L)); bal = np.zeros((S, L)); n_left = np.zeros((S, L), dtype=np.int64)
+    pmt_amt = np.zeros((S, L)); rate_l = np.zeros((S, L))
+    bought = np.zeros((S, L), dtype=np.int64); opened = np.zeros((S, L), dtype=np.int64)
+    count = np.zeros(S, dtype=np.int64)
+    slot = np.arange(L)
+    rows_ix = np.arange(S)
+
+    HOA_Y = P["HOA_Y0"].copy()
+    cash = P["start_cash"].copy(); savings_in = P["annual_sav"]/12.0
+    denom_par = TARGET + INS + TAX
+    g_par = ADR*365*OCC
+    zero = np.zeros(S)
+    rainy_res = zero.copy(); capex_res = zero.copy()
+
+    def _refi(trying, tt, need, ops_net):
+        # simmod._refi_plan + its commit for the scenarios in ``trying`` (gate open, cash
+        # short of gate_req): offers from every eligible loan, most equity first (ties by
+        # slot), one rank at a time across scenarios. Returns (draw, costs, committed).
+        s = rows_ix[trying]
+        if not len(s):
+            return zero, zero, trying
+        b = bal[s]; own = slot < count[s][:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if growth is not None:
+                value = price[s] * growth[s[:, None], tt - bought[s]]
+            else:
+                value = price[s] * (app_f[s, tt-1][:, None] / app_f[s[:, None], np.maximum(bought[s]-1, 0)])
+        elig = own & (tt >= opened[s] + SEASON[s][:, None]) & (b < REFI_LTV[s][:, None]*value)
+        cap = ADVANCE[s][:, None]*value
+        C = CASHOUT[s]
+        avail = cap*(1-C)[:, None] - b
+        offer = elig & (avail > 0)
+        n_off = offer.sum(axis=1)
+        if not n_off.any():
+            return zero, zero, np.zeros(S, dtype=bool)
+        order = np.argsort(np.where(offer, -avail, np.inf), axis=1, kind="stable")
+        ix = np.arange(len(s)); need = need[s].copy(); ds_up = np.zeros(len(s))
+        rm = rate_m[s]; dl = den_loan[s]; nl = nper_loan[s]
+        plan = []
+        for r in range(L):
+            act = (r < n_off) & (need > 0)
+            if not act.any(): break
+            j = order[:, r]
+            B = b[ix, j]; cj = cap[ix, j]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                over = (B + need)/(1-C)
+                draw = np.where(over < cj, np.ceil((over - B)*100 + 0.5), np.floor((cj - B)*100))/100  # half a cent of slack
+            new = B + draw
+            cost = _round2(C*new, act)
+            old = np.where((n_left[s, j] > 0) & (B > 0), pmt_amt[s, j], 0.0)
+            ds_up = np.where(act, ds_up + (_neg_pmt(rm, dl, nl, new) - old), ds_up)
+            need = np.where(act, need - (draw - cost), need)
+            plan.append((act, j, new, draw, cost))
+        ok = (n_off > 0) & (need <= 0) & (ops_net[s] - ds_up >= 0)
+        draw_s = np.zeros(len(s)); cost_s = np.zeros(len(s))
+        for act, j, new, draw, cost in plan:
+            do = act & ok
+            if not do.any(): continue
+            ss = s[do]; jj = j[do]; nw = new[do]
+            bal[ss, jj] = nw; rate_l[ss, jj] = rate_m[ss]; n_left[ss, jj] = nper_loan[ss].astype(np.int64)
+            pmt_amt[ss, jj] = np.where(nw>0, _neg_pmt(rate_m[ss], den_loan[ss], nper_loan[ss], nw), 0.0)
+            opened[ss, jj] = tt
+            draw_s = np.where(do, draw_s + draw, draw_s); cost_s = np.where(do, cost_s + cost, cost_s)
+        refi_draw = zero.copy(); refi_costs = zero.copy(); committed = np.zeros(S, dtype=bool)
+        refi_draw[s] = draw_s; refi_costs[s] = cost_s; committed[s] = ok
+        return refi_draw, refi_costs, committed
+
+    for t in range(mmax):
+        tt = t + 1  # the scalar loop's 1-based month
+        m = t%12 + 1
+        if m==1 and t>0: HOA_Y = HOA_Y*(1+HOA_INF)
+        days = mdays[:, m-1]
+        if adr_path is not None or occ_path is not None:
+            if adr_path is not None: ADR = adr_path[:, t]
+            if occ_path is not None: OCC = occ_path[:, t]
+            g_par = ADR*365*OCC
+        numer = g_par - (g_par*(MGMT+CAPX) + HOA_Y)
+        price_par = np.maximum(numer/denom_par, 0.0) * app_f[:, t]
+
+        # ---- Operations + scheduled amortization (slot order == unit order) ----
+        ops_gross=zero.copy(); ops_mgmt=zero.copy(); ops_capex=zero.copy(); ops_hoa=zero.copy()
+        ops_ins=zero.copy(); ops_tax=zero.copy(); ds_total=zero.copy(); interest_total=zero.copy(); principal_total=zero.copy()
+        gross = ADR*OCC*days; mgmt = gross*MGMT; capex_op = gross*CAPX; hoa = HOA_Y/12.0
+        for j in range(L):
+            own = j < count
+            if not own.any(): break
+            ops_gross += np.where(own, gross, 0.0); ops_mgmt += np.where(own, mgmt, 0.0)
+            ops_capex += np.where(own, capex_op, 0.0); ops_hoa += np.where(own, hoa, 0.0)
+            ops_ins += np.where(own, price[:, j]*INS/12.0, 0.0); ops_tax += np.where(own, price[:, j]*TAX/12.0, 0.0)
+            b = bal[:, j]
+            live = own & (b>0) & (n_left[:, j]>0)
+            if live.any():
+                interest = b*rate_l[:, j]
+                principal = np.maximum(np.minimum(pmt_amt[:, j] - interest, b), 0.0)
+                bal[:, j] = np.where(live, b - principal, b)
+                n_left[:, j] = np.where(live, np.maximum(n_left[:, j]-1, 0), n_left[:, j])
+                ds_total += np.where(live, pmt_amt[:, j], 0.0)
+                principal_total += np.where(live, principal, 0.0)
+                interest_total += np.where(live, interest, 0.0)
+        ops_net = ops_gross - (ops_mgmt + ops_capex + ops_hoa + ops_ins + ops_tax + ds_total)
+        start = cash
+        yield_inc = zero
+        if yields_on.any():
+            pos_cash = np.where(0.0 > cash, 0.0, cash)  # max(cash, 0.0)
+            yield_inc = np.where(yields_on, _round2(rainy_res*RAINY_YLD + capex_res*CAPEX_YLD + pos_cash*SAV_YLD, yields_on), 0.0)
+        cash_prefeeder = cash + savings_in + yield_inc + ops_net
+
+        # ---- Purchase gate (mask per scenario) ----
+        gate_open = (count < maxLoans) & (price_par > 0)
+        down_frac = np.where(count==0, DOWN1, DOWNN)
+        loan_pf = price_par*(1 - down_frac)
+        ds_pf = _neg_pmt(rate_m, den_pf, nper_pf, loan_pf)
+        hoa_pf = HOA_Y/12.0
+        pur_dp = np.where(gate_open, down_frac*price_par, 0.0)
+        pur_cl = np.where(gate_open, CLOSE*price_par, 0.0)
+        pur_rainy = np.where(gate_open, rainyMonths*(ds_pf + hoa_pf), 0.0)
+        gate_req = pur_dp + pur_cl + pur_rainy
+        refi_draw = refi_costs = zero
+        if L and refi_on.any():
+            refi_draw, refi_costs, done = _refi(gate_open & refi_on & (cash_prefeeder < gate_req), tt, gate_req - cash_prefeeder, ops_net)
+            cash_prefeeder = np.where(done, cash_prefeeder + (refi_draw - refi_costs), cash_prefeeder)
+        buy = gate_open & (cash_prefeeder >= gate_req)
+        cash_prefeeder = np.where(buy, cash_prefeeder - gate_req, cash_prefeeder)
+        pur_total = np.where(buy, gate_req, 0.0)
+        new_loan_principal = np.where(buy, loan_pf, 0.0)
+        if buy.any():
+            s = rows_ix[buy]; j = count[buy]
+            price[s, j] = price_par[buy]
+            bal[s, j] = loan_pf[buy]
+            rate_l[s, j] = rate_m[buy]
+            n_left[s, j] = nper_loan[buy].astype(np.int64)
+            pmt_amt[s, j] = np.where(loan_pf[buy]>0, _neg_pmt(rate_m[buy], den_loan[buy], nper_loan[buy], loan_pf[buy]), 0.0)
+            bought[s, j] = tt; opened[s, j] = tt
+            count[buy] += 1
+            rainy_res = np.where(buy, rainy_res + pur_rainy, rainy_res)
+
+        # ---- Feeder (post-purchase): prepay the largest balance ----
+        feeder = zero.copy()
+        has = count > 0
+        if L and has.any():
+            eligible = np.maximum(cash_prefeeder, 0.0)
+            go = has & (eligible > 0)
+            if go.any():
+                s = rows_ix[go]
+                j = np.argmax(bal[s], axis=1)
+                tb = bal[s, j]
+                amt = np.maximum(np.minimum(np.minimum(eligible[go], tb), tb), 0.0)
+                nb = tb - amt
+                bal[s, j] = nb
+                r = rate_l[s, j]; pm = pmt_amt[s, j]
+                keep = (nb>0) & (r>0) & (pm>0)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    n_est = -np.log(np.maximum(1 - r*nb/np.where(pm!=0, pm, 1.0), 1e-12))/np.log(1+r)
+                    n_new = np.where(keep, np.maximum(np.ceil(np.where(keep, n_est, 0.0)), 0), 0).astype(np.int64)
+                n_left[s, j] = n_new
+                feeder[s] = amt
+                cash_prefeeder = cash_prefeeder - feeder
+
+        end_cash = cash_prefeeder
+        capex_up = capex_res + ops_capex; capex_cap = CAPEX_M*ops_capex
+        capex_res = np.where(capex_cap < capex_up, capex_cap, capex_up)  # min(), first on ties
+        loan_end = zero.copy()
+        for j in range(L):
+            own = j < count
+            if not own.any(): break
+            loan_end += np.where(own, bal[:, j], 0.0)
+
+        for c, v in (("Starting Cash", start), ("Savings In", savings_in), ("Yield Income", yield_inc), ("Gross Revenue", ops_gross),
+                     ("Mgmt Expense", ops_mgmt), ("CapEx Operating", ops_capex), ("HOA", ops_hoa),
+                     ("Insurance", ops_ins), ("Property Tax", ops_tax), ("Debt Service (Total)", ds_total),
+                     ("Scheduled Principal", principal_total), ("Interest Portion", interest_total),
+                     ("Ops Net", ops_net), ("Feeder Prepay", feeder), ("Purchase: Down Payment", pur_dp),
+                     ("Purchase: Closing Costs", pur_cl), ("Purchase: Initial Rainy Funding", pur_rainy),
+                     ("Purchase Out (Total)", pur_total), ("New Loan Principal", new_loan_principal),
+                     ("Refi Draw", refi_draw), ("Refi Costs", refi_costs), ("Loan Balance (End)", loan_end), ("End Cash", end_cash), ("Units Owned", count)):
+            if c in cols:
+                cols[c][:, t] = v
+
+        cash = end_cash
+    return BatchResult(labels, cols, S)
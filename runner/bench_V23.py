@@ -0,0 +1,393 @@
+# bench_V23.py — benchmark suite + regression compare
+#
+#   python runner/bench_V23.py run [--out runner/V2_3_Bench.json] [-k simulate] [--quick]
+#   python runner/bench_V23.py compare BASE.json NEW.json [--threshold 0.10]
+#   python runner/bench_V23.py gate [--max-ratio 1.05]
+#
+# Each case is timed as `repeat` rounds of `loops` calls (loops auto-sized so a round
+# takes >= MIN_ROUND seconds); the JSON keeps per-call min and median seconds plus the
+# machine/runtime it came from. `compare` matches cases by name, reports new/base on
+# the per-call minimum and exits 1 if any case slowed down by more than the threshold.
+# `gate` needs no stored baseline: it times simulate() on the shipped engine against
+# the per-unit Loan month loop it replaced (reference_simulate, same machine, same
+# process), checks both give the same rows, and exits 1 past --max-ratio.
+
+import os, sys, json, time, copy, argparse, platform, statistics, subprocess, tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from runner import run_suite_full_V23 as simmod
+    from runner import sinks_V23 as sinks
+    from runner import sweep_V23 as sweep
+    from runner import analytics_V23 as analytics
+    from runner import view_V23 as view
+except ImportError:  # executed from inside runner/
+    import run_suite_full_V23 as simmod
+    import sinks_V23 as sinks
+    import sweep_V23 as sweep
+    import analytics_V23 as analytics
+    import view_V23 as view
+
+DEFAULT_OUT = simmod.REPO_ROOT / "runner" / "V2_3_Bench.json"
+MIN_ROUND = 0.2
+REPEAT = 5
+
+# -------- helpers --------
+def _engine(**over):
+    """Default engine with dotted-path overrides (sweep paths, e.g. constants.portfolio.maxLoans)."""
+    e = copy.deepcopy(simmod.load_eng(simmod.DEFAULT_ENGINE))
+    for p, v in over.items():
+        sweep.set_path(e, p.replace("__", "."), v)
+    return e
+
+def _loan_terms():
+    C = simmod.load_eng(simmod.DEFAULT_ENGINE)["constants"]
+    return C["debt"]["mortgageRate"], C["financial"]["amortizationYears"]
+
+def _filled_book(n, rate, years):
+    book = simmod.LoanBook(n)
+    for i in range(n):
+        book.add(f"U{i+1}", 300000.0 + i, 225000.0 + i, rate, years)
+    return book
+
+def _plain_engine():
+    """Default engine with cash-out refis and reserve yields switched off."""
+    e = _engine()
+    for sec in (e, e["constants"]):
+        sec.pop("reserveYields", None); sec.pop("savings", None)
+        if "banking" in sec:
+            sec["banking"] = {k: v for k, v in sec["banking"].items() if k not in ("advanceRate", "refiLTVTrigger")}
+    return e
+
+def reference_simulate(e, mmax):
+    """The month loop before LoanBook: a list of per-unit Loan objects and Python sums
+    (no refis / yields). Rows match simulate() minus the refi and yield columns."""
+    P = simmod.engine_params(e)
+    S = simmod.schedule(P, mmax)
+    S_hoa, S_days, S_par, S_close, S_loan, S_down, S_rainy, S_req = S.lists()
+    cash = P.start_cash; savings_in = P.annual_sav/12.0
+    units = []; rows = []
+    for i in range(mmax):
+        y, m = i//12 + 1, i%12 + 1
+        HOA_Y = S_hoa[i]; days = S_days[i]; price_par = S_par[i]
+        ops_gross=ops_mgmt=ops_capex=ops_hoa=ops_ins=ops_tax=0.0
+        ds_total=interest_total=principal_total=0.0
+        for u in units:
+            gross=P.ADR*P.OCC*days; mgmt=gross*P.MGMT; capex_op=gross*P.CAPX
+            hoa=HOA_Y/12.0; ins=u["price"]*P.INS/12.0; tax=u["price"]*P.TAX/12.0
+            ops_gross+=gross; ops_mgmt+=mgmt; ops_capex+=capex_op; ops_hoa+=hoa; ops_ins+=ins; ops_tax+=tax
+            if u["loan"].balance>0 and u["loan"].n_left>0:
+                pm, pr, it = u["loan"].accrue()
+                ds_total+=pm; principal_total+=pr; interest_total+=it
+        ops_net = ops_gross - (ops_mgmt + ops_capex + ops_hoa + ops_ins + ops_tax + ds_total)
+        cash_prefeeder = cash + savings_in + ops_net
+        pur_dp=pur_cl=pur_rainy=pur_total=new_loan=0.0
+        if len(units) < P.maxLoans and price_par>0:
+            kind = 0 if not units else 1
+            pur_dp = S_down[kind][i]; pur_cl = S_close[i]; pur_rainy = S_rainy[kind][i]; gate_req = S_req[kind][i]
+            if cash_prefeeder >= gate_req:
+                cash_prefeeder -= gate_req; pur_total = gate_req; new_loan = S_loan[kind][i]
+                uid = f"U{len(units)+1}"
+                units.append({"id": uid, "price": price_par, "loan": simmod.Loan(uid, new_loan, P.RATE, P.amort_yrs)})
+        feeder = 0.0
+        if units and cash_prefeeder > 0:
+            target = max(units, key=lambda u: u["loan"].balance)
+            feeder = target["loan"].prepay(min(cash_prefeeder, target["loan"].balance))
+            cash_prefeeder -= feeder
+        vals = (cash, savings_in, ops_gross, ops_mgmt, ops_capex, ops_hoa, ops_ins, ops_tax, ds_total,
+                principal_total, interest_total, ops_net, feeder, pur_dp, pur_cl, pur_rainy, pur_total, new_loan,
+                sum(u["loan"].balance for u in units), cash_prefeeder)
+        rows.append({"YYYY-MM": f"Y{y}-{m:02d}", "UnitID": "TOTAL", **{c: round(v, 2) for c, v in zip(REFERENCE_COLUMNS, vals)},
+                     "Units Owned": len(units)})
+        cash = cash_prefeeder
+    return rows
+
+REFERENCE_COLUMNS = [c for c in simmod.FLOAT_COLUMNS if c not in ("Yield Income", "Refi Draw", "Refi Costs")]
+
+# -------- cases --------
+# Each case is name -> setup() returning a zero-arg callable; setup cost is not timed.
+def _case_simulate(mmax, engine=None, **kw):
+    def setup():
+        e = (engine or _engine)()
+        return lambda: simmod.simulate(e, mmax=mmax, **kw)
+    return setup
+
+def _case_maxloans(n):
+    def setup():
+        # savings high enough to buy every month, so the book reaches maxLoans
+        e = _engine(**{"constants__financial__annualSavings": 5e6, "constants__portfolio__maxLoans": n})
+        return lambda: simmod.simulate(e, mmax=1200)
+    return setup
+
+def _case_refi(n):
+    def setup():
+        # the default engine's banking / reserveYields / savings: cash-out refis fund
+        # purchases up to maxLoans
+        e = _engine(**{"constants__financial__annualSavings": 9e5, "constants__portfolio__maxLoans": n})
+        return lambda: simmod.simulate(e, mmax=600)
+    return setup
+
+def _case_loan_accrue(n):
+    def setup():
+        rate, years = _loan_terms()
+        def run():
+            loans = [simmod.Loan(f"U{i+1}", 225000.0 + i, rate, years) for i in range(n)]
+            for _ in range(12):
+                for ln in loans: ln.accrue()
+        return run
+    return setup
+
+def _case_book_accrue(n):
+    def setup():
+        rate, years = _loan_terms()
+        def run():
+            book = _filled_book(n, rate, years)
+            for _ in range(12): book.accrue()
+        return run
+    return setup
+
+def _case_loan_prepay(n):
+    def setup():
+        rate, years = _loan_terms()
+        def run():
+            loans = [simmod.Loan(f"U{i+1}", 225000.0 + i, rate, years) for i in range(n)]
+            for _ in range(12):
+                max(loans, key=lambda ln: ln.balance).prepay(1000.0)
+        return run
+    return setup
+
+def _case_book_prepay(n):
+    def setup():
+        rate, years = _loan_terms()
+        def run():
+            book = _filled_book(n, rate, years)
+            for _ in range(12):
+                book.prepay(book.largest(), 1000.0)
+        return run
+    return setup
+
+def _case_schedule(mmax):
+    def setup():
+        P = simmod.engine_params(_engine())
+        return lambda: simmod.Schedule(P, 1, P.HOA_Y0, mmax)  # uncached build
+    return setup
+
+def _case_yoy_sink(mmax):
+    def setup():
+        rows = simmod.simulate(_engine(), mmax=mmax)
+        tmp = tempfile.TemporaryDirectory(prefix="ob_bench_")  # removed when the case is dropped
+        out = Path(tmp.name) / "yoy.csv"
+        def run(tmp=tmp):
+            return sinks.run_stream(rows, [sinks.YoYSink(out)])
+        return run
+    return setup
+
+def _case_yoy_app(mmax):
+    def setup():
+        rows = simmod.simulate(_engine(), mmax=mmax)
+        return lambda: view.rollup_frame(rows)
+    return setup
+
+def _case_rollup_columnar(mmax):
+    def setup():
+        res = simmod.simulate(_engine(), mmax=mmax, columnar=True)
+        return lambda: (analytics.rollup(res, "year"), analytics.rollup(res, "quarter"))
+    return setup
+
+def _case_checks(mmax):
+    def setup():
+        rows = simmod.simulate(_engine(), mmax=mmax)
+        return lambda: sinks.run_stream(rows, sinks.default_checks())
+    return setup
+
+# a fresh interpreter up to the first simulated month, through the precompiled engine
+# cache (cache_V23.load_engine) unless OB_STR_ENGINE_CACHE=0
+FIRST_MONTH = ("import runner.run_suite_full_V23 as simmod, runner.cache_V23 as rcache\n"
+               "next(simmod.iter_simulate(rcache.load_engine(simmod.DEFAULT_ENGINE), 1))")
+
+def _case_startup(code, **env):
+    def setup():
+        cmd = [sys.executable, "-c", code]
+        run_env = {**os.environ, **env}
+        subprocess.run(cmd, cwd=simmod.REPO_ROOT, env=run_env, check=True)  # warm the engine cache
+        return lambda: subprocess.run(cmd, cwd=simmod.REPO_ROOT, env=run_env, check=True)
+    return setup
+
+def _case_sweep():
+    def setup():
+        base = _engine()
+        axes = [sweep.parse_grid("constants.debt.mortgageRate=0.055,0.0685,0.08"),
+                sweep.parse_range("constants.operations.adrBaseline2BR=200:350:16")]
+        return lambda: sweep.run_sweep(base, axes, mmax=240, workers=1)
+    return setup
+
+def _case_reference(mmax):
+    def setup():
+        e = _plain_engine()
+        return lambda: reference_simulate(e, mmax)
+    return setup
+
+def _case_plain(mmax):
+    def setup():
+        e = _plain_engine()
+        return lambda: simmod.simulate(e, mmax=mmax)
+    return setup
+
+CASES = {
+    "simulate/240": _case_simulate(240),
+    "simulate/600": _case_simulate(600),
+    "simulate/6000": _case_simulate(6000),
+    "simulate-plain/240": _case_plain(240),
+    "simulate-plain/6000": _case_plain(6000),
+    "reference/240": _case_reference(240),
+    "reference/6000": _case_reference(6000),
+    # event_driven only jumps on engines without refis / yields (Params.idle_spans_on)
+    "simulate-event/6000": _case_simulate(6000, _plain_engine, event_driven=True),
+    "simulate-columnar/6000": _case_simulate(6000, _plain_engine, event_driven=True, columnar=True),
+    "simulate-cents/600": _case_simulate(600, money="cents"),
+    "maxloans/7": _case_maxloans(7),
+    "maxloans/100": _case_maxloans(100),
+    "maxloans/1000": _case_maxloans(1000),
+    "refi/400x600": _case_refi(400),
+    "loan/accrue-100x12": _case_loan_accrue(100),
+    "loanbook/accrue-100x12": _case_book_accrue(100),
+    "loan/prepay-100x12": _case_loan_prepay(100),
+    "loanbook/prepay-100x12": _case_book_prepay(100),
+    "schedule/6000": _case_schedule(6000),
+    "yoy/sink-240": _case_yoy_sink(240),
+    "yoy/app-rollup-240": _case_yoy_app(240),
+    "yoy/sink-6000": _case_yoy_sink(6000),
+    "yoy/app-rollup-6000": _case_yoy_app(6000),
+    "yoy/columnar-year+quarter-6000": _case_rollup_columnar(6000),
+    "checks/stream-6000": _case_checks(6000),
+    "sweep/48x240": _case_sweep(),
+    "startup/python": _case_startup("pass"),
+    "startup/first-month": _case_startup(FIRST_MONTH),
+    "startup/first-month-parse": _case_startup(FIRST_MONTH, OB_STR_ENGINE_CACHE="0"),
+}
+
+# -------- timing --------
+def measure(fn, repeat=REPEAT, min_round=MIN_ROUND):
+    """Per-call seconds over ``repeat`` rounds; loops per round auto-sized to min_round."""
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops): fn()
+        dt = time.perf_counter() - t0
+        if dt >= min_round or loops >= 1 << 20:
+            break
+        loops = max(loops*2, int(loops*min_round/max(dt, 1e-9)))
+    times = [dt/loops]
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(loops): fn()
+        times.append((time.perf_counter() - t0)/loops)
+    return {"min": min(times), "median": statistics.median(times), "loops": loops, "repeat": repeat}
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=simmod.REPO_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run_benchmarks(names, repeat=REPEAT, min_round=MIN_ROUND, log=print):
+    results = {}
+    for name in names:
+        fn = CASES[name]()
+        r = measure(fn, repeat, min_round)
+        results[name] = r
+        log(f"{name:28s} min {r['min']*1e3:10.3f} ms   median {r['median']*1e3:10.3f} ms   ({r['loops']} loops)")
+    return {
+        "meta": {
+            "created_at_utc": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "git_rev": _git_rev(), "python": platform.python_version(), "numpy": np.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+def compare(base, new, threshold=0.10):
+    """[(name, base_s, new_s, ratio, flag)] on per-call minimums; flag is "SLOWER"/"faster"/""."""
+    out = []
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        b = base["results"].get(name); n = new["results"].get(name)
+        if b is None or n is None:
+            out.append((name, b and b["min"], n and n["min"], None, "missing"))
+            continue
+        ratio = n["min"]/b["min"] if b["min"] else float("inf")
+        flag = "SLOWER" if ratio > 1 + threshold else ("faster" if ratio < 1/(1 + threshold) else "")
+        out.append((name, b["min"], n["min"], ratio, flag))
+    return out
+
+# (case, yardstick): the shipped engine's default path against the loop it replaced
+GATES = [("simulate-plain/240", "reference/240"), ("simulate-plain/6000", "reference/6000")]
+MAX_RATIO = 1.05
+
+def gate(max_ratio=MAX_RATIO, repeat=REPEAT, min_round=MIN_ROUND, log=print):
+    """[(case, yardstick, ratio, ok)]; raises AssertionError if the rows differ."""
+    e = _plain_engine()
+    for mmax in (240, 6000):
+        new = [{c: r[c] for c in r if c not in ("Yield Income", "Refi Draw", "Refi Costs")} for r in simmod.simulate(e, mmax)]
+        assert new == reference_simulate(e, mmax), f"simulate() rows differ from reference_simulate ({mmax} months)"
+    out = []
+    for name, ref in GATES:
+        a = measure(CASES[name](), repeat, min_round); b = measure(CASES[ref](), repeat, min_round)
+        ratio = a["min"]/b["min"]
+        out.append((name, ref, ratio, ratio <= max_ratio))
+        log(f"{name:28s} {a['min']*1e3:10.3f} ms  vs {ref:16s} {b['min']*1e3:10.3f} ms   x{ratio:5.2f}  "
+            f"{'ok' if ratio <= max_ratio else 'TOO SLOW'}")
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks for the V2_3 simulator.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="run the suite and write JSON")
+    r.add_argument("--out", default=os.getenv("OUT_BENCH", str(DEFAULT_OUT)))
+    r.add_argument("-k", dest="filter", action="append", default=[], help="only cases containing this substring (repeatable)")
+    r.add_argument("--repeat", type=int, default=REPEAT)
+    r.add_argument("--quick", action="store_true", help="3 rounds of >= 0.05s (smoke run)")
+    r.add_argument("--list", action="store_true", help="list case names and exit")
+    c = sub.add_parser("compare", help="compare two result files")
+    c.add_argument("base"); c.add_argument("new")
+    c.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown fraction (default 0.10)")
+    g = sub.add_parser("gate", help="fail if the default path is slower than the per-unit reference loop")
+    g.add_argument("--max-ratio", type=float, default=MAX_RATIO, help=f"allowed simulate/reference time (default {MAX_RATIO})")
+    a = ap.parse_args(argv)
+
+    if a.cmd == "gate":
+        res = gate(a.max_ratio)
+        slow = sum(not ok for *_, ok in res)
+        print(f"GATE: {'FAIL' if slow else 'PASS'}  (max ratio {a.max_ratio})")
+        return 1 if slow else 0
+
+    if a.cmd == "run":
+        names = [n for n in CASES if not a.filter or any(f in n for f in a.filter)]
+        if a.list:
+            print("\n".join(names)); return 0
+        repeat, min_round = (3, 0.05) if a.quick else (a.repeat, MIN_ROUND)
+        res = run_benchmarks(names, repeat, min_round)
+        out = Path(a.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(res, indent=2))
+        print("OUT:", out)
+        print("DONE")
+        return 0
+
+    base = json.loads(Path(a.base).read_text()); new = json.loads(Path(a.new).read_text())
+    rows = compare(base, new, a.threshold)
+    slower = 0
+    for name, b, n, ratio, flag in rows:
+        if ratio is None:
+            print(f"{name:28s} {'-' if b is None else f'{b*1e3:.3f} ms':>14s} -> {'-' if n is None else f'{n*1e3:.3f} ms':>14s}   {flag}")
+            continue
+        print(f"{name:28s} {b*1e3:11.3f} ms -> {n*1e3:11.3f} ms   x{ratio:5.2f}  {flag}")
+        slower += flag == "SLOWER"
+    print(f"SLOWER: {slower}  (threshold {a.threshold:.0%})")
+    return 1 if slower else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+# branch_V23.py — what-if branches that share their simulated prefixes
+#
+#   python runner/branch_V23.py --tree whatif.json [--months 240] [--out-dir runner/branches]
+#
+# whatif.json is a tree; each child forks from its parent at month ``at`` (or the first
+# month of ``year``) and applies ``set`` ({dotted engine path: value}) from then on:
+#
+#   {"name": "base", "children": [
+#     {"name": "rates-8.5-y8", "year": 8, "set": {"constants.debt.mortgageRate": 0.085},
+#      "children": [{"name": "adr-300-y12", "year": 12, "set": {"constants.operations.adrBaseline2BR": 300}}]},
+#     {"name": "savings-80k-y5", "year": 5, "set": {"constants.financial.annualSavings": 80000}}]}
+#
+# Existing loans keep their rate and schedule across a fork; cash, HOA_Y and the loan
+# book carry over (run_suite_full_V23.SimState). ForkCache keeps the state (and rows) at
+# every fork point and every ``every`` months of each prefix, so a branch resumes from
+# the latest month it shares with anything already computed and each common prefix is
+# simulated once.
+
+import os, json, argparse
+from collections import OrderedDict
+from pathlib import Path
+
+try:
+    from runner import run_suite_full_V23 as simmod
+    from runner import cache_V23 as rcache
+    from runner import sinks_V23 as sinks
+    from runner import overrides_V23 as overrides
+except ImportError:  # executed from inside runner/
+    import run_suite_full_V23 as simmod
+    import cache_V23 as rcache
+    import sinks_V23 as sinks
+    import overrides_V23 as overrides
+
+def fork_month(node):
+    """``at`` (1-based month) or the first month of ``year``."""
+    if "at" in node:
+        return int(node["at"])
+    if "year" in node:
+        return (int(node["year"]) - 1)*12 + 1
+    raise ValueError(f"fork {node.get('name')!r} needs 'at' or 'year'")
+
+def _prefix_id(parent_id, at, overrides):
+    tag = f"{parent_id}|{at}|{rcache.canonical_json(overrides)}"
+    return rcache.sha256_bytes(tag.encode("utf-8"))
+
+class ForkCache:
+    """SimState at month k, keyed by (prefix id, k); LRU-capped at ``max_states``. Rows
+    are kept once per prefix (months 1..furthest month simulated on it); a state at
+    month k resumes with the first k of them."""
+
+    def __init__(self, every=12, max_states=4096):
+        self.every = every
+        self.max_states = max_states
+        self._states = OrderedDict()  # (pid, k) -> SimState going into month k+1
+        self._rows = {}  # pid -> [row of month 1, 2, ...] along that prefix
+        self._held = {}  # pid -> number of states kept (its rows go with the last one)
+        self.months_simulated = 0
+        self.months_reused = 0
+
+    def _get(self, pid, k):
+        hit = self._states.get((pid, k))
+        if hit is not None:
+            self._states.move_to_end((pid, k))
+        return hit
+
+    def _put(self, pid, k, state, out):
+        # out: the rows of months 1..k along pid (a run's growing list; only the first
+        # k are pid's own, later months may belong to a branch forked off it)
+        prefix = self._rows.setdefault(pid, [])
+        if len(prefix) < k:
+            prefix.extend(out[len(prefix):k])
+        if (pid, k) not in self._states:
+            self._held[pid] = self._held.get(pid, 0) + 1
+        self._states[(pid, k)] = state
+        self._states.move_to_end((pid, k))
+        while len(self._states) > self.max_states:
+            (old, _), _ = self._states.popitem(last=False)
+            self._held[old] -= 1
+            if not self._held[old]:
+                del self._held[old], self._rows[old]
+
+    def _latest(self, pid, lo, hi):
+        best = None
+        for k in range(hi, lo - 1, -1):
+            best = self._get(pid, k)
+            if best is not None:
+                return k, best
+        return None
+
+    def run(self, base, forks, mmax=simmod.MAX_MONTHS, event_driven=False, snaps=()):
+        """Rows for ``base`` with ``forks`` = [(month, {path: value}), ...] applied in order.
+
+        ``snaps`` are extra months m whose state going in (after month m-1) should be kept,
+        e.g. the fork months of branches that will hang off this one.
+        """
+        forks = sorted(((int(at), dict(ov)) for at, ov in forks), key=lambda f: f[0])
+        engines = [base]; pids = [rcache.engine_hash(base)]
+        for at, ov in forks:
+            if not 1 < at <= mmax:
+                raise ValueError(f"fork month {at} outside 2..{mmax}")
+            engines.append(overrides.Overlay(engines[-1], ov)); pids.append(_prefix_id(pids[-1], at, ov))
+        starts = [1] + [at for at, _ in forks]
+        ends = [s - 1 for s in starts[1:]] + [mmax]
+
+        # latest cached month along this branch: scan segments from the tail back
+        seg, k0, state, out = 0, 0, None, []
+        for i in range(len(starts) - 1, -1, -1):
+            found = self._latest(pids[i], starts[i] - 1 if i else 1, ends[i])
+            if found:
+                k0, state = found
+                out = self._rows[pids[i]][:k0]
+                seg = i if k0 < ends[i] or i == len(starts) - 1 else i + 1
+                break
+        self.months_reused += k0
+        if k0 == mmax:
+            return out
+
+        for j in range(seg, len(starts)):
+            lo, hi = (k0 if j == seg else starts[j] - 1), ends[j]
+            if hi <= lo:
+                continue
+            pid = pids[j]
+            at = {hi} | {k for k in range(lo + 1, hi) if self.every and k % self.every == 0}
+            at |= {s - 1 for s in snaps if lo < s - 1 < hi}
+
+            def keep(st, pid=pid):
+                self._put(pid, st.t - 1, st, out)
+            raw = simmod._iter_raw(engines[j], hi, event_driven, state=state, snap_at=at, on_state=keep)
+            for r in simmod._iter_simulate_rows(raw):
+                out.append(r)
+            self.months_simulated += hi - lo
+            state = self._get(pid, hi)
+        return out
+
+def run_tree(base, tree, mmax=simmod.MAX_MONTHS, cache=None, event_driven=False):
+    """{branch name: rows} for every node of ``tree`` (the root is the base engine)."""
+    cache = cache or ForkCache()
+    out = {}
+
+    def visit(node, forks, name):
+        kids = node.get("children", [])
+        snaps = [fork_month(c) for c in kids]
+        out[name] = cache.run(base, forks, mmax, event_driven, snaps=snaps)
+        for i, c in enumerate(kids):
+            visit(c, forks + [(fork_month(c), c.get("set", {}))], c.get("name") or f"{name}/{i+1}")
+
+    visit(tree, [], tree.get("name", "base"))
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="What-if branches over the V2_3 engine with shared prefixes.")
+    ap.add_argument("--engine", default=os.getenv("ENGINE_PATH", str(simmod.DEFAULT_ENGINE)))
+    ap.add_argument("--tree", required=True, help="JSON branch tree (see module header)")
+    ap.add_argument("--months", type=int, default=int(os.getenv("MAX_MONTHS", simmod.MAX_MONTHS)))
+    ap.add_argument("--event-driven", action="store_true")
+    ap.add_argument("--out-dir", default=None, help="write <branch>.csv per branch here")
+    a = ap.parse_args(argv)
+
+    base = simmod.load_eng(Path(a.engine))
+    tree = json.loads(Path(a.tree).read_text())
+    cache = ForkCache()
+    res = run_tree(base, tree, mmax=a.months, cache=cache, event_driven=a.event_driven)
+    for name, rows in res.items():
+        last = rows[-1] if rows else {}
+        print(f"{name}: End Cash {last.get('End Cash', 0):,.2f}  Units {last.get('Units Owned', 0)}  "
+              f"Loan Balance {last.get('Loan Balance (End)', 0):,.2f}")
+        if a.out_dir:
+            sinks.run_stream(rows, [sinks.CsvSink(Path(a.out_dir) / f"{name.replace('/', '_')}.csv")])
+    print(f"MONTHS SIMULATED: {cache.months_simulated} (vs {len(res)*a.months} from scratch)")
+    print("DONE")
+
+if __name__ == "__main__":
+    main()
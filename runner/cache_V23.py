@@ -0,0 +1,278 @@
+# cache_V23.py — content-addressed result cache + manifest filler
+#
+# Key = sha256(canonical engine JSON) + runner_hash() + mmax, where runner_hash covers
+# the source of every module that shapes the stored output (RUNNER_MODULES). A hit returns
+# the stored monthly rows (parsed on first use), the CSV bytes written for them and the
+# T-* results, so an identical rerun of a locked engine skips simulate() entirely. Entries are evicted
+# least-recently-used (by mtime, refreshed on every hit) once the cache exceeds its cap.
+#
+# EngineCache keeps each engine file precompiled next to the results (<root>/engines/):
+# the parsed engine, its Params record and its content hash, in marshal format. A load
+# trusts the entry while the file's (mtime, size) stamp is unchanged, re-hashes the file
+# when the stamp moved (a touch keeps the entry) and recompiles when the bytes differ or
+# the runner changed, so a short-lived process never re-parses a locked engine.
+#
+#   ce = load_engine("engines/OB_STR_ENGINE_V2_3.json")   # CompiledEngine
+#   simmod.simulate(ce)   # runs off ce.params(); ce.engine is the plain dict
+
+import os, sys, json, time, shutil, hashlib, marshal
+from datetime import datetime, timezone
+from pathlib import Path
+
+RUNNER_PATH = Path(__file__).resolve().parent / "run_suite_full_V23.py"
+REPO_ROOT = RUNNER_PATH.parent.parent
+# the month loop, the CSV / rollup sinks, the T-* checks and the vectorized engine:
+# an edit to any of them can change cached rows, CSV bytes or test results
+RUNNER_MODULES = ("run_suite_full_V23.py", "sinks_V23.py", "analytics_V23.py", "batch_V23.py")
+DEFAULT_CACHE_DIR = REPO_ROOT / ".cache" / "v2_3"
+DEFAULT_MAX_MB = 512
+MANIFEST_TEMPLATE = REPO_ROOT / "V2_3_MVP_Manifest.template.json"
+
+def canonical_json(e):
+    return json.dumps(e, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+def sha256_bytes(b):
+    return hashlib.sha256(b).hexdigest()
+
+def sha256_file(p):
+    h = hashlib.sha256()
+    with Path(p).open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def engine_hash(e):
+    return sha256_bytes(canonical_json(e).encode("utf-8"))
+
+_module_hashes = None
+_runner_hash = None
+
+def module_hashes():
+    """{file name: sha256} for each of RUNNER_MODULES (hashed once per process)."""
+    global _module_hashes
+    if _module_hashes is None:
+        _module_hashes = {name: sha256_file(RUNNER_PATH.parent / name) for name in RUNNER_MODULES}
+    return _module_hashes
+
+def runner_hash():
+    """One hash over RUNNER_MODULES' sources: changes when any of them does."""
+    global _runner_hash
+    if _runner_hash is None:
+        _runner_hash = sha256_bytes("".join(f"{k}:{v}\n" for k, v in module_hashes().items()).encode("ascii"))
+    return _runner_hash
+
+def cache_key(e, mmax, money="float", ehash=None):
+    """``ehash``: engine_hash(e) when the caller already has it (CompiledEngine)."""
+    tag = f"{ehash or engine_hash(e)}:{runner_hash()}:{int(mmax)}" + ("" if money == "float" else f":{money}")
+    return sha256_bytes(tag.encode("ascii"))
+
+class CacheHit(dict):
+    """ResultCache.get(): {"meta", "dir"}, plus "rows" parsed from rows.json the first
+    time it is read (a CLI hit that only copies the stored CSVs never parses them)."""
+
+    def __missing__(self, k):
+        if k != "rows":
+            raise KeyError(k)
+        blob = json.loads((self["dir"] / "rows.json").read_text())
+        cols = blob["columns"]
+        rows = self["rows"] = [dict(zip(cols, r)) for r in blob["data"]]
+        return rows
+
+class ResultCache:
+    """On-disk store: <root>/<key[:2]>/<key>/{rows.json, meta.json, *.csv}."""
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = Path(root or os.getenv("OB_STR_CACHE_DIR", str(DEFAULT_CACHE_DIR)))
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("OB_STR_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+
+    def _dir(self, key):
+        return self.root / key[:2] / key
+
+    def get(self, key):
+        """Return a CacheHit {"rows", "meta", "dir"} or None; a hit refreshes the entry's
+        LRU stamp. "rows" is loaded on first access."""
+        d = self._dir(key)
+        try:
+            (d / "rows.json").stat()
+            meta = json.loads((d / "meta.json").read_text())
+        except (OSError, ValueError):
+            return None
+        now = time.time()
+        os.utime(d, (now, now))
+        return CacheHit(meta=meta, dir=d)
+
+    def put(self, key, rows, meta=None, files=None):
+        """Store rows (+ meta dict, + {name: path} files) atomically under key.
+
+        Streaming callers pass rows=None and hand over a pre-written "rows.json" in files.
+        """
+        d = self._dir(key)
+        tmp = d.with_name(d.name + f".tmp{os.getpid()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        if rows is not None:
+            cols = list(rows[0].keys()) if rows else []
+            (tmp / "rows.json").write_text(json.dumps({"columns": cols, "data": [[r[c] for c in cols] for r in rows]}))
+        (tmp / "meta.json").write_text(json.dumps(meta or {}))
+        for name, src in (files or {}).items():
+            shutil.copyfile(src, tmp / name)
+        shutil.rmtree(d, ignore_errors=True)
+        os.replace(tmp, d)
+        self.evict()
+        return d
+
+    def entries(self):
+        out = []
+        if not self.root.exists():
+            return out
+        for shard in self.root.iterdir():
+            if not shard.is_dir():
+                continue
+            for d in shard.iterdir():
+                if d.is_dir() and ".tmp" not in d.name:
+                    size = sum(f.stat().st_size for f in d.iterdir() if f.is_file())
+                    out.append((d.stat().st_mtime, size, d))
+        return out
+
+    def evict(self):
+        """Drop least-recently-used entries until the cache fits in max_bytes."""
+        ents = sorted(self.entries(), key=lambda x: x[0])
+        total = sum(s for _, s, _ in ents)
+        for _, size, d in ents:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(d, ignore_errors=True)
+            total -= size
+        return total
+
+def cached_simulate(e, mmax, cache=None, money="float"):
+    """simulate(e, mmax, money=money) through the cache; returns (rows, hit)."""
+    try:
+        from runner import run_suite_full_V23 as simmod
+    except ImportError:  # executed from inside runner/
+        import run_suite_full_V23 as simmod
+    cache = cache or ResultCache()
+    key = cache_key(e, mmax, money)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit["rows"], True
+    rows = simmod.simulate(e, mmax=mmax, money=money)
+    cache.put(key, rows)
+    return rows, False
+
+# -------- precompiled engines --------
+ENGINE_CACHE_FORMAT = 1
+
+class CompiledEngine:
+    """A loaded engine file: the dict, its Params record, engine_hash() and file sha256.
+
+    Anything that takes an engine accepts it (run_suite_full_V23.engine_params calls
+    ``params()``); use ``engine`` where a plain dict is needed.
+    """
+    __slots__ = ("path", "engine", "record", "engine_hash", "sha256", "cached")
+
+    def __init__(self, path, engine, record, engine_hash, sha256, cached=False):
+        self.path, self.engine, self.record = path, engine, record
+        self.engine_hash, self.sha256, self.cached = engine_hash, sha256, cached
+
+    def params(self):
+        return self.record
+
+    def __repr__(self):
+        return f"CompiledEngine({self.path.name}, {self.engine_hash[:12]}, cached={self.cached})"
+
+class EngineCache:
+    """<root>/engines/<sha256(resolved path)[:32]>.eng, one marshal blob per engine file."""
+
+    def __init__(self, root=None):
+        self.root = Path(root or os.getenv("OB_STR_CACHE_DIR", str(DEFAULT_CACHE_DIR))) / "engines"
+
+    def _file(self, path):
+        return self.root / (sha256_bytes(str(path).encode("utf-8"))[:32] + ".eng")
+
+    def _read(self, f):
+        try:
+            blob = marshal.loads(f.read_bytes())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        ok = (isinstance(blob, dict) and blob.get("format") == ENGINE_CACHE_FORMAT
+              and blob.get("python") == sys.version_info[:2] and blob.get("runner") == runner_hash())
+        return blob if ok else None
+
+    def _write(self, f, blob):
+        try:
+            f.parent.mkdir(parents=True, exist_ok=True)
+            tmp = f.with_name(f.name + f".tmp{os.getpid()}")
+            tmp.write_bytes(marshal.dumps(blob))
+            os.replace(tmp, f)
+        except OSError:
+            pass  # read-only cache dir: loads just don't get faster
+
+    def load(self, path):
+        """CompiledEngine for ``path`` (resolved like run_suite_full_V23.load_eng)."""
+        try:
+            from runner import run_suite_full_V23 as simmod
+        except ImportError:  # executed from inside runner/
+            import run_suite_full_V23 as simmod
+        path = simmod._find_engine(Path(path)).resolve()
+        st = path.stat()
+        stamp = [st.st_mtime_ns, st.st_size]
+        f = self._file(path)
+        blob = self._read(f)
+        if blob is not None and blob["stamp"] == stamp:
+            return self._compiled(simmod, path, blob, True)
+        raw = path.read_bytes()
+        sha = sha256_bytes(raw)
+        if blob is not None and blob["sha256"] == sha:
+            blob["stamp"] = stamp  # touched, not edited
+            self._write(f, blob)
+            return self._compiled(simmod, path, blob, True)
+        e = json.loads(raw)
+        blob = {"format": ENGINE_CACHE_FORMAT, "python": sys.version_info[:2], "runner": runner_hash(),
+                "stamp": stamp, "sha256": sha, "engine_hash": engine_hash(e), "engine": e,
+                "params": simmod.Params.from_engine(e).as_dict()}
+        self._write(f, blob)
+        return self._compiled(simmod, path, blob, False)
+
+    @staticmethod
+    def _compiled(simmod, path, blob, cached):
+        return CompiledEngine(path, blob["engine"], simmod.Params(**blob["params"]),
+                              blob["engine_hash"], blob["sha256"], cached)
+
+class _NoEngineCache(EngineCache):
+    def _read(self, f):
+        return None
+
+    def _write(self, f, blob):
+        pass
+
+def load_engine(path, cache=None):
+    """CompiledEngine for an engine file, through ``cache`` (an EngineCache by default).
+
+    OB_STR_ENGINE_CACHE=0 parses the file every time (nothing is read or written).
+    """
+    if cache is None:
+        cache = _NoEngineCache() if os.getenv("OB_STR_ENGINE_CACHE", "1") == "0" else EngineCache()
+    return cache.load(path)
+
+def write_manifest(out_path, engine_path, outputs, tests, template=MANIFEST_TEMPLATE, notes=None):
+    """Fill the V2_3 manifest template with real sha256 values and T-* results.
+
+    ``outputs`` maps manifest output names (monthly_csv, yoy_csv) to file paths;
+    ``tests`` maps test ids to "PASS"/"FAIL".
+    """
+    m = json.loads(Path(template).read_text()) if Path(template).exists() else {"version": "V2_3"}
+    m["created_at_utc"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    m["engine"] = {"path": Path(engine_path).name, "sha256": sha256_file(engine_path)}
+    m["runner"] = {"path": RUNNER_PATH.name, "sha256": module_hashes()[RUNNER_PATH.name],
+                   "modules": [{"path": k, "sha256": v} for k, v in module_hashes().items()]}
+    m["outputs"] = {k: {"path": Path(p).name, "sha256": sha256_file(p)} for k, p in outputs.items()}
+    m["tests"] = [{"id": k, "result": v} for k, v in tests.items()]
+    if notes is not None:
+        m["notes"] = notes
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(m, indent=2))
+    return out_path
@@ -0,0 +1,217 @@
+# ledger_V23.py — per-unit monthly ledger in a chunked, compressed columnar file
+#
+#   w = LedgerWriter("runner/V2_3_UnitLedger.obl")
+#   simmod.simulate(e, ledger=w)              # or: run_suite_full_V23.py --unit-ledger PATH
+#   w.close()
+#   r = LedgerReader("runner/V2_3_UnitLedger.obl")
+#   r.read(units=["U3"], months=(120, 180), columns=["Interest Portion"])
+#
+# One row per (month, owned unit), written incrementally. Layout:
+#
+#   MAGIC | chunk | chunk | ... | footer JSON | footer length (u64 LE) | MAGIC
+#
+# A chunk holds up to ``chunk_rows`` consecutive rows of one scenario; every column is
+# stored as its own zlib stream (floats byte-shuffled first, so the exponent bytes
+# compress together). The footer lists each chunk's scenario, month and unit-code ranges
+# and the byte span of every column, plus the unit-ID dictionary (rows carry int32
+# codes, not strings). A reader seeks straight to the chunks and columns a query
+# needs; nothing else is read or decompressed.
+
+import os, json, zlib, struct
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"OBLEDG1\n"
+LEDGER_COLUMNS = [
+    "Price", "Gross Revenue", "Mgmt Expense", "CapEx Operating", "HOA", "Insurance", "Property Tax",
+    "Debt Service", "Scheduled Principal", "Interest Portion", "Ops Net", "Feeder Prepay",
+    "New Loan Principal", "Refi Draw", "Refi Costs", "Loan Balance (End)",
+]
+KEY_COLUMNS = ["month", "unit"]
+CHUNK_ROWS = 1 << 16
+
+def _shuffle(a):
+    b = np.ascontiguousarray(a).view(np.uint8).reshape(-1, a.dtype.itemsize)
+    return b.T.tobytes()
+
+def _unshuffle(raw, dtype, n):
+    size = np.dtype(dtype).itemsize
+    return np.frombuffer(raw, dtype=np.uint8).reshape(size, n).T.copy().view(dtype).reshape(n)
+
+class LedgerWriter:
+    """Incremental writer; feed one month at a time with ``month()``, then ``close()``.
+
+    Writes to <path>.tmp<pid> and renames on close, like the CSV sinks, so a failed run
+    leaves no partial ledger. Call ``scenario(name)`` before each run to store several
+    scenarios in one file (the default scenario is "base").
+    """
+
+    def __init__(self, path, chunk_rows=CHUNK_ROWS, level=6, meta=None):
+        self.path = Path(path)
+        self._tmp = self.path.with_name(self.path.name + f".tmp{os.getpid()}")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self._tmp.open("wb")
+        self._f.write(MAGIC)
+        self.chunk_rows = chunk_rows
+        self.level = level
+        self.meta = dict(meta or {})
+        self.units = []; self._code = {}
+        self.scenarios = []
+        self.chunks = []
+        self._buf = {c: [] for c in KEY_COLUMNS + LEDGER_COLUMNS}
+        self._n = 0
+        self._scn = None
+        self._codes = np.zeros(0, dtype=np.int32); self._codes_for = 0
+
+    def scenario(self, name):
+        self._flush()
+        self.scenarios.append(str(name)); self._scn = len(self.scenarios) - 1
+        self._codes = np.zeros(0, dtype=np.int32); self._codes_for = 0
+
+    def _unit_codes(self, ids, n):
+        # ids only ever grow within a run, so extend the cached code array as needed
+        if n > self._codes_for:
+            new = []
+            for uid in ids[self._codes_for:n]:
+                c = self._code.get(uid)
+                if c is None:
+                    c = self._code[uid] = len(self.units); self.units.append(uid)
+                new.append(c)
+            self._codes = np.concatenate([self._codes, np.array(new, dtype=np.int32)])
+            self._codes_for = n
+        return self._codes[:n]
+
+    def month(self, t, ids, cols):
+        """Rows for month ``t`` (1-based): ``ids`` are the owned units in order, ``cols``
+        maps each LEDGER_COLUMNS name to an array of len(ids)."""
+        if self._scn is None:
+            self.scenario("base")
+        n = len(ids)
+        if not n:
+            return
+        b = self._buf
+        b["month"].append(np.full(n, t, dtype=np.int32))
+        b["unit"].append(self._unit_codes(ids, n))
+        for c in LEDGER_COLUMNS:
+            b[c].append(np.asarray(cols[c], dtype=float))
+        self._n += n
+        if self._n >= self.chunk_rows:
+            self._flush()
+
+    def _flush(self):
+        if not self._n:
+            return
+        arrays = {c: np.concatenate(v) for c, v in self._buf.items()}
+        spans = {}
+        for c, a in arrays.items():
+            raw = zlib.compress(_shuffle(a), self.level)
+            spans[c] = [self._f.tell(), len(raw)]
+            self._f.write(raw)
+        m, u = arrays["month"], arrays["unit"]
+        self.chunks.append({"scenario": self._scn, "rows": self._n,
+                            "month_min": int(m.min()), "month_max": int(m.max()),
+                            "unit_min": int(u.min()), "unit_max": int(u.max()), "columns": spans})
+        self._buf = {c: [] for c in self._buf}
+        self._n = 0
+
+    def feed(self, row):
+        pass  # sink protocol (sinks_V23.run_stream): unit rows arrive via simulate(ledger=...)
+
+    def close(self):
+        if self._f is None:
+            return str(self.path)
+        self._flush()
+        footer = {"version": 1, "columns": KEY_COLUMNS + LEDGER_COLUMNS,
+                  "dtypes": {c: ("int32" if c in KEY_COLUMNS else "float64") for c in KEY_COLUMNS + LEDGER_COLUMNS},
+                  "units": self.units, "scenarios": self.scenarios, "chunks": self.chunks, "meta": self.meta}
+        blob = json.dumps(footer, separators=(",", ":")).encode("utf-8")
+        self._f.write(blob); self._f.write(struct.pack("<Q", len(blob))); self._f.write(MAGIC)
+        self._f.close(); self._f = None
+        os.replace(self._tmp, self.path)
+        return str(self.path)
+
+    def abort(self):
+        if self._f is not None:
+            self._f.close(); self._f = None
+            self._tmp.unlink(missing_ok=True)
+
+class LedgerReader:
+    """Random-access reader: only the footer is parsed on open."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with self.path.open("rb") as f:
+            f.seek(-(len(MAGIC) + 8), os.SEEK_END)
+            n = struct.unpack("<Q", f.read(8))[0]
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a unit ledger")
+            f.seek(-(len(MAGIC) + 8 + n), os.SEEK_END)
+            self.footer = json.loads(f.read(n))
+        self.units = self.footer["units"]
+        self.scenarios = self.footer["scenarios"]
+        self.columns = self.footer["columns"]
+        self.chunks = self.footer["chunks"]
+        self.meta = self.footer.get("meta", {})
+
+    def __len__(self):
+        return sum(c["rows"] for c in self.chunks)
+
+    def read(self, columns=None, units=None, months=None, scenario=None):
+        """{column: array} for the matching rows (always including "month" and "unit").
+
+        ``units``: unit IDs ("U3") or codes; ``months``: inclusive (lo, hi), either end
+        may be None; ``scenario``: name or index (default: every scenario, in which case
+        a "scenario" code column is added).
+        """
+        cols = [c for c in self.columns if c not in KEY_COLUMNS] if columns is None else list(columns)
+        unknown = [c for c in cols if c not in self.columns]
+        if unknown:
+            raise KeyError(f"unknown ledger columns: {unknown}")
+        ucodes = None
+        if units is not None:
+            lookup = {u: i for i, u in enumerate(self.units)}
+            ucodes = np.array(sorted({u if isinstance(u, (int, np.integer)) else lookup.get(u, -1) for u in units}), dtype=np.int32)
+        lo, hi = months if months is not None else (None, None)
+        scn = self.scenarios.index(scenario) if isinstance(scenario, str) else scenario
+        want = KEY_COLUMNS + [c for c in cols if c not in KEY_COLUMNS]
+        parts = {c: [] for c in want}; scn_part = []
+        with self.path.open("rb") as f:
+            for ch in self.chunks:
+                if scn is not None and ch["scenario"] != scn: continue
+                if lo is not None and ch["month_max"] < lo: continue
+                if hi is not None and ch["month_min"] > hi: continue
+                if ucodes is not None and not ((ucodes >= ch["unit_min"]) & (ucodes <= ch["unit_max"])).any(): continue
+                key = {c: self._column(f, ch, c) for c in KEY_COLUMNS}
+                mask = np.ones(ch["rows"], dtype=bool)
+                if lo is not None: mask &= key["month"] >= lo
+                if hi is not None: mask &= key["month"] <= hi
+                if ucodes is not None: mask &= np.isin(key["unit"], ucodes)
+                if not mask.any(): continue
+                full = mask.all()
+                for c in want:
+                    a = key[c] if c in key else self._column(f, ch, c)
+                    parts[c].append(a if full else a[mask])
+                scn_part.append(np.full(int(mask.sum()), ch["scenario"], dtype=np.int32))
+        out = {c: (np.concatenate(v) if v else np.zeros(0, dtype=self.footer["dtypes"][c])) for c, v in parts.items()}
+        if scn is None and len(self.scenarios) > 1:
+            out["scenario"] = np.concatenate(scn_part) if scn_part else np.zeros(0, dtype=np.int32)
+        return out
+
+    def _column(self, f, ch, c):
+        off, size = ch["columns"][c]
+        f.seek(off)
+        return _unshuffle(zlib.decompress(f.read(size)), self.footer["dtypes"][c], ch["rows"])
+
+    def to_pandas(self, **query):
+        """read() as a DataFrame with YYYY-MM labels and categorical UnitID."""
+        import pandas as pd
+        d = self.read(**query)
+        m = d.pop("month"); u = d.pop("unit")
+        df = pd.DataFrame({"YYYY-MM": [f"Y{(t-1)//12+1}-{(t-1)%12+1:02d}" for t in m.tolist()],
+                           "UnitID": pd.Categorical.from_codes(u, categories=self.units)})
+        if "scenario" in d:
+            df.insert(0, "Scenario", pd.Categorical.from_codes(d.pop("scenario"), categories=self.scenarios))
+        for c, v in d.items():
+            df[c] = v
+        return df
@@ -0,0 +1,269 @@
+# montecarlo_V23.py — seeded Monte Carlo over ADR, occupancy and appreciation paths
+#
+#   python runner/montecarlo_V23.py --paths 10000 [--seed 7] [--months 240] \
+#       [--stochastic spec.json] [--percentiles 5,25,50,75,95] [--out runner/V2_3_MonteCarlo.csv]
+#
+# The engine gains an optional top-level "stochastic" section (read next to "market" /
+# "portfolio", like simulate() does); --stochastic FILE supplies or replaces it:
+#
+#   "stochastic": {
+#     "seed": 7,
+#     "adr":          {"model": "gbm", "drift": 0.02, "vol": 0.10},
+#     "occupancy":    {"model": "ou",  "reversion": 2.0, "vol": 0.06, "min": 0.30, "max": 0.95},
+#     "appreciation": {"model": "gbm", "drift": 0.03, "vol": 0.05}
+#   }
+#
+# Models: "fixed" (the engine value, the default for a missing process), "gbm"
+# (lognormal growth at annual ``drift`` whose mean tracks (1+drift)**years) and "ou"
+# (mean-reverting level around ``mean``, default the engine baseline, clipped to
+# [min, max] every month, so a clipped month is where the next one reverts from). ADR and occupancy paths start at the engine baselines; appreciation is
+# the index multiplied into the parity price (1.0 in month one, like the scalar run).
+#
+# Paths are drawn in fixed blocks of BLOCK paths, one SeedSequence child per block, so
+# a path's inputs depend only on (seed, path index) — not on --workers or --chunk.
+# Each chunk runs through the vectorized batch engine and every block in it is folded
+# into its own fixed-size QuantileSketch per KPI; the block sketches are merged in block
+# order, so the bands too depend only on (seed, paths), not on how blocks were chunked.
+# Only the sketches (T x k each) cross process boundaries and no path is kept once its
+# chunk is summarised.
+
+import os, csv, math, argparse, json, time
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from runner import run_suite_full_V23 as simmod
+    from runner import batch_V23 as batch
+except ImportError:  # executed from inside runner/
+    import run_suite_full_V23 as simmod
+    import batch_V23 as batch
+
+KPI_COLUMNS = ["End Cash", "Units Owned", "Loan Balance (End)"]
+INTEGER_KPIS = {"Units Owned"}  # banded by nearest rank: P5 is a unit count, not 3.55
+PERCENTILES = (5, 25, 50, 75, 95)
+BLOCK = 256
+SKETCH_K = 501  # rank resolution ~1/k per month
+DEFAULT_OUT = simmod.REPO_ROOT / "runner" / "V2_3_MonteCarlo.csv"
+
+# -------- streaming quantiles --------
+class QuantileSketch:
+    """Fixed-size quantile summary of T monthly columns over a stream of paths.
+
+    Each month keeps k sample values at the mid-ranks (i+0.5)/k of everything seen so
+    far, each standing for n/k paths, plus the path count and running sum (for the mean).
+    ``add`` summarises a (paths, T) block; ``merge`` pools two sketches' points with their
+    weights and re-picks the k mid-rank values, so memory stays T*k however many paths
+    stream in. Points are always real sample values, so atoms (0 cash, whole units) and
+    gaps between outcomes survive merging.
+    """
+
+    def __init__(self, T, k=SKETCH_K):
+        self.k = k
+        self.q = np.zeros((T, k))
+        self.n = 0
+        self.total = np.zeros(T)
+
+    def add(self, X):
+        X = np.asarray(X, dtype=float)
+        n = len(X)
+        if not n:
+            return self
+        s = QuantileSketch(X.shape[1], self.k)
+        idx = ((np.arange(self.k) + 0.5) * n / self.k).astype(np.int64)
+        s.q = np.sort(X, axis=0)[idx].T.copy()
+        s.n = n; s.total = X.sum(axis=0)
+        return self.merge(s)
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.q = other.q.copy(); self.n = other.n; self.total = other.total.copy()
+            return self
+        T, k = self.q.shape
+        v = np.concatenate([self.q, other.q], axis=1)
+        w = np.concatenate([np.full(k, self.n/k), np.full(k, other.n/k)])
+        o = np.argsort(v, axis=1, kind="stable")
+        v = np.take_along_axis(v, o, axis=1)
+        cum = np.cumsum(w[o], axis=1)
+        N = self.n + other.n
+        tgt = np.broadcast_to((np.arange(k) + 0.5) * N / k, (T, k))
+        # one searchsorted for all months: shift each month's ranks into its own band
+        off = np.arange(T)[:, None] * (2.0*N + 1)
+        j = np.searchsorted((cum + off).ravel(), (tgt + off).ravel(), side="right")
+        j = np.minimum(j.reshape(T, k) - np.arange(T)[:, None]*2*k, 2*k - 1)
+        self.q = np.take_along_axis(v, j, axis=1)
+        self.n = N; self.total = self.total + other.total
+        return self
+
+    def quantile(self, p, nearest=False):
+        """(T,) values at probability p in [0, 1], linear between mid-ranks; with
+        ``nearest`` the sample value at the nearest mid-rank (for integer columns)."""
+        if nearest:
+            return self.q[:, min(max(int(math.floor(p*self.k)), 0), self.k - 1)].copy()
+        f = min(max(p*self.k - 0.5, 0.0), self.k - 1.0)
+        i = int(f); frac = f - i
+        if i + 1 >= self.k:
+            return self.q[:, -1].copy()
+        return self.q[:, i] + (self.q[:, i+1] - self.q[:, i])*frac
+
+    def mean(self):
+        return self.total/self.n if self.n else np.full(len(self.total), np.nan)
+
+# -------- stochastic inputs --------
+def stochastic_spec(e, override=None):
+    spec = dict(e.get("stochastic", {}))
+    spec.update(override or {})
+    return spec
+
+def _process(cfg, base, z, lo=-math.inf, hi=math.inf):
+    # Monthly path (paths, T) from standard normals z; month one is ``base``.
+    cfg = cfg or {}
+    model = cfg.get("model", "fixed")
+    n, T = z.shape
+    if model == "fixed":
+        return np.full((n, T), float(base))
+    vol = float(cfg.get("vol", 0.0))
+    lo = cfg.get("min", lo); hi = cfg.get("max", hi)
+    if model == "gbm":
+        step = math.log1p(float(cfg.get("drift", 0.0)))/12.0 - vol*vol/24.0
+        inc = step + vol/math.sqrt(12.0)*z
+        inc[:, 0] = 0.0
+        x = base*np.exp(np.cumsum(inc, axis=1))
+    elif model == "ou":
+        mean = float(cfg.get("mean", base)); kappa = float(cfg.get("reversion", 1.0))/12.0
+        sd = vol/math.sqrt(12.0)
+        x = np.empty((n, T)); x[:, 0] = min(max(base, lo), hi)
+        for t in range(1, T):
+            x[:, t] = np.clip(x[:, t-1] + kappa*(mean - x[:, t-1]) + sd*z[:, t], lo, hi)
+        return x
+    else:
+        raise ValueError(f"unknown stochastic model {model!r}")
+    return np.clip(x, lo, hi)
+
+def draw_paths(e, spec, seed_seq, n, mmax):
+    """ADR / OCC (and APP_F unless appreciation is fixed) arrays (n, mmax) for one block;
+    all three normals are always drawn, so switching one process on or off never shifts
+    another's draws."""
+    P = batch.stack_params([e])
+    rng = np.random.default_rng(seed_seq)
+    z_adr = rng.standard_normal((n, mmax))
+    z_occ = rng.standard_normal((n, mmax))
+    z_app = rng.standard_normal((n, mmax))
+    app_cfg = dict(spec.get("appreciation") or {})
+    if app_cfg.get("model", "fixed") == "gbm":
+        app_cfg.setdefault("drift", float(P["APP"][0]))
+    paths = {
+        "ADR": _process(spec.get("adr"), P["ADR"][0], z_adr, lo=0.0),
+        "OCC": _process(spec.get("occupancy"), P["OCC"][0], z_occ, lo=0.0, hi=1.0),
+    }
+    if app_cfg.get("model", "fixed") != "fixed":
+        paths["APP_F"] = _process(app_cfg, 1.0, z_app, lo=0.0)
+    # fixed appreciation: no APP_F path, the batch engine's own tables match the scalar run
+    return paths
+
+# -------- workers --------
+_BASE = None
+
+def _init_worker(base):
+    global _BASE
+    _BASE = base
+
+def _run_chunk(args):
+    blocks, spec, mmax, k = args
+    draws = [draw_paths(_BASE, spec, ss, n, mmax) for _, ss, n in blocks]
+    paths = {key: np.concatenate([d[key] for d in draws]) for key in draws[0]}
+    S = sum(n for _, _, n in blocks)
+    res = batch.simulate_batch([_BASE]*S, mmax=mmax, record=KPI_COLUMNS, paths=paths)
+    out = []; lo = 0
+    for b, _, n in blocks:  # one sketch per block: the chunk layout never reaches the bands
+        out.append((b, {c: QuantileSketch(mmax, k).add(res.columns[c][lo:lo+n]) for c in KPI_COLUMNS}))
+        lo += n
+    return out
+
+def run_montecarlo(base, n_paths, mmax=simmod.MAX_MONTHS, seed=None, spec=None, workers=None, chunk=2048, k=SKETCH_K):
+    """Simulate ``n_paths`` stochastic paths; returns {"labels", "n", "seed", "sketches"}."""
+    spec = stochastic_spec(base, spec)
+    seed = int(spec.get("seed", 0) if seed is None else seed)
+    n_blocks = -(-n_paths // BLOCK)
+    children = np.random.SeedSequence(seed).spawn(n_blocks)
+    blocks = [(b, children[b], min(BLOCK, n_paths - b*BLOCK)) for b in range(n_blocks)]
+    per = max(1, chunk // BLOCK)
+    jobs = [(blocks[i:i+per], spec, mmax, k) for i in range(0, n_blocks, per)]
+
+    sketches = {c: QuantileSketch(mmax, k) for c in KPI_COLUMNS}
+    def collect(results):
+        # map() preserves job order and each job lists its blocks in order, so blocks are
+        # merged 0, 1, 2, ... whatever the chunk size or worker count
+        for per_block in results:
+            for _, sk in per_block:
+                for c in KPI_COLUMNS:
+                    sketches[c].merge(sk[c])
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        _init_worker(base)
+        collect(map(_run_chunk, jobs))
+    else:
+        from concurrent.futures import ProcessPoolExecutor  # only multi-worker runs pay for it
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(base,)) as pool:
+            collect(pool.map(_run_chunk, jobs))
+    labels = [f"Y{t//12+1}-{t%12+1:02d}" for t in range(mmax)]
+    return {"labels": labels, "n": n_paths, "seed": seed, "sketches": sketches}
+
+def bands(mc, percentiles=PERCENTILES):
+    """{column: {"P5": (T,), ..., "Mean": (T,)}}"""
+    out = {}
+    for c, sk in mc["sketches"].items():
+        b = {f"P{p:g}": sk.quantile(p/100.0, nearest=c in INTEGER_KPIS) for p in percentiles}
+        b["Mean"] = sk.mean()
+        out[c] = b
+    return out
+
+def write_bands_csv(mc, path, percentiles=PERCENTILES):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    bd = bands(mc, percentiles)
+    cols = [(c, s) for c in KPI_COLUMNS for s in bd[c]]
+    with path.open("w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["YYYY-MM"] + [f"{c} {s}" for c, s in cols])
+        for t, lab in enumerate(mc["labels"]):
+            w.writerow([lab] + [round(float(bd[c][s][t]), 2) for c, s in cols])
+    return path
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Monte Carlo percentile bands for the V2_3 engine.")
+    ap.add_argument("--engine", default=os.getenv("ENGINE_PATH", str(simmod.DEFAULT_ENGINE)))
+    ap.add_argument("--stochastic", default=None, help="JSON file with the stochastic section")
+    ap.add_argument("--paths", type=int, default=10000)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--months", type=int, default=int(os.getenv("MAX_MONTHS", simmod.MAX_MONTHS)))
+    ap.add_argument("--percentiles", default=",".join(str(p) for p in PERCENTILES))
+    ap.add_argument("--out", default=os.getenv("OUT_MONTECARLO", str(DEFAULT_OUT)))
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--chunk", type=int, default=2048)
+    ap.add_argument("--sketch-k", type=int, default=SKETCH_K, help="points kept per month per KPI")
+    a = ap.parse_args(argv)
+
+    base = simmod.load_eng(Path(a.engine))
+    override = None
+    if a.stochastic:
+        override = json.loads(Path(a.stochastic).read_text())
+        override = override.get("stochastic", override)
+    pcts = [float(p) for p in a.percentiles.split(",") if p.strip()]
+    print("ENGINE:", a.engine)
+    print(f"PATHS: {a.paths}  MONTHS: {a.months}  WORKERS: {a.workers or os.cpu_count()}")
+    t0 = time.perf_counter()
+    mc = run_montecarlo(base, a.paths, mmax=a.months, seed=a.seed, spec=override, workers=a.workers, chunk=a.chunk, k=a.sketch_k)
+    p = write_bands_csv(mc, a.out, pcts)
+    print(f"SEED: {mc['seed']}")
+    bd = bands(mc, pcts)
+    for c in KPI_COLUMNS:
+        print(f"{c} @ {mc['labels'][-1]}: " + "  ".join(f"{s}={bd[c][s][-1]:,.2f}" for s in bd[c]))
+    print(f"OUT: {p}  ({time.perf_counter()-t0:.2f}s)")
+    print("DONE")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# overrides_V23.py — layered engine overrides (base engine + sparse dotted-path deltas)
+#
+#   base = simmod.load_eng(simmod.DEFAULT_ENGINE)
+#   hi = Overlay(base, {"constants.debt.mortgageRate": 0.085})
+#   hi_adr = hi.derive({"constants.operations.adrBaseline2BR": 300})   # shares hi's delta
+#   simmod.simulate(hi_adr)                  # runs straight off the compiled Params record
+#   hi_adr.materialize()                     # plain engine dict, for hashing / JSON export
+#
+#   S = ScenarioSet(base, ["constants.debt.mortgageRate"], np.linspace(0.05, 0.09, 100_000))
+#   S[17]                                    # Overlay for scenario 17, built on demand
+#
+# An Overlay never copies or mutates its base: it stores only its own deltas and a link
+# to its parent. materialize() copies just the dicts on the changed paths (everything
+# else is shared with the base), and params() compiles the layered view once into the
+# slotted run_suite_full_V23.Params record the month loops read. A ScenarioSet keeps S
+# scenarios as one (S, P) value array, i.e. 8*S*P bytes of deltas. Every path must
+# already exist in the root engine: an unknown one is a ValueError, never a new key.
+
+import numpy as np
+
+try:
+    from runner import run_suite_full_V23 as simmod
+    from runner import cache_V23 as rcache
+except ImportError:  # executed from inside runner/
+    import run_suite_full_V23 as simmod
+    import cache_V23 as rcache
+
+_MISSING = object()
+
+def _lookup(d, keys, default=_MISSING):
+    cur = d
+    for k in keys:
+        if not isinstance(cur, dict) or k not in cur:
+            return default
+        cur = cur[k]
+    return cur
+
+def check_path(root, path):
+    """ValueError unless dotted ``path`` names an existing key of the engine ``root``."""
+    keys = path.split(".")
+    cur = root
+    for i, k in enumerate(keys):
+        if not isinstance(cur, dict) or k not in cur:
+            raise ValueError(f"unknown engine path {path!r}: no {'.'.join(keys[:i+1])!r} in the base engine")
+        cur = cur[k]
+
+class Overlay:
+    """Read-only engine view: ``base`` (an engine dict or another Overlay) + ``delta``.
+    Delta paths are checked against the root engine (check_path) when the layer is made."""
+    __slots__ = ("root", "parent", "delta", "_deltas", "_engine", "_params")
+
+    def __init__(self, base, delta=None):
+        if isinstance(base, Overlay):
+            self.root, self.parent = base.root, base
+        else:
+            self.root, self.parent = base, None
+        self.delta = dict(delta or {})
+        for path in self.delta:
+            check_path(self.root, path)
+        self._deltas = self._engine = self._params = None
+
+    def derive(self, delta):
+        """Child overlay adding ``delta`` on top of this one."""
+        return Overlay(self, delta)
+
+    def deltas(self):
+        """Every override from the root down, as one {dotted path: value} dict."""
+        if self._deltas is None:
+            d = dict(self.parent.deltas()) if self.parent is not None else {}
+            for k in self.delta:
+                d.pop(k, None)  # re-set paths move to the end, so later layers apply last
+            d.update(self.delta)
+            self._deltas = d
+        return self._deltas
+
+    def get(self, path, default=None):
+        v = _lookup(self.materialize() if self.delta or self.parent is not None else self.root, path.split("."))
+        return default if v is _MISSING else v
+
+    def materialize(self):
+        """Engine dict with the overrides applied; untouched sub-dicts are the base's own."""
+        if self._engine is None:
+            out = dict(self.root)
+            copied = {id(out)}
+            for path, v in self.deltas().items():
+                keys = path.split(".")
+                cur = out
+                for k in keys[:-1]:
+                    nxt = cur.get(k)
+                    if not isinstance(nxt, dict):  # an earlier override replaced this section
+                        raise ValueError(f"engine path {path!r} runs through a non-dict override")
+                    if id(nxt) not in copied:
+                        nxt = dict(nxt)
+                    copied.add(id(nxt))
+                    cur[k] = nxt
+                    cur = nxt
+                cur[keys[-1]] = v
+            self._engine = out
+        return self._engine
+
+    def params(self):
+        if self._params is None:
+            self._params = simmod.Params.from_engine(self.materialize())
+        return self._params
+
+    def engine_hash(self):
+        """Same digest as cache_V23.engine_hash of the materialized engine."""
+        return rcache.engine_hash(self.materialize())
+
+    def __repr__(self):
+        return f"Overlay({len(self.deltas())} overrides)"
+
+class ScenarioSet:
+    """``len(values)`` scenarios over one base engine, each overriding the same ``paths``.
+
+    ``values`` is an (S, P) array (or (S,) for a single path). Paths whose base value is
+    an int stay integral (maxLoans, amortizationYears, ...) when the value is whole.
+    """
+
+    def __init__(self, base, paths, values):
+        self.base = base
+        self.paths = list(paths)
+        self.values = np.asarray(values, dtype=float).reshape(-1, len(self.paths))
+        ref = base if isinstance(base, Overlay) else Overlay(base)
+        for path in self.paths:
+            check_path(ref.root, path)
+        self._integral = [isinstance(ref.get(p), int) for p in self.paths]
+
+    def __len__(self):
+        return len(self.values)
+
+    def delta(self, i):
+        return {p: (int(v) if integral and float(v).is_integer() else v)
+                for p, v, integral in zip(self.paths, self.values[i].tolist(), self._integral)}
+
+    def __getitem__(self, i):
+        return Overlay(self.base, self.delta(i))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def nbytes(self):
+        return self.values.nbytes
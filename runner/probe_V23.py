@@ -0,0 +1,82 @@
+# probe_V23.py — opt-in instrumentation for simulate()
+#
+#   p = Probe()
+#   rows = simmod.simulate(e, probe=p)
+#   p.report()   # {"timers": {phase: {"seconds", "calls", "share"}}, "counters": {...}, ...}
+#
+# The month loop calls ``lap(phase)`` at each phase boundary, which charges the time
+# since the previous lap to that phase — one perf_counter() per boundary, no context
+# managers. Phases: setup, ops (per-unit operations + scheduled amortization), gate
+# (purchase gate incl. the pro-forma pmt), feeder (target selection + prepay), emit
+# (time outside the generator: row building, rounding and every downstream sink),
+# idle_span (event-driven jumps). Without a probe the loop only tests one local bool.
+#
+# Hooks are callables ``hook(event, data)`` for custom probes. Events: "month"
+# {t, label, cash, units, balance}, "purchase" {t, unit, price, loan}, "prepay"
+# {t, unit, amount}, "span" {t, k}. Data dicts are only built when a hook is attached.
+
+import json, time
+from pathlib import Path
+
+class NullProbe:
+    """Disabled probe: every method is a no-op (simulate() checks ``enabled`` once)."""
+    enabled = False
+    hooks = ()
+
+    def begin(self): pass
+    def lap(self, phase): pass
+    def count(self, name, n=1): pass
+    def event(self, name, **data): pass
+    def report(self): return {}
+
+NULL = NullProbe()
+
+class Probe:
+    """Per-phase timers, counters and hooks for one (or several consecutive) runs."""
+    enabled = True
+
+    def __init__(self, hooks=(), clock=time.perf_counter):
+        self.hooks = list(hooks)
+        self.clock = clock
+        self.timers = {}
+        self.counters = {}
+        self._t = None
+
+    def add_hook(self, fn):
+        self.hooks.append(fn)
+        return fn
+
+    def begin(self):
+        self._t = self.clock()
+
+    def lap(self, phase):
+        now = self.clock()
+        rec = self.timers.get(phase)
+        if rec is None:
+            rec = self.timers[phase] = [0.0, 0]
+        if self._t is not None:
+            rec[0] += now - self._t
+        rec[1] += 1
+        self._t = now
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def event(self, name, **data):
+        for h in self.hooks:
+            h(name, data)
+
+    def report(self):
+        total = sum(s for s, _ in self.timers.values())
+        timers = {k: {"seconds": s, "calls": c, "share": (s/total if total else 0.0)}
+                  for k, (s, c) in sorted(self.timers.items(), key=lambda kv: -kv[1][0])}
+        rows = self.counters.get("rows_emitted", 0)
+        return {"total_seconds": total, "rows_per_second": (rows/total if total else None),
+                "timers": timers, "counters": dict(self.counters)}
+
+def write_report(probe, path, **extra):
+    """JSON report (plus any ``extra`` keys, e.g. engine / months) at ``path``."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({**extra, **probe.report()}, indent=2))
+    return path
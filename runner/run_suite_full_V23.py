@@ -1,255 +1,1274 @@
-# run_suite_full_V23.py  — portable paths + small QoL
-
-import os, sys, json, csv, math
-from pathlib import Path
-from decimal import Decimal, ROUND_HALF_UP
-
-# -------- PATHS (portable) --------
-# Priority: CLI args -> ENV -> sane defaults
-def _argv_flag(name, default=None):
-    try:
-        ix = sys.argv.index(name)
-        return sys.argv[ix + 1]
-    except Exception:
-        return default
-
-REPO_ROOT = Path(__file__).resolve().parent.parent  # …/ob_str
-DEFAULT_ENGINE = REPO_ROOT / "engines" / "OB_STR_ENGINE_V2_3.json"
-DEFAULT_OUT_MONTHLY = REPO_ROOT / "runner" / "V2_3_Monthly.csv"
-DEFAULT_OUT_YOY     = REPO_ROOT / "runner" / "V2_3_YearOverYear.csv"
-
-ENGINE = Path(
-    _argv_flag("--engine",
-        os.getenv("ENGINE_PATH", str(DEFAULT_ENGINE))
-    )
-)
-OUT_MONTHLY = Path(
-    _argv_flag("--out-monthly",
-        os.getenv("OUT_MONTHLY", str(DEFAULT_OUT_MONTHLY))
-    )
-)
-OUT_YOY = Path(
-    _argv_flag("--out-yoy",
-        os.getenv("OUT_YOY", str(DEFAULT_OUT_YOY))
-    )
-)
-
-MAX_MONTHS = int(os.getenv("MAX_MONTHS", "240"))
-
-def cents(x):
-    return Decimal(str(x)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
-def pmt(rate_m, nper, pv):
-    return -(rate_m*pv)/(1-(1+rate_m)**(-nper)) if rate_m!=0 else -(pv/nper)
-
-class Loan:
-    def __init__(self, unit_id, principal, rate_apr, term_years):
-        self.unit_id = unit_id
-        self.balance = float(principal)
-        self.rate_m  = float(rate_apr)/12.0
-        self.n_left  = int(term_years*12)
-        self.pmt_amt = -pmt(self.rate_m, self.n_left, self.balance) if self.balance>0 else 0.0
-
-    def accrue(self):
-        if self.balance <= 0 or self.n_left<=0:
-            return 0.0, 0.0, 0.0
-        interest = self.balance * self.rate_m
-        principal = max(min(self.pmt_amt - interest, self.balance), 0.0)
-        self.balance -= principal
-        self.n_left = max(self.n_left - 1, 0)
-        return self.pmt_amt, principal, interest
-
-    def prepay(self, amount):
-        amt = max(min(amount, self.balance), 0.0)
-        self.balance -= amt
-        # keep payment constant; shorten term
-        if self.balance>0 and self.rate_m>0 and self.pmt_amt>0:
-            r = self.rate_m; B = self.balance; P = self.pmt_amt
-            try:
-                n_est = -math.log(max(1 - r*B/P, 1e-12))/math.log(1+r)
-                self.n_left = max(int(math.ceil(n_est)), 0)
-            except Exception:
-                pass
-        else:
-            self.n_left = 0
-        return amt
-
-def _find_engine(p: Path) -> Path:
-    # Try exact, then repo-relative fallbacks
-    candidates = [
-        p,
-        DEFAULT_ENGINE,
-        REPO_ROOT / "OB_STR_ENGINE_V2_3.json",
-    ]
-    for c in candidates:
-        if c.exists():
-            return c
-    raise FileNotFoundError(f"Engine not found. Tried: {', '.join(str(c) for c in candidates)}")
-
-def load_eng(p: Path):
-    p = _find_engine(p)
-    return json.loads(p.read_text())
-
-def parity_price(ADR,OCC,HOA_Y,MGMT,CAPX,INS,TAX,TARGET):
-    g = ADR*365*OCC
-    numer = g - (g*(MGMT+CAPX) + HOA_Y)
-    denom = TARGET + INS + TAX
-    return max(numer/denom, 0.0)
-
-def simulate(e, mmax=MAX_MONTHS):
-    C=e["constants"]; cal=e["calendar"]; B=e.get("banking",{})
-    fin=C["financial"]; ops=C["operations"]; acq=C["acquisition"]; debt=C["debt"]; res=C["reserves"]
-    market = e.get("market", {}); portfolio = e.get("portfolio", {"maxLoans":7})
-
-    ADR=ops["adrBaseline2BR"]; OCC=ops["occupancyBaseline"]; MGMT=ops["mgmtPct"]; CAPX=ops["capexPct"]
-    HOA_Y0=ops["hoaAnnual"]; HOA_INF=ops.get("hoaInflationRate",0.0)
-    INS=ops["insuranceRate"]; TAX=ops["propertyTaxRate"]; TARGET=acq["targetYieldUnlevered"]
-    APP=market.get("annualAppreciation",0.03)
-
-    start_cash=fin["startingCash"]; annual_sav=fin["annualSavings"]; amort_yrs=fin["amortizationYears"]
-    RATE=debt["mortgageRate"]; CLOSE=acq["closingCostPct"]; DOWN1=acq["downPaymentFirst"]; DOWNN=acq["downPaymentSubsequent"]
-    rainyMonths=B.get("rainyCoverageMonths",0); CAPEX_M=res["capexMonthsTarget"]; mdays=cal["monthlyDays"]
-
-    y=1; m=1; HOA_Y=HOA_Y0
-    cash=start_cash; savings_in=annual_sav/12.0
-    units=[]; next_unit_id = 1; rows=[]
-
-    def parity(H): return parity_price(ADR,OCC,H,MGMT,CAPX,INS,TAX,TARGET)
-
-    for t in range(1, mmax+1):
-        if m==1 and t>1: HOA_Y *= (1+HOA_INF)
-        days=mdays[m-1]
-        price_par = parity(HOA_Y) * ((1+APP)**((y-1)+(m-1)/12.0))
-
-        ops_gross=ops_mgmt=ops_capex=ops_hoa=ops_ins=ops_tax=0.0
-        ds_total=interest_total=principal_total=0.0
-        for u in units:
-            gross=ADR*OCC*days; mgmt=gross*MGMT; capex_op=gross*CAPX
-            hoa=HOA_Y/12.0; ins=u["price"]*INS/12.0; tax=u["price"]*TAX/12.0
-            ops_gross+=gross; ops_mgmt+=mgmt; ops_capex+=capex_op; ops_hoa+=hoa; ops_ins+=ins; ops_tax+=tax
-            if u["loan"].balance>0 and u["loan"].n_left>0:
-                P,PR,IN = u["loan"].accrue()
-                ds_total+=P; principal_total+=PR; interest_total+=IN
-        ops_net = ops_gross - (ops_mgmt + ops_capex + ops_hoa + ops_ins + ops_tax + ds_total)
-        cash_prefeeder = cash + savings_in + ops_net
-
-        # ---- Purchase gate ----
-        purchase=False; pur_dp=pur_cl=pur_rainy=0.0; pur_total=0.0; new_loan_principal=0.0
-        if len(units) < portfolio.get("maxLoans",7) and price_par>0:
-            down_frac = DOWN1 if len(units)==0 else DOWNN
-            loan_pf = price_par*(1 - down_frac)
-            rate_m = RATE/12.0
-            ds_pf = -pmt(rate_m, amort_yrs*12, loan_pf)
-            hoa_pf = HOA_Y/12.0
-            pur_dp = down_frac * price_par
-            pur_cl = CLOSE * price_par
-            pur_rainy = rainyMonths * (ds_pf + hoa_pf)
-            gate_req = pur_dp + pur_cl + pur_rainy
-            if cash_prefeeder >= gate_req:
-                cash_prefeeder -= gate_req
-                purchase=True; pur_total=gate_req; new_loan_principal=loan_pf
-                units.append({"id":f"U{next_unit_id}","price":price_par,"loan":Loan(f"U{next_unit_id}", loan_pf, RATE, amort_yrs)})
-                next_unit_id += 1
-
-        # ---- Feeder (post-purchase) ----
-        feeder=0.0
-        if len(units)>0:
-            feeder_eligible = max(cash_prefeeder, 0.0)
-            if feeder_eligible>0:
-                target = max(units, key=lambda u:u["loan"].balance)
-                feeder = target["loan"].prepay(min(feeder_eligible, target["loan"].balance))
-                cash_prefeeder -= feeder
-
-        end_cash = cash_prefeeder
-
-        rows.append({
-            "YYYY-MM": f"Y{y}-{m:02d}",
-            "UnitID": "TOTAL",
-            "Starting Cash": round(cash,2),
-            "Savings In": round(savings_in,2),
-            "Gross Revenue": round(ops_gross,2),
-            "Mgmt Expense": round(ops_mgmt,2),
-            "CapEx Operating": round(ops_capex,2),
-            "HOA": round(ops_hoa,2),
-            "Insurance": round(ops_ins,2),
-            "Property Tax": round(ops_tax,2),
-            "Debt Service (Total)": round(ds_total,2),
-            "Scheduled Principal": round(principal_total,2),
-            "Interest Portion": round(interest_total,2),
-            "Ops Net": round(ops_net,2),
-            "Feeder Prepay": round(feeder,2),
-            "Purchase: Down Payment": round(pur_dp,2),
-            "Purchase: Closing Costs": round(pur_cl,2),
-            "Purchase: Initial Rainy Funding": round(pur_rainy,2),
-            "Purchase Out (Total)": round(pur_total,2),
-            "New Loan Principal": round(new_loan_principal,2),
-            "Loan Balance (End)": round(sum(u["loan"].balance for u in units),2),
-            "End Cash": round(end_cash,2),
-            "Units Owned": len(units)
-        })
-
-        cash = end_cash
-        m += 1
-        if m>12: m=1; y+=1
-    return rows
-
-if __name__ == "__main__":
-    print("CWD:", os.getcwd())
-    print("ENGINE:", ENGINE)
-    print("OUT_MONTHLY:", OUT_MONTHLY)
-    print("OUT_YOY:", OUT_YOY)
-
-    e = load_eng(ENGINE)
-    rows = simulate(e, mmax=MAX_MONTHS)
-
-    # ---- Tests ----
-    # T-DS-1: DS > 0 after purchase
-    ds_pos=False; purchase_seen=False
-    for r in rows:
-        if r["Purchase Out (Total)"]>0: purchase_seen=True
-        elif purchase_seen and r["Debt Service (Total)"]>0: ds_pos=True; break
-    assert ds_pos, "T-DS-1 FAIL: no DS>0 after purchase"
-
-    # T-AMORT-1: prev_end - principal - feeder + new_loan == curr_end (±0.01)
-    for i in range(1,len(rows)):
-        prev, curr = rows[i-1], rows[i]
-        lhs = cents(prev["Loan Balance (End)"]) - cents(curr["Scheduled Principal"]) - cents(curr["Feeder Prepay"]) + cents(curr.get("New Loan Principal",0.0))
-        rhs = cents(curr["Loan Balance (End)"])
-        assert abs(lhs - rhs) <= Decimal("0.01"), f"T-AMORT-1 FAIL {curr['YYYY-MM']} lhs={lhs} rhs={rhs}"
-
-    # T-CASH-1: Cash identity
-    for r in rows:
-        lhs = cents(r["End Cash"])
-        rhs = (cents(r["Starting Cash"]) + cents(r["Savings In"]) + cents(r["Ops Net"])
-              - cents(r["Feeder Prepay"]) - cents(r["Purchase Out (Total)"]))
-        assert abs(lhs - rhs) <= Decimal("0.01"), f"T-CASH-1 FAIL {r['YYYY-MM']}"
-
-    # ---- Write outputs
-    OUT_MONTHLY.parent.mkdir(parents=True, exist_ok=True)
-    OUT_YOY.parent.mkdir(parents=True, exist_ok=True)
-
-    if rows:
-        cols=list(rows[0].keys())
-        with OUT_MONTHLY.open("w",newline="") as f:
-            w=csv.DictWriter(f, fieldnames=cols); w.writeheader(); w.writerows(rows)
-
-        # YOY rollup
-        from collections import defaultdict
-        agg, last_by_year = defaultdict(lambda:{k:Decimal("0.00") for k in cols}), {}
-        for r in rows:
-            y=int(r["YYYY-MM"][1:].split("-")[0])
-            last_by_year[y]=r
-            for k,v in r.items():
-                if k in ["YYYY-MM","UnitID"]: continue
-                if isinstance(v,(int,float)): agg[y][k]+=Decimal(str(v))
-        out=[]
-        for y in sorted(agg.keys()):
-            a=agg[y]; last=last_by_year[y]
-            row={k:(float(a[k]) if isinstance(a[k],Decimal) else a[k]) for k in a}
-            row["YYYY-MM"]=f"Year {y}"; row["UnitID"]="TOTAL"
-            for k in ["End Cash","Loan Balance (End)"]:
-                row[k]=last[k]
-            out.append(row)
-        with OUT_YOY.open("w",newline="") as f:
-            w=csv.DictWriter(f, fieldnames=cols); w.writeheader(); w.writerows(out)
-    print("DONE")
+# run_suite_full_V23.py  — portable paths + small QoL
+
+import os, math, heapq, shutil, warnings
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+# -------- PATHS (portable) --------
+# Importing this module reads no argv or env: worker processes pay only for numpy and
+# the definitions below. The CLI (main) resolves CLI args -> ENV -> these defaults.
+REPO_ROOT = Path(__file__).resolve().parent.parent  # …/ob_str
+DEFAULT_ENGINE = REPO_ROOT / "engines" / "OB_STR_ENGINE_V2_3.json"
+DEFAULT_OUT_MONTHLY = REPO_ROOT / "runner" / "V2_3_Monthly.csv"
+DEFAULT_OUT_YOY     = REPO_ROOT / "runner" / "V2_3_YearOverYear.csv"
+
+MAX_MONTHS = 240  # default horizon; the CLIs take MAX_MONTHS / --months
+
+# Monthly row layout (order matters: it is the CSV header)
+MONTHLY_COLUMNS = [
+    "YYYY-MM", "UnitID", "Starting Cash", "Savings In", "Yield Income", "Gross Revenue", "Mgmt Expense",
+    "CapEx Operating", "HOA", "Insurance", "Property Tax", "Debt Service (Total)",
+    "Scheduled Principal", "Interest Portion", "Ops Net", "Feeder Prepay",
+    "Purchase: Down Payment", "Purchase: Closing Costs", "Purchase: Initial Rainy Funding",
+    "Purchase Out (Total)", "New Loan Principal", "Refi Draw", "Refi Costs", "Loan Balance (End)",
+    "End Cash", "Units Owned",
+]
+
+def cents(x):
+    from decimal import Decimal, ROUND_HALF_UP
+    return Decimal(str(x)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+def pmt(rate_m, nper, pv):
+    return -(rate_m*pv)/(1-(1+rate_m)**(-nper)) if rate_m!=0 else -(pv/nper)
+
+class Loan:
+    def __init__(self, unit_id, principal, rate_apr, term_years):
+        self.unit_id = unit_id
+        self.balance = float(principal)
+        self.rate_m  = float(rate_apr)/12.0
+        self.n_left  = int(term_years*12)
+        self.pmt_amt = -pmt(self.rate_m, self.n_left, self.balance) if self.balance>0 else 0.0
+
+    def accrue(self):
+        if self.balance <= 0 or self.n_left<=0:
+            return 0.0, 0.0, 0.0
+        interest = self.balance * self.rate_m
+        principal = max(min(self.pmt_amt - interest, self.balance), 0.0)
+        self.balance -= principal
+        self.n_left = max(self.n_left - 1, 0)
+        return self.pmt_amt, principal, interest
+
+    def prepay(self, amount):
+        amt = max(min(amount, self.balance), 0.0)
+        self.balance -= amt
+        # keep payment constant; shorten term
+        if self.balance>0 and self.rate_m>0 and self.pmt_amt>0:
+            r = self.rate_m; B = self.balance; P = self.pmt_amt
+            try:
+                n_est = -math.log(max(1 - r*B/P, 1e-12))/math.log(1+r)
+                self.n_left = max(int(math.ceil(n_est)), 0)
+            except Exception:
+                pass
+        else:
+            self.n_left = 0
+        return amt
+
+def _seqsum(a):
+    # Left-to-right sum like builtins.sum (0 for empty): np.add.accumulate is sequential,
+    # unlike np.sum's pairwise reduction, so totals stay bit-identical to a Python loop.
+    if len(a) <= SCALAR_BOOK_MAX:
+        s = 0
+        for v in a.tolist(): s += v
+        return s
+    return float(np.add.accumulate(a)[-1])
+
+# Up to this many loans a plain Python loop over the book beats the vectorized step
+# (NumPy's per-call overhead dominates tiny arrays); both paths give identical bits.
+SCALAR_BOOK_MAX = 48
+
+def _repsum(x, n):
+    """_seqsum of ``n`` copies of ``x`` (every unit earns/pays the same per-unit ops)."""
+    if n > SCALAR_BOOK_MAX:
+        return _seqsum(np.full(n, x))
+    s = 0
+    for _ in range(n): s += x
+    return s
+
+def _ops_sums(n, gross, mgmt, capex, hoa):
+    """_repsum of the four per-unit ops values, in one pass over a small book."""
+    if n > SCALAR_BOOK_MAX:
+        return _repsum(gross, n), _repsum(mgmt, n), _repsum(capex, n), _repsum(hoa, n)
+    g = mg = cx = h = 0
+    for _ in range(n):
+        g += gross; mg += mgmt; cx += capex; h += hoa
+    return g, mg, cx, h
+
+class LoanBook:
+    """All units' loans in contiguous arrays (unit order == purchase order).
+
+    Mirrors ``Loan`` exactly. ``accrue`` advances every loan in one vectorized step,
+    or in a Python loop for books of up to SCALAR_BOOK_MAX loans (the shipped engine's
+    seven), and keeps the total balance: accrue and add update it in place, a prepay
+    marks it for one re-sum.
+
+    A small book's accrue / prepay / largest work on plain Python lists of the balances,
+    terms, payments and rates (no NumPy scalar per element); reading ``balance`` or
+    ``n_left`` writes those lists back into the arrays first.
+    """
+
+    def __init__(self, capacity=8):
+        capacity = max(int(capacity), 1)
+        self.ids = []
+        self.n = 0
+        self._lists = None    # small book: [balance, n_left, pmt_amt, rate_m] as Python lists
+        self._stale = False   # the lists hold balance / n_left changes the arrays don't
+        self.price = np.zeros(capacity)
+        self._balance = np.zeros(capacity)
+        self.rate_m = np.zeros(capacity)
+        self._n_left = np.zeros(capacity, dtype=np.int64)
+        self.pmt_amt = np.zeros(capacity)
+        self.bought = np.zeros(capacity, dtype=np.int64)  # purchase month
+        self.opened = np.zeros(capacity, dtype=np.int64)  # month the current loan was written (purchase or refi)
+        self._total = 0
+        self.last = None  # per-loan (payment, principal, interest) arrays of the last accrue()
+
+    def __len__(self):
+        return self.n
+
+    # the arrays are handed out for reading and writing, so the small-book lists are
+    # written back and dropped first (rebuilt by the next _small())
+    @property
+    def balance(self):
+        self._release()
+        return self._balance
+
+    @balance.setter
+    def balance(self, a):
+        self._release()
+        self._balance = a
+
+    @property
+    def n_left(self):
+        self._release()
+        return self._n_left
+
+    @n_left.setter
+    def n_left(self, a):
+        self._release()
+        self._n_left = a
+
+    def _release(self):
+        if self._stale:
+            n = self.n
+            self._balance[:n] = self._lists[0]; self._n_left[:n] = self._lists[1]
+            self._stale = False
+        self._lists = None
+
+    def _small(self):
+        if self._lists is None:
+            n = self.n
+            self._lists = [self._balance[:n].tolist(), self._n_left[:n].tolist(),
+                           self.pmt_amt[:n].tolist(), self.rate_m[:n].tolist()]
+        return self._lists
+
+    def _grow(self):
+        cap = 2*len(self.balance)
+        for k in ("price", "balance", "rate_m", "n_left", "pmt_amt", "bought", "opened"):
+            a = getattr(self, k); b = np.zeros(cap, dtype=a.dtype); b[:self.n] = a[:self.n]
+            setattr(self, k, b)
+
+    def add(self, unit_id, price, principal, rate_apr, term_years, t=0):
+        if self.n == len(self.balance): self._grow()
+        i = self.n
+        loan = Loan(unit_id, principal, rate_apr, term_years)
+        self.ids.append(unit_id)
+        self.price[i] = price; self.balance[i] = loan.balance; self.rate_m[i] = loan.rate_m
+        self.n_left[i] = loan.n_left; self.pmt_amt[i] = loan.pmt_amt
+        self.bought[i] = t; self.opened[i] = t
+        self.n += 1
+        if self._total is not None: self._total += loan.balance  # appended: same as a re-sum
+        return i
+
+    def refinance(self, i, principal, rate_apr, term_years, t):
+        """Replace loan i with a new ``principal`` at today's rate and a full term."""
+        loan = Loan(self.ids[i], principal, rate_apr, term_years)
+        self.balance[i] = loan.balance; self.rate_m[i] = loan.rate_m
+        self.n_left[i] = loan.n_left; self.pmt_amt[i] = loan.pmt_amt
+        self.opened[i] = t; self._total = None
+
+    def accrue(self):
+        """Scheduled payment on every live loan; returns (payment, principal, interest) totals."""
+        n = self.n
+        if n <= SCALAR_BOOK_MAX:
+            return self._accrue_small(n)
+        bal = self.balance[:n]; nl = self.n_left[:n]; pm = self.pmt_amt[:n]
+        live = (bal>0) & (nl>0)
+        if not live.any():
+            self.last = None
+            return 0.0, 0.0, 0.0
+        interest = bal*self.rate_m[:n]
+        principal = np.maximum(np.minimum(pm - interest, bal), 0.0)
+        self.balance[:n] = np.where(live, bal - principal, bal)
+        self.n_left[:n] = np.where(live, np.maximum(nl - 1, 0), nl)
+        self._total = None
+        self.last = (np.where(live, pm, 0.0), np.where(live, principal, 0.0), np.where(live, interest, 0.0))
+        return tuple(_seqsum(a) for a in self.last)
+
+    def _accrue_small(self, n):
+        # Loan.accrue per unit, in unit order; totals and the new balance total are summed
+        # in the same order as the vectorized step
+        bal, nl, pm, rm = self._small()
+        ds_u = [0.0]*n; pr_u = [0.0]*n; it_u = [0.0]*n
+        ds = pr = it = 0.0; live = False; total = 0
+        for k in range(n):
+            b = bal[k]
+            if b > 0 and nl[k] > 0:
+                interest = b*rm[k]
+                principal = max(min(pm[k] - interest, b), 0.0)
+                b = bal[k] = b - principal
+                nl[k] = max(nl[k] - 1, 0)
+                ds += pm[k]; pr += principal; it += interest
+                ds_u[k] = pm[k]; pr_u[k] = principal; it_u[k] = interest
+                live = True
+            total += b
+        if not live:
+            self.last = None
+            return 0.0, 0.0, 0.0
+        self._stale = True
+        self._total = total
+        self.last = (ds_u, pr_u, it_u)
+        return ds, pr, it
+
+    def largest(self):
+        # first index of the max balance, like max(units, key=balance)
+        if self.n <= SCALAR_BOOK_MAX:
+            bal = self._small()[0]
+            return bal.index(max(bal))
+        return int(self._balance[:self.n].argmax())
+
+    def prepay(self, i, amount):
+        if self.n <= SCALAR_BOOK_MAX:
+            bal, nl, pm, rm = self._small(); self._stale = True
+        else:
+            bal, nl, pm, rm = self._balance, self._n_left, self.pmt_amt, self.rate_m
+        B0 = float(bal[i])
+        amt = max(min(amount, B0), 0.0)
+        B = B0 - amt
+        bal[i] = B
+        r = float(rm[i]); P = float(pm[i])
+        # keep payment constant; shorten term (same rule as Loan.prepay)
+        if B>0 and r>0 and P>0:
+            try:
+                n_est = -math.log(max(1 - r*B/P, 1e-12))/math.log(1+r)
+                nl[i] = max(int(math.ceil(n_est)), 0)
+            except Exception:
+                pass
+        else:
+            nl[i] = 0
+        self._total = None
+        return amt
+
+    def total_balance(self):
+        if self._total is None:
+            if self.n <= SCALAR_BOOK_MAX:
+                s = 0
+                for v in self._small()[0]: s += v
+                self._total = s
+            else:
+                self._total = _seqsum(self._balance[:self.n])
+        return self._total
+
+class SimState:
+    """Everything the month loop carries into month ``t`` (1-based): calendar counters,
+    HOA_Y, cash, the reserve balances and the loan book. ``to_dict``/``from_dict``
+    round-trip through JSON exactly (floats keep their repr), so a resumed run matches
+    the uninterrupted one.
+    """
+
+    def __init__(self, t, y, m, HOA_Y, cash, next_unit_id, units, rainy_res=0.0, capex_res=0.0):
+        self.t = t; self.y = y; self.m = m
+        self.HOA_Y = HOA_Y; self.cash = cash; self.next_unit_id = next_unit_id
+        self.units = units  # [{"id", "price", "balance", "rate_m", "n_left", "pmt_amt", "bought", "opened"}] in purchase order
+        self.rainy_res = rainy_res; self.capex_res = capex_res
+
+    @classmethod
+    def capture(cls, t, y, m, HOA_Y, cash, next_unit_id, book, rainy_res=0.0, capex_res=0.0):
+        n = book.n
+        units = [{"id": uid, "price": p, "balance": b, "rate_m": r, "n_left": k, "pmt_amt": a, "bought": tb, "opened": to}
+                 for uid, p, b, r, k, a, tb, to in zip(book.ids, book.price[:n].tolist(), book.balance[:n].tolist(),
+                                                       book.rate_m[:n].tolist(), book.n_left[:n].tolist(), book.pmt_amt[:n].tolist(),
+                                                       book.bought[:n].tolist(), book.opened[:n].tolist())]
+        return cls(t, y, m, float(HOA_Y), float(cash), next_unit_id, units, float(rainy_res), float(capex_res))
+
+    def loan_book(self, capacity=8):
+        book = LoanBook(max(capacity, len(self.units)))
+        for i, u in enumerate(self.units):
+            book.ids.append(u["id"])
+            book.price[i] = u["price"]; book.balance[i] = u["balance"]; book.rate_m[i] = u["rate_m"]
+            book.n_left[i] = u["n_left"]; book.pmt_amt[i] = u["pmt_amt"]
+            book.bought[i] = u.get("bought", 0); book.opened[i] = u.get("opened", 0)
+        book.n = len(self.units); book._total = None
+        return book
+
+    def to_dict(self):
+        return {"t": self.t, "y": self.y, "m": self.m, "HOA_Y": self.HOA_Y, "cash": self.cash,
+                "next_unit_id": self.next_unit_id, "units": [dict(u) for u in self.units],
+                "rainy_res": self.rainy_res, "capex_res": self.capex_res}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["t"], d["y"], d["m"], d["HOA_Y"], d["cash"], d["next_unit_id"], [dict(u) for u in d["units"]],
+                   d.get("rainy_res", 0.0), d.get("capex_res", 0.0))
+
+class RefiQueue:
+    """When each loan may next be cash-out refinanced: a heap of (month, version, index).
+
+    A loan's key is the first month it is seasoned (``seasoningMonths`` after the loan
+    was written) and its balance is under ``refiLTVTrigger`` times the unit's appreciated
+    value, projected along its scheduled amortization. Prepayments only bring that month
+    forward, so a loan is re-keyed whenever it is bought, refinanced or prepaid; stale
+    heap entries are skipped by version. A month touches only the loans that came due,
+    never the whole book. ``due(t)`` is re-checked against the actual balance before use.
+    """
+
+    def __init__(self, P):
+        self.season = int(P.SEASON); self.trigger = P.REFI_LTV; self.app = 1 + P.APP
+        self._heap = []; self._ver = []
+        self.ready = set()
+
+    def value(self, book, i, t):
+        """Unit i's purchase price appreciated to month t."""
+        return float(book.price[i]) * self.app**((t - int(book.bought[i]))/12.0)
+
+    def eligible(self, book, i, t):
+        return (t >= int(book.opened[i]) + self.season
+                and float(book.balance[i]) < self.trigger*self.value(book, i, t))
+
+    def key(self, book, i, t):
+        """(Re)schedule loan i, whose balance is as of the end of month t."""
+        while len(self._ver) <= i: self._ver.append(0)
+        self._ver[i] += 1
+        self.ready.discard(i)
+        B = float(book.balance[i]); r = float(book.rate_m[i]); pm = float(book.pmt_amt[i]); n = int(book.n_left[i])
+        if not (B > 0 and n > 0): n = 0
+        first = max(int(book.opened[i]) + self.season, t + 1)
+        k = np.arange(first - t, max(n + 1, first - t) + 1)      # months ahead; flat once paid down
+        kk = np.minimum(k, n)
+        if n and r:
+            g = (1 + r)**kk
+            bal = np.maximum(B*g - pm*(g - 1)/r, 0.0)
+        else:
+            bal = np.maximum(B - pm*kk, 0.0)
+        val = float(book.price[i]) * self.app**((t + k - int(book.bought[i]))/12.0)
+        hit = np.flatnonzero(bal < self.trigger*val*(1 + 1e-9))  # err early; eligible() has the final say
+        if len(hit):
+            due = t + int(k[hit[0]])
+        elif self.app > 1 and book.price[i] > 0 and bal[-1] > 0:
+            # balance flat from here on: wait for appreciation alone to cross the trigger
+            due = int(book.bought[i]) + math.ceil(12*math.log(bal[-1]/(self.trigger*float(book.price[i])))/math.log(self.app))
+            due = max(due, t + int(k[-1]) + 1)
+        else:
+            return
+        heapq.heappush(self._heap, (due, self._ver[i], i))
+
+    def due(self, t):
+        """Indices of loans whose refi month has come (they stay ready until re-keyed)."""
+        h = self._heap
+        while h and h[0][0] <= t:
+            _, v, i = heapq.heappop(h)
+            if v == self._ver[i]:
+                self.ready.add(i)
+        return self.ready
+
+def _qc(x):
+    # The exact-money rounding rule: half away from zero to a whole cent (x is in cents).
+    return int(math.floor(x + 0.5)) if x >= 0 else -int(math.floor(-x + 0.5))
+
+class CentsLoanBook(LoanBook):
+    """LoanBook in int64 cents: payment and each month's interest are rounded once with
+    _qc, principal and balances then move by exact integer amounts."""
+
+    def __init__(self, capacity=8):
+        super().__init__(capacity)
+        self.price = self.price.astype(np.int64)
+        self.balance = self.balance.astype(np.int64)
+        self.pmt_amt = self.pmt_amt.astype(np.int64)
+
+    def add(self, unit_id, price, principal, rate_apr, term_years, t=0):
+        if self.n == len(self.balance): self._grow()
+        i = self.n
+        rate_m = float(rate_apr)/12.0; n_left = int(term_years*12)
+        self.ids.append(unit_id)
+        self.price[i] = price; self.balance[i] = principal; self.rate_m[i] = rate_m
+        self.n_left[i] = n_left; self.pmt_amt[i] = _qc(-pmt(rate_m, n_left, principal)) if principal>0 else 0
+        self.bought[i] = t; self.opened[i] = t
+        self.n += 1; self._total = None
+        return i
+
+    def refinance(self, i, principal, rate_apr, term_years, t):
+        rate_m = float(rate_apr)/12.0; n_left = int(term_years*12)
+        self.balance[i] = principal; self.rate_m[i] = rate_m; self.n_left[i] = n_left
+        self.pmt_amt[i] = _qc(-pmt(rate_m, n_left, principal)) if principal>0 else 0
+        self.opened[i] = t; self._total = None
+
+    def accrue(self):
+        n = self.n
+        bal = self.balance[:n]; nl = self.n_left[:n]; pm = self.pmt_amt[:n]
+        live = (bal>0) & (nl>0)
+        if not live.any():
+            return 0, 0, 0
+        interest = np.floor(bal*self.rate_m[:n] + 0.5).astype(np.int64)  # balances are >= 0
+        principal = np.maximum(np.minimum(pm - interest, bal), 0)
+        self.balance[:n] = np.where(live, bal - principal, bal)
+        self.n_left[:n] = np.where(live, np.maximum(nl - 1, 0), nl)
+        self._total = None
+        return (int(pm[live].sum()), int(principal[live].sum()), int(interest[live].sum()))
+
+    def prepay(self, i, amount):
+        B0 = int(self.balance[i])
+        amt = max(min(int(amount), B0), 0)
+        B = B0 - amt
+        self.balance[i] = B
+        r = float(self.rate_m[i]); P = float(self.pmt_amt[i])
+        if B>0 and r>0 and P>0:
+            try:
+                n_est = -math.log(max(1 - r*B/P, 1e-12))/math.log(1+r)
+                self.n_left[i] = max(int(math.ceil(n_est)), 0)
+            except Exception:
+                pass
+        else:
+            self.n_left[i] = 0
+        self._total = None
+        return amt
+
+    def total_balance(self):
+        if self._total is None:
+            self._total = int(self.balance[:self.n].sum())
+        return self._total
+
+def _find_engine(p: Path) -> Path:
+    # Try exact, then repo-relative fallbacks
+    candidates = [
+        p,
+        DEFAULT_ENGINE,
+        REPO_ROOT / "OB_STR_ENGINE_V2_3.json",
+    ]
+    for c in candidates:
+        if c.exists():
+            return c
+    raise FileNotFoundError(f"Engine not found. Tried: {', '.join(str(c) for c in candidates)}")
+
+def load_eng(p: Path):
+    """Engine dict from ``p`` (a fresh copy, safe to mutate), via the precompiled engine
+    cache (cache_V23.load_engine)."""
+    return _rcache().load_engine(p).engine
+
+class Params:
+    """Flat record of every engine value the month loop reads (same keys and defaults).
+
+    ``Params.from_engine(e)`` does the nested lookups once; simulate() accepts the record
+    itself, an engine dict, or a layered override (overrides_V23.Overlay) in its place.
+    ``banking``, ``market``, ``portfolio``, ``reserveYields`` and ``savings`` are read
+    under ``constants`` (where the V2_3 engine keeps them), key by key overridden by a
+    section of the same name at the top level; with no advanceRate / refiLTVTrigger
+    there are no cash-out refis, and with no yields no Yield Income.
+    """
+    __slots__ = ("ADR", "OCC", "MGMT", "CAPX", "HOA_Y0", "HOA_INF", "INS", "TAX", "TARGET", "APP",
+                 "start_cash", "annual_sav", "amort_yrs", "RATE", "CLOSE", "DOWN1", "DOWNN",
+                 "rainyMonths", "CAPEX_M", "mdays", "maxLoans",
+                 "SEASON", "ADVANCE", "CASHOUT", "REFI_LTV", "RAINY_YLD", "CAPEX_YLD", "SAV_YLD")
+
+    def __init__(self, **kw):
+        for k in self.__slots__:
+            setattr(self, k, kw[k])
+
+    @classmethod
+    def from_engine(cls, e):
+        C=e["constants"]; cal=e["calendar"]
+        def section(name):
+            return {**C.get(name, {}), **e.get(name, {})}
+        fin=C["financial"]; ops=C["operations"]; acq=C["acquisition"]; debt=C["debt"]; res=C["reserves"]
+        B = section("banking"); market = section("market"); portfolio = section("portfolio")
+        ry = section("reserveYields"); sav = section("savings")
+        return cls(
+            ADR=ops["adrBaseline2BR"], OCC=ops["occupancyBaseline"], MGMT=ops["mgmtPct"], CAPX=ops["capexPct"],
+            HOA_Y0=ops["hoaAnnual"], HOA_INF=ops.get("hoaInflationRate",0.0),
+            INS=ops["insuranceRate"], TAX=ops["propertyTaxRate"], TARGET=acq["targetYieldUnlevered"],
+            APP=market.get("annualAppreciation",0.03),
+            start_cash=fin["startingCash"], annual_sav=fin["annualSavings"], amort_yrs=fin["amortizationYears"],
+            RATE=debt["mortgageRate"], CLOSE=acq["closingCostPct"],
+            DOWN1=acq["downPaymentFirst"], DOWNN=acq["downPaymentSubsequent"],
+            rainyMonths=B.get("rainyCoverageMonths",0), CAPEX_M=res["capexMonthsTarget"],
+            mdays=tuple(cal["monthlyDays"]), maxLoans=portfolio.get("maxLoans",7),
+            SEASON=B.get("seasoningMonths",0), ADVANCE=B.get("advanceRate",0.0), CASHOUT=B.get("cashoutCostPct",0.0),
+            REFI_LTV=B.get("refiLTVTrigger",0.0), RAINY_YLD=ry.get("rainyAnnualYield",0.0),
+            CAPEX_YLD=ry.get("capexAnnualYield",0.0), SAV_YLD=sav.get("annualYield",0.0),
+        )
+
+    def refi_on(self):
+        """Cash-out refinancing is modeled (advanceRate and refiLTVTrigger both set)."""
+        return self.ADVANCE > 0 and self.REFI_LTV > 0
+
+    def yields_on(self):
+        return bool(self.RAINY_YLD or self.CAPEX_YLD or self.SAV_YLD)
+
+    def idle_spans_on(self):
+        """event_driven can jump idle months: with refis or yields on, any month can move
+        cash on its own (a refi draw, a yield credit), so those engines step every month."""
+        return not (self.refi_on() or self.yields_on())
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __repr__(self):
+        return f"Params({', '.join(f'{k}={getattr(self, k)!r}' for k in self.__slots__)})"
+
+def engine_params(e):
+    """Params for an engine dict, a Params record, or anything with a ``params()`` method."""
+    if isinstance(e, Params):
+        return e
+    compiled = getattr(e, "params", None)
+    if compiled is not None:
+        return compiled()
+    return Params.from_engine(e)
+
+# Month-indexed series that depend only on engine parameters, built once per parameter
+# tuple and shared by every run (and every sweep point) that matches. Each element is
+# computed with the same operations as the month loop, so values are bit-identical.
+SCHEDULE_CACHE_SIZE = 256
+_APP_FACTORS = OrderedDict()
+_SCHEDULES = OrderedDict()
+
+def _memo_put(memo, key, value):
+    # entries are replaced whole (never mutated), so concurrent readers always see a
+    # complete value; an LRU touch that races an eviction is simply skipped
+    memo[key] = value
+    try:
+        memo.move_to_end(key)
+        while len(memo) > SCHEDULE_CACHE_SIZE:
+            memo.popitem(last=False)
+    except KeyError:
+        pass
+    return value
+
+def appreciation_factors(APP, T):
+    """(1+APP)**((y-1)+(m-1)/12.0) for months 1..T (Python pow, memoized per APP)."""
+    f = _APP_FACTORS.get(APP, ())
+    if len(f) < T:
+        base = 1+APP
+        f = _memo_put(_APP_FACTORS, APP, list(f) + [base**((t//12) + (t%12)/12.0) for t in range(len(f), T)])
+    return np.array(f[:T])
+
+class Schedule:
+    """Series for months t0 .. t0+T-1 (index i is month t0+i).
+
+    hoa: HOA_Y in effect that month (starting from ``HOA_start``, the value carried into
+    month t0); days; par: parity purchase price; close: closing costs. loan / down /
+    rainy / req are pairs (first unit, later units) for the purchase gate: pro-forma loan,
+    down payment, rainy funding and the total cash requirement. ``lists()`` gives the
+    same series as Python floats for the scalar loops.
+    """
+    __slots__ = ("t0", "T", "hoa", "days", "par", "close", "loan", "down", "rainy", "req", "_lists")
+
+    def __init__(self, P, t0, HOA_start, T):
+        self.t0 = t0; self.T = T
+        h = HOA_start; hoa = []
+        for t in range(t0, t0+T):
+            if (t-1)%12 == 0 and t>1: h *= (1+P.HOA_INF)
+            hoa.append(h)
+        self.hoa = np.array(hoa)
+        self.days = np.array([P.mdays[(t-1)%12] for t in range(t0, t0+T)], dtype=float)
+        g = P.ADR*365*P.OCC
+        numer = g - (g*(P.MGMT+P.CAPX) + self.hoa)
+        self.par = np.maximum(numer/(P.TARGET + P.INS + P.TAX), 0.0) * appreciation_factors(P.APP, t0+T-1)[t0-1:]
+        self.close = P.CLOSE*self.par
+        rate_m = P.RATE/12.0; nper = P.amort_yrs*12
+        den = (1-(1+rate_m)**(-nper)) if rate_m!=0 else None
+        self.loan = []; self.down = []; self.rainy = []; self.req = []
+        for d in (P.DOWN1, P.DOWNN):
+            loan = self.par*(1 - d)
+            ds = (rate_m*loan)/den if den is not None else loan/nper
+            down = d*self.par
+            rainy = P.rainyMonths*(ds + self.hoa/12.0)
+            self.loan.append(loan); self.down.append(down); self.rainy.append(rainy)
+            self.req.append(down + self.close + rainy)
+        self._lists = None
+
+    def lists(self):
+        if self._lists is None:
+            tl = lambda pair: tuple(a.tolist() for a in pair)
+            self._lists = (self.hoa.tolist(), self.days.tolist(), self.par.tolist(), self.close.tolist(),
+                           tl(self.loan), tl(self.down), tl(self.rainy), tl(self.req))
+        return self._lists
+
+def schedule(P, mmax, t0=1, HOA_start=None):
+    """Memoized Schedule covering months t0..mmax for the Params record ``P``."""
+    HOA_start = P.HOA_Y0 if HOA_start is None else HOA_start
+    key = (P.ADR, P.OCC, P.MGMT, P.CAPX, P.INS, P.TAX, P.TARGET, P.APP, P.HOA_INF, P.RATE, P.amort_yrs,
+           P.DOWN1, P.DOWNN, P.CLOSE, P.rainyMonths, P.mdays, t0, HOA_start)
+    T = max(mmax - t0 + 1, 0)
+    S = _SCHEDULES.get(key)
+    if S is None or S.T < T:
+        return _memo_put(_SCHEDULES, key, Schedule(P, t0, HOA_start, T))
+    try:
+        _SCHEDULES.move_to_end(key)
+    except KeyError:
+        pass
+    return S
+
+def parity_price(ADR,OCC,HOA_Y,MGMT,CAPX,INS,TAX,TARGET):
+    g = ADR*365*OCC
+    numer = g - (g*(MGMT+CAPX) + HOA_Y)
+    denom = TARGET + INS + TAX
+    return max(numer/denom, 0.0)
+
+# Float ledger columns in row order (everything but YYYY-MM, UnitID and Units Owned)
+FLOAT_COLUMNS = MONTHLY_COLUMNS[2:-1]
+
+def round2(a):
+    """Vectorized round(x, 2) with Python's (correctly rounded) result on every element.
+
+    np.round goes through x*100, which can land on the wrong side of a half-cent tie;
+    the few elements that sit that close to a tie are re-rounded with builtins.round.
+    """
+    a = np.asarray(a, dtype=float)
+    out = np.round(a, 2)
+    s = a*100.0
+    near = np.abs(s - np.floor(s) - 0.5) < 1e-6
+    if near.any():
+        out[near] = [round(v, 2) for v in a[near].tolist()]
+    return out
+
+class ColumnarResult:
+    """simulate(..., columnar=True): one unrounded NumPy array per output column.
+
+    Rounding to cents happens on export (``to_pandas``/``to_arrow``/``rows``), once per
+    column; ``rows()`` gives the classic list-of-dicts view with identical values.
+    """
+
+    def __init__(self, labels, columns, money="float"):
+        self.labels = labels
+        self.columns = columns
+        self.money = money  # "cents": ledger columns are exact int64 cents
+
+    def __len__(self):
+        return len(self.labels)
+
+    def cents(self):
+        """Ledger columns as int64 cents (exact in cents mode, from the rounded values otherwise)."""
+        if self.money == "cents":
+            return {c: self.columns[c] for c in FLOAT_COLUMNS}
+        return {c: np.rint(round2(self.columns[c])*100).astype(np.int64) for c in FLOAT_COLUMNS}
+
+    def rounded(self):
+        out = {"YYYY-MM": np.array(self.labels, dtype=object),
+               "UnitID": np.full(len(self.labels), "TOTAL", dtype=object)}
+        for c in FLOAT_COLUMNS:
+            out[c] = self.columns[c]/100 if self.money == "cents" else round2(self.columns[c])
+        out["Units Owned"] = self.columns["Units Owned"]
+        return out
+
+    def rows(self):
+        cols = {c: v.tolist() for c, v in self.rounded().items()}
+        lb = cols["Loan Balance (End)"]
+        for i, n in enumerate(cols["Units Owned"]):
+            if n == 0: lb[i] = 0  # sum() over no units
+        return [dict(zip(MONTHLY_COLUMNS, vals)) for vals in zip(*(cols[c] for c in MONTHLY_COLUMNS))]
+
+    def to_pandas(self, rounded=True):
+        import pandas as pd
+        cols = self.rounded() if rounded else {"YYYY-MM": np.array(self.labels, dtype=object), **self.columns}
+        return pd.DataFrame(cols, copy=False)
+
+    def to_arrow(self, rounded=True):
+        import pyarrow as pa
+        cols = self.rounded() if rounded else {"YYYY-MM": np.array(self.labels, dtype=object), **self.columns}
+        return pa.table({c: pa.array(v) for c, v in cols.items()})
+
+def simulate(e, mmax=MAX_MONTHS, event_driven=False, columnar=False, money="float", probe=None, state=None, ledger=None):
+    """Monthly V2_3 ledger for engine ``e``: a list of row dicts (see ``iter_simulate``),
+    or with ``columnar=True`` a ColumnarResult filled straight into preallocated arrays.
+    ``probe`` (probe_V23.Probe) collects per-phase timers, counters and hook events.
+    ``state`` (a SimState from ``checkpoint``) resumes at month state.t instead of month 1.
+    ``ledger`` (ledger_V23.LedgerWriter) receives every owned unit's monthly figures."""
+    if columnar:
+        return _fill_columnar(_raw(e, mmax, event_driven, money, probe, state, ledger), mmax, money)
+    return list(iter_simulate(e, mmax, event_driven=event_driven, money=money, probe=probe, state=state, ledger=ledger))
+
+def _raw(e, mmax, event_driven, money, probe=None, state=None, ledger=None):
+    if money == "cents":
+        if state is not None or ledger is not None:
+            raise ValueError("state / ledger are only supported for money='float'")
+        return _iter_raw_cents(e, mmax, probe)
+    if money != "float":
+        raise ValueError(f"money must be 'float' or 'cents' (got {money!r})")
+    return _iter_raw(e, mmax, event_driven, probe, state, ledger=ledger)
+
+def checkpoint(e, month, event_driven=False, extra=()):
+    """Run months 1..month; returns (rows, {k: SimState after month k}) for k in
+    {month} | extra. Resume any of them with simulate(e2, mmax, state=states[k])."""
+    states = {}
+    at = {month, *extra}
+    rows = list(_iter_simulate_rows(_iter_raw(e, month, event_driven, state=None, snap_at=at,
+                                              on_state=lambda st: states.__setitem__(st.t - 1, st))))
+    return rows, states
+
+def iter_simulate(e, mmax=MAX_MONTHS, event_driven=False, money="float", probe=None, state=None, ledger=None):
+    """Yield each month's row as soon as it is computed (constant memory).
+
+    ``event_driven=True`` jumps over idle stretches (no live debt, purchase gate shut):
+    those months are computed as whole arrays and the next purchase month is found by
+    a vectorized search instead of stepping one month at a time. Rows are identical.
+    Engines with cash-out refis or reserve yields have no idle months
+    (``Params.idle_spans_on``): the flag is ignored there, with a warning.
+
+    ``money="cents"`` runs the exact integer-cents ledger (see ``_iter_raw_cents``);
+    event_driven does not apply there.
+    """
+    if money == "cents":
+        for item in _raw(e, mmax, event_driven, money, probe, state, ledger):
+            r = {"YYYY-MM": item[0], "UnitID": "TOTAL"}
+            for c, v in zip(FLOAT_COLUMNS, item[1:-1]):
+                r[c] = v/100
+            r["Units Owned"] = item[-1]
+            yield r
+        return
+    yield from _iter_simulate_rows(_raw(e, mmax, event_driven, money, probe, state, ledger))
+
+def _iter_simulate_rows(raw):
+    for item in raw:
+        if type(item) is tuple:
+            # round(v, 2) costs a decimal conversion; most columns are 0 in most months
+            # and round(0.0, 2) is 0.0, so zeros pass through as they are
+            r = {"YYYY-MM": item[0], "UnitID": "TOTAL"}
+            r.update(zip(FLOAT_COLUMNS, [round(v, 2) if v else v for v in item[1:-1]]))
+            r["Units Owned"] = item[-1]
+            yield r
+        else:
+            k = item["k"]
+            cols = [(c, [round(v,2) for v in item[c].tolist()] if isinstance(item[c], np.ndarray) else [round(item[c],2)]*k)
+                    for c in FLOAT_COLUMNS]
+            for i in range(k):
+                r = {"YYYY-MM": item["YYYY-MM"][i], "UnitID": "TOTAL"}
+                for c, v in cols:
+                    r[c] = v[i]
+                r["Units Owned"] = item["Units Owned"]
+                yield r
+
+def _fill_columnar(raw, mmax, money="float"):
+    dtype = np.int64 if money == "cents" else float
+    buf = np.zeros((mmax, len(FLOAT_COLUMNS)), dtype=dtype, order="F")  # column-major: each column is contiguous
+    units = np.zeros(mmax, dtype=np.int64); labels = []
+    t = 0
+    for item in raw:
+        if type(item) is tuple:
+            labels.append(item[0]); buf[t] = item[1:-1]; units[t] = item[-1]; t += 1
+        else:
+            k = item["k"]
+            labels.extend(item["YYYY-MM"])
+            for j, c in enumerate(FLOAT_COLUMNS):
+                buf[t:t+k, j] = item[c]
+            units[t:t+k] = item["Units Owned"]; t += k
+    cols = {c: buf[:t, j] for j, c in enumerate(FLOAT_COLUMNS)}
+    cols["Units Owned"] = units[:t]
+    return ColumnarResult(labels, cols, money)
+
+def check_identities(res):
+    """T-DS-1 / T-AMORT-1 / T-CASH-1 on a ColumnarResult as whole-array identities.
+
+    Works in integer cents: exact (tolerance 0) for money="cents", ±1 cent on the
+    rounded values otherwise. Raises AssertionError naming the first violating month
+    (analytics_V23.check_invariants has the full per-month report).
+    """
+    return _analytics().assert_invariants(res, tol=0 if res.money == "cents" else 1)
+
+def _refi_plan(book, q, t, need, P, cents=False):
+    """Cash-out refis that would raise ``need`` (after costs) from the loans ``q`` has
+    due in month t: [(index, new principal, draw, cost)] taking the most equity first
+    (fewest refis), the shortfall left over (<= 0 when covered) and the rise in monthly
+    debt service. Draws and costs are whole cents (ints with ``cents``). Commits nothing.
+    """
+    if cents:
+        cent, rnd = 1, _qc
+    else:
+        cent, rnd = 100, (lambda x: round(x, 2))
+    offers = []
+    for j in sorted(q.ready):
+        if not q.eligible(book, j, t):
+            q.key(book, j, t); continue
+        cap = P.ADVANCE*q.value(book, j, t)
+        avail = cap*(1-P.CASHOUT) - float(book.balance[j])
+        if avail > 0: offers.append((-avail, j, cap))
+    plan = []; ds_up = 0
+    rate_m = P.RATE/12.0; nper = int(P.amort_yrs*12)
+    for _, j, cap in sorted(offers):
+        if need <= 0: break
+        B = book.balance[j].item()
+        if (B + need)/(1-P.CASHOUT) < cap:
+            draw = math.ceil(((B + need)/(1-P.CASHOUT) - B)*cent + 0.5)  # half a cent of slack
+        else:
+            draw = math.floor((cap - B)*cent)
+        draw = draw if cents else draw/100
+        new = B + draw; cost = rnd(P.CASHOUT*new)
+        old = book.pmt_amt[j].item() if book.n_left[j] > 0 and B > 0 else 0
+        ds_up += rnd(-pmt(rate_m, nper, new)) - old if cents else -pmt(rate_m, nper, new) - old
+        plan.append((j, new, draw, cost)); need -= draw - cost
+    return plan, need, ds_up
+
+def _iter_raw(e, mmax=MAX_MONTHS, event_driven=False, probe=None, state=None, snap_at=None, on_state=None, ledger=None):
+    # Unrounded month records: a tuple in MONTHLY_COLUMNS order (minus UnitID) per month,
+    # or, for an event-driven idle span, a dict {column: array|scalar, "k": months}.
+    # With a probe, lap() marks each phase boundary (see probe_V23); without one the
+    # only cost is the ``on`` test at those boundaries.
+    # ``state`` resumes at month state.t (engine values apply from there on; cash, HOA_Y
+    # and existing loans carry over). After each month k in ``snap_at`` the state going
+    # into month k+1 is passed to ``on_state``; idle spans never jump across such a month.
+    # ``ledger`` gets each month's per-unit arrays; it steps every month (no idle spans).
+    # Cash-out refis and reserve yields (Params.refi_on / yields_on) also step every month.
+    on = probe is not None and probe.enabled
+    if on: probe.begin(); hooks = bool(probe.hooks)
+    P=engine_params(e)
+    ADR=P.ADR; OCC=P.OCC; MGMT=P.MGMT; CAPX=P.CAPX; HOA_Y0=P.HOA_Y0; INS=P.INS; TAX=P.TAX
+    start_cash=P.start_cash; annual_sav=P.annual_sav; amort_yrs=P.amort_yrs; RATE=P.RATE; maxLoans=P.maxLoans
+    ADVANCE=P.ADVANCE; CASHOUT=P.CASHOUT; CAPEX_M=P.CAPEX_M
+    RAINY_YLD=P.RAINY_YLD/12.0; CAPEX_YLD=P.CAPEX_YLD/12.0; SAV_YLD=P.SAV_YLD/12.0
+    refi=P.refi_on(); yields=P.yields_on()
+    jump = event_driven and ledger is None and P.idle_spans_on()
+    if event_driven and not P.idle_spans_on():
+        warnings.warn("event_driven ignored: this engine models cash-out refis or reserve yields, "
+                      "so every month is stepped", stacklevel=3)
+
+    y=1; m=1; HOA_Y=HOA_Y0
+    cash=start_cash; savings_in=annual_sav/12.0
+    book=LoanBook(maxLoans); next_unit_id = 1
+    rainy_res=capex_res=0.0  # reserve balances (tracked when a yield is set)
+    t=1
+    if state is not None:
+        t=state.t; y=state.y; m=state.m; HOA_Y=state.HOA_Y; cash=state.cash; next_unit_id=state.next_unit_id
+        book=state.loan_book(maxLoans); rainy_res=state.rainy_res; capex_res=state.capex_res
+    snaps = sorted(k for k in (snap_at or ()) if k >= t)
+    refi_q = RefiQueue(P) if refi else None
+    if refi_q is not None:
+        for j in range(len(book)): refi_q.key(book, j, t-1)
+
+    # HOA path, parity price and purchase-gate amounts by month (shared across runs)
+    t0 = t
+    S = schedule(P, mmax, t0, HOA_Y)
+    S_hoa, S_days, S_par, S_close, S_loan, S_down, S_rainy, S_req = S.lists()
+
+    def buys_at(t, cash):
+        # Cheap scalar look at month t alone (debt-free book): does it clear the purchase
+        # gate? Then the span would come back empty. An estimate is enough: idle_span
+        # decides exactly, this only saves building arrays for a month that buys.
+        i=t-t0; n=book.n
+        if n >= maxLoans or S_par[i] <= 0: return False
+        g=ADR*OCC*S_days[i]
+        ops_net=n*(g - g*MGMT - g*CAPX - S_hoa[i]/12.0) - float(book.price[:n].sum())*(INS+TAX)/12.0
+        return cash + savings_in + ops_net >= S_req[0 if n==0 else 1][i]
+
+    def idle_span(t, y, m, HOA_Y, cash, limit):
+        # Months t..t+limit-1 with every balance at zero: no debt service, the feeder is a
+        # no-op and cash only moves by savings + ops. Same arithmetic as the loop below,
+        # elementwise; returns (k, columns) where month t+k is the next purchase (or limit).
+        n=len(book); K=limit
+        ms=[(m-1+i)%12+1 for i in range(K)]; ys=[y+(m-1+i)//12 for i in range(K)]
+        sl=slice(t-t0, t-t0+K)
+        hoa_y=S.hoa[sl]; price_par=S.par[sl]
+        zero=np.zeros(K)
+        if n:
+            gross=ADR*OCC*S.days[sl]
+            def seq(v): return np.add.accumulate(np.repeat(v[:, None], n, axis=1), axis=1)[:, -1]
+            ops_gross=seq(gross); ops_mgmt=seq(gross*MGMT); ops_capex=seq(gross*CAPX); ops_hoa=seq(hoa_y/12.0)
+            price=book.price[:n]
+            ops_ins=zero+_seqsum(price*INS/12.0); ops_tax=zero+_seqsum(price*TAX/12.0)
+        else:
+            ops_gross=ops_mgmt=ops_capex=ops_hoa=ops_ins=ops_tax=zero
+        ops_net=ops_gross - (ops_mgmt + ops_capex + ops_hoa + ops_ins + ops_tax + zero)
+        seq_in=np.empty(2*K+1); seq_in[0]=cash; seq_in[1::2]=savings_in; seq_in[2::2]=ops_net
+        end_cash=np.add.accumulate(seq_in)[2::2]
+        start=np.concatenate(([cash], end_cash[:-1]))
+        if n < maxLoans:
+            kind = 0 if n==0 else 1
+            opened=price_par>0
+            pur_dp=np.where(opened, S.down[kind][sl], 0.0)
+            pur_cl=np.where(opened, S.close[sl], 0.0)
+            pur_rainy=np.where(opened, S.rainy[kind][sl], 0.0)
+            gate_req=np.where(opened, S.req[kind][sl], 0.0)
+            hit=np.flatnonzero(opened & (end_cash >= gate_req))
+            K=int(hit[0]) if len(hit) else K
+        else:
+            pur_dp=pur_cl=pur_rainy=zero
+        cols={"YYYY-MM": [f"Y{yy}-{mm:02d}" for yy, mm in zip(ys[:K], ms[:K])],
+              "Starting Cash": start, "Gross Revenue": ops_gross, "Mgmt Expense": ops_mgmt,
+              "CapEx Operating": ops_capex, "HOA": ops_hoa, "Insurance": ops_ins, "Property Tax": ops_tax,
+              "Ops Net": ops_net, "Purchase: Down Payment": pur_dp, "Purchase: Closing Costs": pur_cl,
+              "Purchase: Initial Rainy Funding": pur_rainy, "End Cash": end_cash, "HOA_Y": hoa_y}
+        return K, {k: v[:K] for k, v in cols.items()}
+
+    if on: probe.lap("setup")
+    # span: months to try jumping (doubles while spans run full); after an empty span
+    # the next try waits ``wait`` months (doubling), so a book that buys most months
+    # does not rebuild span arrays every month
+    span=12; retry=t; wait=1; n_priced=-1
+    while t <= mmax:
+        if jump and t >= retry and not book.total_balance() and not buys_at(t, cash):
+            limit = min(span, mmax-t+1)
+            if snaps: limit = min(limit, snaps[0]-t+1)
+            k, cols = idle_span(t, y, m, HOA_Y, cash, limit)
+            if k: span = min(2*span, 1024); wait = 1
+            else: span = 12; retry = t + wait; wait = min(2*wait, 64)
+            if on:
+                probe.lap("idle_span")
+                if k:
+                    probe.count("idle_spans"); probe.count("rows_emitted", k)
+                    if hooks: probe.event("span", t=t, k=k)
+            if k:
+                hoa_end=float(cols.pop("HOA_Y")[k-1])
+                cols.update({"k": k, "Savings In": savings_in, "Yield Income": 0.0, "Debt Service (Total)": 0.0,
+                             "Scheduled Principal": 0.0, "Interest Portion": 0.0, "Feeder Prepay": 0.0,
+                             "Purchase Out (Total)": 0.0, "New Loan Principal": 0.0, "Refi Draw": 0.0, "Refi Costs": 0.0,
+                             "Loan Balance (End)": book.total_balance(), "Units Owned": len(book)})
+                yield cols
+                if on: probe.lap("emit")
+                cash=float(cols["End Cash"][k-1]); HOA_Y=hoa_end
+                t += k; m += k
+                while m>12: m-=12; y+=1
+                if snaps and t-1 == snaps[0]:
+                    snaps.pop(0); on_state(SimState.capture(t, y, m, HOA_Y, cash, next_unit_id, book, rainy_res, capex_res))
+                continue
+
+        i=t-t0
+        HOA_Y=S_hoa[i]; days=S_days[i]; price_par=S_par[i]
+
+        ops_gross=ops_mgmt=ops_capex=ops_hoa=ops_ins=ops_tax=0.0
+        ds_total=interest_total=principal_total=0.0
+        n=book.n
+        if n:
+            # every unit earns/pays the same per-unit ops; only ins/tax depend on price,
+            # and prices only change on a purchase
+            gross=ADR*OCC*days; mgmt=gross*MGMT; capex_op=gross*CAPX; hoa=HOA_Y/12.0
+            ops_gross, ops_mgmt, ops_capex, ops_hoa = _ops_sums(n, gross, mgmt, capex_op, hoa)
+            if n != n_priced:
+                price=book.price[:n]; n_priced=n
+                ins_n=_seqsum(price*INS/12.0); tax_n=_seqsum(price*TAX/12.0)
+            ops_ins=ins_n; ops_tax=tax_n
+            if on: probe.count("loans_accrued", int(np.count_nonzero((book.balance[:n]>0) & (book.n_left[:n]>0))))
+            ds_total, principal_total, interest_total = book.accrue()
+        ops_net = ops_gross - (ops_mgmt + ops_capex + ops_hoa + ops_ins + ops_tax + ds_total)
+        # reserve / savings yields on the balances carried into the month, credited in
+        # whole cents (+0.0 when off)
+        yield_inc = round(rainy_res*RAINY_YLD + capex_res*CAPEX_YLD + max(cash, 0.0)*SAV_YLD, 2) if yields else 0.0
+        cash_prefeeder = cash + savings_in + yield_inc + ops_net
+        if on: probe.lap("ops")
+
+        # ---- Purchase gate ----
+        purchase=False; pur_dp=pur_cl=pur_rainy=0.0; pur_total=0.0; new_loan_principal=0.0
+        refi_draw=refi_costs=0.0; refis=()
+        if book.n < maxLoans and price_par>0:
+            kind = 0 if book.n==0 else 1
+            loan_pf = S_loan[kind][i]; pur_dp = S_down[kind][i]; pur_cl = S_close[i]
+            pur_rainy = S_rainy[kind][i]; gate_req = S_req[kind][i]
+            if refi_q is not None and cash_prefeeder < gate_req and refi_q.due(t):
+                # ---- Cash-out refi: close the gate's shortfall from seasoned equity ----
+                plan, need, ds_up = _refi_plan(book, refi_q, t, gate_req - cash_prefeeder, P)
+                if plan and need <= 0 and ops_net - ds_up >= 0:
+                    refis = []
+                    for j, new, draw, cost in plan:
+                        book.refinance(j, new, RATE, amort_yrs, t)
+                        refi_q.key(book, j, t)
+                        refi_draw += draw; refi_costs += cost
+                        refis.append((j, draw, cost))
+                        if on:
+                            probe.count("refis")
+                            if hooks: probe.event("refi", t=t, unit=book.ids[j], principal=new, draw=draw, cost=cost)
+                    cash_prefeeder += refi_draw - refi_costs
+            if cash_prefeeder >= gate_req:
+                cash_prefeeder -= gate_req
+                purchase=True; pur_total=gate_req; new_loan_principal=loan_pf
+                j = book.add(f"U{next_unit_id}", price_par, loan_pf, RATE, amort_yrs, t)
+                if refi_q is not None: refi_q.key(book, j, t)
+                if yields: rainy_res += pur_rainy
+                if on:
+                    probe.count("purchases")
+                    if hooks: probe.event("purchase", t=t, unit=f"U{next_unit_id}", price=price_par, loan=loan_pf)
+                next_unit_id += 1
+        if on: probe.lap("gate")
+
+        # ---- Feeder (post-purchase) ----
+        feeder=0.0
+        if book.n>0:
+            feeder_eligible = max(cash_prefeeder, 0.0)
+            if feeder_eligible>0:
+                target = book.largest()
+                feeder = book.prepay(target, feeder_eligible)  # prepay caps it at the balance
+                cash_prefeeder -= feeder
+                if refi_q is not None: refi_q.key(book, target, t)
+                if on:
+                    probe.count("prepays")
+                    if hooks: probe.event("prepay", t=t, unit=book.ids[target], amount=feeder)
+
+        end_cash = cash_prefeeder
+        if yields: capex_res = min(capex_res + ops_capex, CAPEX_M*ops_capex)
+        if ledger is not None:
+            n1=len(book)
+            def pad(v):
+                a=np.zeros(n1); a[:n]=v; return a
+            if n:
+                ds_u, pr_u, it_u = (np.asarray(a) for a in book.last) if book.last is not None else (0.0, 0.0, 0.0)
+                ins_u=price*INS/12.0; tax_u=price*TAX/12.0
+                net_u=gross - (mgmt + capex_op + hoa + ins_u + tax_u + ds_u)
+                vals=(gross, mgmt, capex_op, hoa, ins_u, tax_u, ds_u, pr_u, it_u, net_u)
+            else:
+                vals=(0.0,)*10
+            cols=dict(zip(("Gross Revenue", "Mgmt Expense", "CapEx Operating", "HOA", "Insurance", "Property Tax",
+                           "Debt Service", "Scheduled Principal", "Interest Portion", "Ops Net"), map(pad, vals)))
+            cols["Price"]=book.price[:n1].copy(); cols["Loan Balance (End)"]=book.balance[:n1].copy()
+            cols["Feeder Prepay"]=np.zeros(n1); cols["New Loan Principal"]=np.zeros(n1)
+            if feeder: cols["Feeder Prepay"][target]=feeder
+            if purchase: cols["New Loan Principal"][n1-1]=new_loan_principal
+            cols["Refi Draw"]=np.zeros(n1); cols["Refi Costs"]=np.zeros(n1)
+            for j, draw, cost in refis:
+                cols["Refi Draw"][j]=draw; cols["Refi Costs"][j]=cost
+            ledger.month(t, book.ids, cols)
+        if on:
+            probe.lap("feeder"); probe.count("rows_emitted")
+            if hooks: probe.event("month", t=t, label=f"Y{y}-{m:02d}", cash=end_cash, units=len(book), balance=book.total_balance())
+
+        yield (f"Y{y}-{m:02d}", cash, savings_in, yield_inc, ops_gross, ops_mgmt, ops_capex, ops_hoa, ops_ins, ops_tax,
+               ds_total, principal_total, interest_total, ops_net, feeder, pur_dp, pur_cl, pur_rainy,
+               pur_total, new_loan_principal, refi_draw, refi_costs, book.total_balance(), end_cash, book.n)
+        if on: probe.lap("emit")
+
+        cash = end_cash
+        t += 1
+        m += 1
+        if m>12: m=1; y+=1
+        if snaps and t-1 == snaps[0]:
+            snaps.pop(0); on_state(SimState.capture(t, y, m, HOA_Y, cash, next_unit_id, book, rainy_res, capex_res))
+
+def _iter_raw_cents(e, mmax=MAX_MONTHS, probe=None):
+    # Exact-money ledger: every amount is computed in float from the engine rates, converted
+    # to whole cents with _qc exactly once when it enters the ledger, and from then on only
+    # added/subtracted as int. T-CASH-1 and T-AMORT-1 therefore hold with zero tolerance.
+    # Splits keep totals whole: loan = price - down payment.
+    P=engine_params(e)
+    ADR=P.ADR; OCC=P.OCC; MGMT=P.MGMT; CAPX=P.CAPX; INS=P.INS; TAX=P.TAX
+    start_cash=P.start_cash; annual_sav=P.annual_sav; amort_yrs=P.amort_yrs
+    RATE=P.RATE; CLOSE=P.CLOSE; DOWN1=P.DOWN1; DOWNN=P.DOWNN
+    rainyMonths=P.rainyMonths; maxLoans=P.maxLoans; CAPEX_M=P.CAPEX_M
+    RAINY_YLD=P.RAINY_YLD/12.0; CAPEX_YLD=P.CAPEX_YLD/12.0; SAV_YLD=P.SAV_YLD/12.0
+    yields=P.yields_on()
+
+    def c(dollars): return _qc(dollars*100)
+
+    y=1; m=1
+    cash=c(start_cash); savings_in=c(annual_sav/12.0)
+    book=CentsLoanBook(maxLoans); next_unit_id = 1
+    rainy_res=capex_res=0
+    refi_q = RefiQueue(P) if P.refi_on() else None  # keys on cents balances / prices alike
+    rate_m = RATE/12.0
+    on = probe is not None and probe.enabled
+    if on: probe.begin()
+    S_hoa, S_days, S_par = schedule(P, mmax).lists()[:3]  # HOA path and parity price by month
+    if on: probe.lap("setup"); hooks = bool(probe.hooks)
+
+    for t in range(1, mmax+1):
+        HOA_Y=S_hoa[t-1]; days=S_days[t-1]
+        price_par = c(S_par[t-1])
+        hoa = c(HOA_Y/12.0)
+
+        ops_gross=ops_mgmt=ops_capex=ops_hoa=ops_ins=ops_tax=0
+        ds_total=interest_total=principal_total=0
+        n=book.n
+        if n:
+            gross=c(ADR*OCC*days); mgmt=_qc(gross*MGMT); capex_op=_qc(gross*CAPX)
+            ops_gross=n*gross; ops_mgmt=n*mgmt; ops_capex=n*capex_op; ops_hoa=n*hoa
+            price=book.price[:n]
+            ops_ins=int(np.floor(price*INS/12.0 + 0.5).sum()); ops_tax=int(np.floor(price*TAX/12.0 + 0.5).sum())
+            if on: probe.count("loans_accrued", int(np.count_nonzero((book.balance[:n]>0) & (book.n_left[:n]>0))))
+            ds_total, principal_total, interest_total = book.accrue()
+        ops_net = ops_gross - (ops_mgmt + ops_capex + ops_hoa + ops_ins + ops_tax + ds_total)
+        yield_inc = _qc(rainy_res*RAINY_YLD + capex_res*CAPEX_YLD + max(cash, 0)*SAV_YLD) if yields else 0
+        cash_prefeeder = cash + savings_in + yield_inc + ops_net
+        if on: probe.lap("ops")
+
+        # ---- Purchase gate ----
+        pur_dp=pur_cl=pur_rainy=0; pur_total=0; new_loan_principal=0; refi_draw=refi_costs=0
+        if n < maxLoans and price_par>0:
+            down_frac = DOWN1 if n==0 else DOWNN
+            pur_dp = _qc(down_frac * price_par)
+            loan_pf = price_par - pur_dp
+            ds_pf = _qc(-pmt(rate_m, amort_yrs*12, loan_pf))
+            pur_cl = _qc(CLOSE * price_par)
+            pur_rainy = _qc(rainyMonths * (ds_pf + hoa))
+            gate_req = pur_dp + pur_cl + pur_rainy
+            if refi_q is not None and cash_prefeeder < gate_req and refi_q.due(t):
+                plan, need, ds_up = _refi_plan(book, refi_q, t, gate_req - cash_prefeeder, P, cents=True)
+                if plan and need <= 0 and ops_net - ds_up >= 0:
+                    for j, new, draw, cost in plan:
+                        book.refinance(j, new, RATE, amort_yrs, t)
+                        refi_q.key(book, j, t)
+                        refi_draw += draw; refi_costs += cost
+                        if on:
+                            probe.count("refis")
+                            if hooks: probe.event("refi", t=t, unit=book.ids[j], principal=new/100, draw=draw/100, cost=cost/100)
+                    cash_prefeeder += refi_draw - refi_costs
+            if cash_prefeeder >= gate_req:
+                cash_prefeeder -= gate_req
+                pur_total=gate_req; new_loan_principal=loan_pf
+                j = book.add(f"U{next_unit_id}", price_par, loan_pf, RATE, amort_yrs, t)
+                if refi_q is not None: refi_q.key(book, j, t)
+                if yields: rainy_res += pur_rainy
+                if on:
+                    probe.count("purchases")
+                    if hooks: probe.event("purchase", t=t, unit=f"U{next_unit_id}", price=price_par/100, loan=loan_pf/100)
+                next_unit_id += 1
+        if on: probe.lap("gate")
+
+        # ---- Feeder (post-purchase) ----
+        feeder=0
+        if book.n>0 and cash_prefeeder>0:
+            target = book.largest()
+            feeder = book.prepay(target, min(cash_prefeeder, int(book.balance[target])))
+            cash_prefeeder -= feeder
+            if refi_q is not None: refi_q.key(book, target, t)
+            if on:
+                probe.count("prepays")
+                if hooks: probe.event("prepay", t=t, unit=book.ids[target], amount=feeder/100)
+        if on:
+            probe.lap("feeder"); probe.count("rows_emitted")
+            if hooks: probe.event("month", t=t, label=f"Y{y}-{m:02d}", cash=cash_prefeeder/100, units=len(book), balance=book.total_balance()/100)
+
+        if yields: capex_res = min(capex_res + ops_capex, _qc(CAPEX_M*ops_capex))
+
+        yield (f"Y{y}-{m:02d}", cash, savings_in, yield_inc, ops_gross, ops_mgmt, ops_capex, ops_hoa, ops_ins, ops_tax,
+               ds_total, principal_total, interest_total, ops_net, feeder, pur_dp, pur_cl, pur_rainy,
+               pur_total, new_loan_principal, refi_draw, refi_costs, book.total_balance(), cash_prefeeder, book.n)
+        if on: probe.lap("emit")
+
+        cash = cash_prefeeder
+        m += 1
+        if m>12: m=1; y+=1
+
+def _sinks():
+    try:
+        from runner import sinks_V23
+    except ImportError:  # executed from inside runner/
+        import sinks_V23
+    return sinks_V23
+
+def _rcache():
+    try:
+        from runner import cache_V23
+    except ImportError:  # executed from inside runner/
+        import cache_V23
+    return cache_V23
+
+def _analytics():
+    try:
+        from runner import analytics_V23
+    except ImportError:  # executed from inside runner/
+        import analytics_V23
+    return analytics_V23
+
+# ---- Tests ----
+def run_checks(rows):
+    """T-DS-1 / T-AMORT-1 / T-CASH-1 over simulate() rows; asserts on failure."""
+    sk = _sinks()
+    res = sk.run_stream(rows, sk.default_checks())
+    res.pop("rows")
+    return res
+
+# ---- Write outputs
+def write_monthly_csv(rows, path):
+    sk = _sinks()
+    sk.run_stream(rows, [sk.CsvSink(path)])
+
+def write_yoy_csv(rows, path):
+    sk = _sinks()
+    sk.run_stream(rows, [sk.YoYSink(path)])
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="Run the V2_3 engine: monthly + YoY CSVs, T-* checks, manifest.")
+    ap.add_argument("--engine", default=os.getenv("ENGINE_PATH", str(DEFAULT_ENGINE)))
+    ap.add_argument("--out-monthly", default=os.getenv("OUT_MONTHLY", str(DEFAULT_OUT_MONTHLY)))
+    ap.add_argument("--out-yoy", default=os.getenv("OUT_YOY", str(DEFAULT_OUT_YOY)))
+    ap.add_argument("--manifest", default=os.getenv("OUT_MANIFEST"), help="default: V2_3_MVP_Manifest.json next to --out-monthly")
+    ap.add_argument("--profile-out", default=os.getenv("OUT_PROFILE"), help="default: V2_3_Profile.json next to --out-monthly")
+    # Per-unit ledger (.obl, see ledger_V23.py): off unless a path is given
+    ap.add_argument("--unit-ledger", default=os.getenv("OUT_LEDGER"))
+    ap.add_argument("--months", type=int, default=int(os.getenv("MAX_MONTHS", MAX_MONTHS)))
+    ap.add_argument("--money", default=os.getenv("MONEY_MODE", "float"), choices=["float", "cents"])
+    ap.add_argument("--event-driven", action="store_true")
+    ap.add_argument("--no-cache", action="store_true", help="always simulate (OB_STR_CACHE=0)")
+    ap.add_argument("--profile", action="store_true", help="write a phase profile (OB_STR_PROFILE=1)")
+    a = ap.parse_args(argv)
+
+    rcache = _rcache()
+    sk = _sinks()
+    out_monthly, out_yoy = Path(a.out_monthly), Path(a.out_yoy)
+    out_manifest = Path(a.manifest or out_monthly.parent / "V2_3_MVP_Manifest.json")
+    out_profile = Path(a.profile_out or out_monthly.parent / "V2_3_Profile.json")
+    mmax, money = a.months, a.money
+
+    print("CWD:", os.getcwd())
+    print("ENGINE:", a.engine)
+    print("OUT_MONTHLY:", out_monthly)
+    print("OUT_YOY:", out_yoy)
+
+    ce = rcache.load_engine(a.engine)  # precompiled: no JSON parse or Params build on a warm start
+    engine_file, e = ce.path, ce.engine
+    use_cache = not a.no_cache and os.getenv("OB_STR_CACHE", "1") != "0"
+    cache = rcache.ResultCache() if use_cache else None
+    key = rcache.cache_key(e, mmax, money, ehash=ce.engine_hash)
+    probe = None
+    if a.profile or os.getenv("OB_STR_PROFILE", "0") == "1":
+        try:
+            from runner import probe_V23
+        except ImportError:  # executed from inside runner/
+            import probe_V23
+        probe = probe_V23.Probe()
+    ledger = None
+    if a.unit_ledger:
+        try:
+            from runner import ledger_V23
+        except ImportError:  # executed from inside runner/
+            import ledger_V23
+        ledger = ledger_V23.LedgerWriter(a.unit_ledger, meta={"engine": engine_file.name, "months": mmax})
+    # profiled / ledger runs always simulate (a cache hit has nothing to measure or record)
+    hit = cache.get(key) if cache and probe is None and ledger is None else None
+
+    if hit is not None:
+        # Identical engine + runner + months: reuse stored CSVs and test results
+        print("CACHE: hit", key[:12])
+        n_rows = hit["meta"].get("months") or len(hit["rows"]); tests = hit["meta"].get("tests", {})
+        for name, dst in (("monthly.csv", out_monthly), ("yoy.csv", out_yoy)):
+            if (hit["dir"] / name).exists():
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(hit["dir"] / name, dst)
+    else:
+        # One streaming pass: checks, both CSVs and (optionally) the cache copy of the rows
+        sinks = sk.default_checks(tol=0 if money == "cents" else 1) + [sk.CsvSink(out_monthly), sk.YoYSink(out_yoy)]
+        rows_json = None
+        if cache:
+            rows_json = out_monthly.with_name(out_monthly.name + ".rows.json")
+            sinks.append(sk.JsonRowsSink(rows_json))
+        if ledger is not None:
+            sinks.append(ledger)  # closed (footer written) only after the checks pass
+        res = sk.run_stream(iter_simulate(ce, mmax=mmax, event_driven=a.event_driven,
+                                          money=money, probe=probe, ledger=ledger), sinks)
+        n_rows = res.pop("rows"); tests = res
+        if cache and n_rows:
+            cache.put(key, None, meta={"tests": tests, "mmax": mmax, "months": n_rows, "money": money},
+                      files={"rows.json": rows_json, "monthly.csv": out_monthly, "yoy.csv": out_yoy})
+        if rows_json:
+            rows_json.unlink(missing_ok=True)
+
+    if n_rows:
+        mp = rcache.write_manifest(out_manifest, engine_file,
+                                   {"monthly_csv": out_monthly, "yoy_csv": out_yoy}, tests,
+                                   notes=f"Filled by run_suite_full_V23.py ({'cache hit' if hit else 'fresh run'}, {mmax} months, money={money}).")
+        print("MANIFEST:", mp)
+    if ledger is not None:
+        print("UNIT_LEDGER:", ledger.path)
+    if probe is not None:
+        pp = probe_V23.write_report(probe, out_profile, engine=engine_file.name, months=mmax, money=money,
+                                    event_driven=a.event_driven)
+        print("PROFILE:", pp)
+    print("DONE")
+
+if __name__ == "__main__":
+    main()
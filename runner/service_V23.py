@@ -0,0 +1,463 @@
+# service_V23.py — long-running local simulation service with a warm worker pool
+#
+#   python runner/service_V23.py [--listen 127.0.0.1:8765] [--workers 4] [--max-pending 64]
+#   python runner/service_V23.py --tail jobs.jsonl [--results jobs.results.jsonl] [--once]
+#
+# A job is one JSON object:
+#
+#   {"id": "a1", "set": {"constants.debt.mortgageRate": 0.075}, "months": 240,
+#    "money": "float", "engine": "engines/OB_STR_ENGINE_V2_3.json", "rows": true}
+#
+# Everything but "set" is optional ("engine" may also be a whole engine dict; a relative
+# path is under the repo root, and a missing file fails the job rather than falling back
+# to the default engine). Over TCP
+# the client writes one job per line and reads JSON-lines events back, tagged with the
+# job id: accepted {key, shared} -> rows {start, rows: [...]} (batches of ROW_BATCH,
+# sent while the worker is still simulating; skipped with "rows": false) -> done
+# {summary, cached, seconds}, or error {error}.
+# {"op": "stats"} returns the counters. The same port speaks just enough HTTP for
+# ``curl -d @job.json http://127.0.0.1:8765/run`` (chunked application/x-ndjson) and
+# ``GET /stats``. --tail follows a JSONL file instead and appends the events to
+# --results.
+#
+# Jobs are keyed like the result cache (cache_V23.cache_key); an identical job already
+# in flight is not run again, its caller follows the first one's rows (from batch 0). At most
+# ``max_pending`` distinct jobs are queued or running; past that a connection is not
+# read any further (TCP pushes back on the client) until a slot frees up. Workers import
+# the runner once and go through cached_simulate, so repeats are served from disk.
+#
+#   from runner.service_V23 import run_remote
+#   rows, done = run_remote({"set": {...}, "months": 240})       # OB_STR_SERVICE=host:port
+
+import os, json, time, socket, asyncio, argparse, threading, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    from runner import run_suite_full_V23 as simmod
+    from runner import cache_V23 as rcache
+    from runner import overrides_V23 as overrides
+except ImportError:  # executed from inside runner/
+    import run_suite_full_V23 as simmod
+    import cache_V23 as rcache
+    import overrides_V23 as overrides
+
+DEFAULT_ADDR = "127.0.0.1:8765"  # OB_STR_SERVICE overrides it for clients and --listen
+MAX_PENDING = 64
+ROW_BATCH = 120
+MONTHS_LIMIT = 12000
+SUMMARY_COLUMNS = ["End Cash", "Units Owned", "Loan Balance (End)"]
+
+def parse_addr(s):
+    host, _, port = s.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+# -------- workers --------
+_ROWS = None  # multiprocessing queue of (run id, start, rows) batches back to the service
+
+def _init_worker(rows_q=None):
+    global _ROWS
+    _ROWS = rows_q
+    rcache.runner_hash()  # hash the runner modules once per process, not per job
+
+def _run_job(run, key, e, mmax, money):
+    """Simulate (or read from the result cache) and send the rows in ROW_BATCH batches
+    as they come; returns (months, hit, seconds, last row)."""
+    t0 = time.perf_counter()
+    cache = rcache.ResultCache()
+    hit = cache.get(key)
+    rows = []
+    for r in (hit["rows"] if hit is not None else simmod.iter_simulate(e, mmax, money=money)):
+        rows.append(r)
+        if len(rows) % ROW_BATCH == 0:
+            _ROWS.put((run, len(rows) - ROW_BATCH, rows[-ROW_BATCH:]))
+    if len(rows) % ROW_BATCH:
+        _ROWS.put((run, len(rows) - len(rows) % ROW_BATCH, rows[-(len(rows) % ROW_BATCH):]))
+    if hit is None:
+        cache.put(key, rows)
+    return len(rows), hit is not None, time.perf_counter() - t0, (rows[-1] if rows else {})
+
+class _RowStream:
+    """One job's row batches as they arrive; every follower replays them from the first."""
+
+    def __init__(self):
+        self.batches = []
+        self.months = 0
+        self._changed = asyncio.Event()
+
+    def feed(self, start, rows):
+        self.batches.append((start, rows)); self.months += len(rows)
+        self.poke()
+
+    def poke(self):
+        self._changed.set(); self._changed = asyncio.Event()
+
+    def complete(self, fut):
+        return fut.done() and (fut.cancelled() or fut.exception() is not None or self.months >= fut.result()[0])
+
+    async def follow(self, fut):
+        i = 0
+        while True:
+            while i < len(self.batches):
+                yield self.batches[i]; i += 1
+            if self.complete(fut):
+                return
+            await self._changed.wait()
+
+# -------- service --------
+class Service:
+    """Job intake shared by the TCP/HTTP front end and the JSONL tail."""
+
+    def __init__(self, workers=None, max_pending=MAX_PENDING, base_engine=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._rows_q = multiprocessing.Queue()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self._rows_q,))
+        self.base_engine = Path(base_engine or simmod.DEFAULT_ENGINE).absolute()  # as given, relative to the cwd
+        self._engines = {}
+        self._inflight = {}  # key -> (asyncio.Future of (months, hit, seconds, last row), _RowStream)
+        self._streams = {}  # run id -> (future, _RowStream) still receiving batches
+        self._runs = 0
+        self._reader = None
+        self._slots = asyncio.Semaphore(max_pending)
+        self.max_pending = max_pending
+        self.stats = {"submitted": 0, "deduped": 0, "completed": 0, "failed": 0, "cache_hits": 0}
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if self._reader is not None:
+            self._rows_q.put(None)
+            self._reader.join()
+
+    def _read_rows(self, loop):
+        # thread: hand each batch from the workers to the event loop
+        for item in iter(self._rows_q.get, None):
+            loop.call_soon_threadsafe(self._feed, *item)
+
+    def _feed(self, run, start, rows):
+        if run in self._streams:  # else: a failed job's batches, already written off
+            self._streams[run][1].feed(start, rows)
+            self._settle(run)
+
+    def _settle(self, run):
+        # the queue may deliver a job's last batches after its result: a stream is
+        # dropped once the job is over and every batch is in
+        fut, stream = self._streams[run]
+        if stream.complete(fut):
+            del self._streams[run]
+
+    def _engine(self, spec):
+        """The job's engine: a dict as given, or the file at ``spec`` (relative paths are
+        under the repo root; default: the service's base engine). A missing file fails
+        the job instead of falling back to another engine. Reloaded when the file changes."""
+        if isinstance(spec, dict):
+            return spec
+        p = Path(spec or self.base_engine)
+        if not p.is_absolute():
+            p = simmod.REPO_ROOT / p
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"engine not found: {p}") from None
+        stamp = (st.st_mtime_ns, st.st_size)
+        hit = self._engines.get(p)
+        if hit is None or hit[0] != stamp:
+            hit = self._engines[p] = (stamp, rcache.load_engine(p).engine)
+        return hit[1]
+
+    def build(self, job):
+        """(engine, months, money) for a job dict; raises ValueError on a bad job."""
+        if not isinstance(job, dict):
+            raise ValueError("job must be a JSON object")
+        # the loaded engine is shared by every job; overrides copy only the paths they touch
+        e = overrides.Overlay(self._engine(job.get("engine")), job.get("set") or {}).materialize()
+        mmax = int(job.get("months", simmod.MAX_MONTHS))
+        if not 1 <= mmax <= MONTHS_LIMIT:
+            raise ValueError(f"months must be in 1..{MONTHS_LIMIT}")
+        money = job.get("money", "float")
+        if money not in ("float", "cents"):
+            raise ValueError("money must be 'float' or 'cents'")
+        return e, mmax, money
+
+    async def admit(self, job):
+        """Key the job and start it (or join the identical in-flight one).
+
+        Returns (key, (future, row stream), shared). Waits for a free slot before starting a new job,
+        which is what stalls the caller's intake when the service is saturated.
+        """
+        e, mmax, money = self.build(job)
+        key = rcache.cache_key(e, mmax, money)
+        self.stats["submitted"] += 1
+        job_run = self._inflight.get(key)
+        if job_run is not None:
+            self.stats["deduped"] += 1
+            return key, job_run, True
+        await self._slots.acquire()
+        job_run = self._inflight.get(key)  # may have been started while we waited
+        if job_run is not None:
+            self._slots.release()
+            self.stats["deduped"] += 1
+            return key, job_run, True
+        loop = asyncio.get_running_loop()
+        if self._reader is None:
+            self._reader = threading.Thread(target=self._read_rows, args=(loop,), daemon=True)
+            self._reader.start()
+        self._runs += 1; run = self._runs
+        fut = loop.run_in_executor(self.pool, _run_job, run, key, e, mmax, money)
+        job_run = self._inflight[key] = self._streams[run] = (fut, _RowStream())
+
+        def finished(f, key=key, run=run):
+            self._inflight.pop(key, None)
+            self._slots.release()
+            if f.cancelled() or f.exception() is not None:
+                self.stats["failed"] += 1
+            else:
+                self.stats["completed"] += 1
+                self.stats["cache_hits"] += bool(f.result()[1])
+            self._streams[run][1].poke()
+            self._settle(run)
+        fut.add_done_callback(finished)
+        return key, job_run, False
+
+    async def events(self, job, emit):
+        """Run one job, passing each event dict to ``await emit(ev)``."""
+        jid = job.get("id") if isinstance(job, dict) else None
+        try:
+            key, (fut, stream), shared = await self.admit(job)
+        except (ValueError, TypeError, KeyError, OSError) as ex:
+            await emit({"id": jid, "event": "error", "error": str(ex)})
+            return
+        await emit({"id": jid, "event": "accepted", "key": key, "shared": shared})
+        if job.get("rows", True):
+            async for start, rows in stream.follow(fut):
+                await emit({"id": jid, "event": "rows", "start": start, "rows": rows})
+        try:
+            months, hit, seconds, last = await asyncio.shield(fut)
+        except Exception as ex:
+            await emit({"id": jid, "event": "error", "key": key, "error": f"{type(ex).__name__}: {ex}"})
+            return
+        await emit({"id": jid, "event": "done", "key": key, "cached": bool(hit), "shared": shared,
+                    "seconds": round(seconds, 6), "months": months,
+                    "summary": {c: last.get(c) for c in SUMMARY_COLUMNS}})
+
+    def snapshot(self):
+        return {**self.stats, "inflight": len(self._inflight), "workers": self.workers,
+                "max_pending": self.max_pending}
+
+# -------- TCP / HTTP front end --------
+def _line(ev):
+    return (json.dumps(ev, separators=(",", ":")) + "\n").encode("utf-8")
+
+async def _spawn(svc, job, emit, tasks):
+    """Start ``job`` in its own task and return once it is accepted (or rejected).
+
+    admit() waits for a free slot, so intake loops that await this stop reading new
+    jobs while the service is saturated.
+    """
+    started = asyncio.Event()
+
+    async def first(ev):
+        started.set()
+        await emit(ev)
+
+    async def run():
+        try:
+            await svc.events(job, first)
+        finally:
+            started.set()
+    t = asyncio.create_task(run())
+    tasks.add(t); t.add_done_callback(tasks.discard)
+    await started.wait()
+
+async def _serve_jsonl(svc, first, reader, writer):
+    lock = asyncio.Lock()
+    tasks = set()
+
+    async def emit(ev):
+        async with lock:
+            writer.write(_line(ev))
+            await writer.drain()
+
+    line = first
+    while line:
+        if line.strip():
+            try:
+                job = json.loads(line)
+            except ValueError as ex:
+                await emit({"event": "error", "error": f"bad JSON: {ex}"})
+            else:
+                if isinstance(job, dict) and job.get("op") == "stats":
+                    await emit({"event": "stats", **svc.snapshot()})
+                else:
+                    await _spawn(svc, job, emit, tasks)
+        line = await reader.readline()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def _serve_http(svc, first, reader, writer):
+    method, target, *_ = first.decode("latin-1").split()
+    headers = {}
+    while True:
+        h = await reader.readline()
+        if not h.strip():
+            break
+        k, _, v = h.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+
+    def respond(status, body, ctype="application/json"):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode("latin-1") + body)
+
+    if method == "GET" and target == "/stats":
+        respond("200 OK", json.dumps(svc.snapshot()).encode("utf-8"))
+    elif method == "POST" and target == "/run":
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+        try:
+            job = json.loads(body or b"{}")
+        except ValueError as ex:
+            respond("400 Bad Request", json.dumps({"error": f"bad JSON: {ex}"}).encode("utf-8"))
+        else:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                         b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+
+            async def emit(ev):
+                data = _line(ev)
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                await writer.drain()
+            await svc.events(job, emit)
+            writer.write(b"0\r\n\r\n")
+    else:
+        respond("404 Not Found", b'{"error": "use POST /run or GET /stats"}')
+    await writer.drain()
+
+async def _handle(svc, reader, writer):
+    try:
+        first = await reader.readline()
+        if first.split(b" ", 1)[0] in (b"GET", b"POST"):
+            await _serve_http(svc, first, reader, writer)
+        else:
+            await _serve_jsonl(svc, first, reader, writer)
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(svc, host, port, ready=None):
+    server = await asyncio.start_server(lambda r, w: _handle(svc, r, w), host, port)
+    if ready is not None:
+        ready(server)
+    async with server:
+        await server.serve_forever()
+
+# -------- JSONL tail --------
+async def tail(svc, src, dst, once=False, poll=0.5):
+    """Run every job line of ``src`` (following appends unless ``once``); events -> ``dst``."""
+    src, dst = Path(src), Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    lock = asyncio.Lock()
+    tasks = set()
+    with dst.open("a", encoding="utf-8") as out:
+        async def emit(ev):
+            async with lock:
+                out.write(_line(ev).decode("utf-8")); out.flush()
+
+        async def submit(line):
+            if not line.strip():
+                return
+            try:
+                job = json.loads(line)
+            except ValueError as ex:
+                await emit({"event": "error", "error": f"bad JSON: {ex}"})
+                return
+            await _spawn(svc, job, emit, tasks)
+
+        pos, buf = 0, b""
+        while True:
+            try:
+                size = src.stat().st_size
+            except FileNotFoundError:
+                size = 0
+            if size < pos:  # truncated / replaced: start over
+                pos, buf = 0, b""
+            if size > pos:
+                with src.open("rb") as f:
+                    f.seek(pos)
+                    chunk = f.read(size - pos)
+                pos += len(chunk)
+                buf += chunk
+                *lines, buf = buf.split(b"\n")
+                for line in lines:
+                    await submit(line)
+            elif once:
+                await submit(buf)  # last line without a trailing newline
+                break
+            else:
+                await asyncio.sleep(poll)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+# -------- client --------
+def request(job, addr=None, timeout=None):
+    """Send one job to a running service; yields its events as dicts."""
+    host, port = parse_addr(addr or os.getenv("OB_STR_SERVICE", DEFAULT_ADDR))
+    with socket.create_connection((host, port), timeout=timeout) as s:
+        s.sendall(_line(job))
+        s.shutdown(socket.SHUT_WR)
+        with s.makefile("rb") as f:
+            for line in f:
+                ev = json.loads(line)
+                yield ev
+                if ev.get("event") in ("done", "error", "stats"):
+                    return
+
+def run_remote(job, addr=None, timeout=None):
+    """(rows, done event) for ``job``; raises RuntimeError if the service reports an error."""
+    job = {**job, "rows": True}
+    rows, done = [], None
+    for ev in request(job, addr, timeout):
+        if ev["event"] == "rows":
+            rows.extend(ev["rows"])
+        elif ev["event"] == "error":
+            raise RuntimeError(ev["error"])
+        elif ev["event"] == "done":
+            done = ev
+    if done is None:
+        raise RuntimeError("service closed the connection before the job finished")
+    return rows, done
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local simulation service for the V2_3 engine.")
+    ap.add_argument("--engine", default=os.getenv("ENGINE_PATH", str(simmod.DEFAULT_ENGINE)),
+                    help="engine used by jobs without an 'engine' field")
+    ap.add_argument("--listen", default=os.getenv("OB_STR_SERVICE", DEFAULT_ADDR), help="host:port (JSON lines + HTTP)")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--max-pending", type=int, default=MAX_PENDING, help="distinct jobs queued or running")
+    ap.add_argument("--tail", default=None, help="follow this JSONL file of jobs instead of listening")
+    ap.add_argument("--results", default=None, help="events for --tail (default <tail>.results.jsonl)")
+    ap.add_argument("--once", action="store_true", help="with --tail: stop at end of file")
+    a = ap.parse_args(argv)
+    if not Path(a.engine).is_file():
+        ap.error(f"engine not found: {a.engine}")
+
+    async def amain():
+        svc = Service(workers=a.workers, max_pending=a.max_pending, base_engine=a.engine)
+        try:
+            if a.tail:
+                dst = a.results or str(Path(a.tail).with_suffix("")) + ".results.jsonl"
+                print("TAIL:", a.tail, "->", dst, flush=True)
+                await tail(svc, a.tail, dst, once=a.once)
+                print("STATS:", json.dumps(svc.snapshot()))
+            else:
+                host, port = parse_addr(a.listen)
+                print(f"LISTEN: {host}:{port}  WORKERS: {svc.workers}", flush=True)
+                await serve(svc, host, port)
+        finally:
+            svc.close()
+
+    try:
+        asyncio.run(amain())
+    except KeyboardInterrupt:
+        pass
+    print("DONE")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# sinks_V23.py — incremental consumers for iter_simulate() row streams
+#
+# Every sink has feed(row) / close() (and abort() for cleanup on failure). run_stream()
+# drives one pass over the rows through any number of sinks, so the CSV writers, the
+# YoY rollup and the T-* checks share a single pass and never hold the full run (the
+# rollup and the checks buffer plain per-column values and hand them to analytics_V23).
+
+import os, csv, json
+from pathlib import Path
+
+try:
+    from runner import analytics_V23 as analytics
+except ImportError:  # executed from inside runner/
+    import analytics_V23 as analytics
+
+class _FileSink:
+    """Writes to <path>.tmp and renames on close, so a failed run leaves no partial file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._tmp = self.path.with_name(self.path.name + f".tmp{os.getpid()}")
+        self._f = None
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self._tmp.open("w", newline="")
+        return self._f
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            os.replace(self._tmp, self.path)
+            self._f = None
+        return str(self.path)
+
+    def abort(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+            self._tmp.unlink(missing_ok=True)
+
+class CsvSink(_FileSink):
+    """Monthly CSV. ``extra`` ({column: value}) is prepended to every row, which lets
+    several scenarios share one file (e.g. extra={"Scenario": name})."""
+
+    def __init__(self, path, extra=None):
+        super().__init__(path)
+        self.extra = dict(extra or {})
+        self._w = None
+
+    def feed(self, row):
+        if self._w is None:
+            cols = list(self.extra) + list(row.keys())
+            self._w = csv.DictWriter(self._open(), fieldnames=cols)
+            self._w.writeheader()
+        self._w.writerow({**self.extra, **row} if self.extra else row)
+
+class JsonRowsSink(_FileSink):
+    """Rows as {"columns": [...], "data": [[...], ...]} written incrementally (cache format)."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._cols = None
+
+    def feed(self, row):
+        if self._cols is None:
+            self._cols = list(row.keys())
+            self._open().write('{"columns": ' + json.dumps(self._cols) + ', "data": [')
+            sep = ""
+        else:
+            sep = ", "
+        self._f.write(sep + json.dumps([row[c] for c in self._cols]))
+
+    def close(self):
+        if self._f is None:
+            self._open().write('{"columns": [], "data": [')
+        self._f.write("]}")
+        return super().close()
+
+class _ColumnBuffer:
+    """Row values appended per column; ``take()`` hands them over as a column dict."""
+
+    def __init__(self, columns=None):
+        self.columns = columns
+        self._vals = None
+        self.n = 0
+
+    def add(self, row):
+        if self._vals is None:
+            self.columns = list(self.columns or row.keys())
+            self._vals = [[] for _ in self.columns]
+        for v, c in zip(self._vals, self.columns):
+            v.append(row[c])
+        self.n += 1
+
+    def take(self):
+        out = {c: v for c, v in zip(self.columns or [], self._vals or [])}
+        self._vals = [[] for _ in self.columns] if self._vals is not None else None
+        self.n = 0
+        return out
+
+class YoYSink(_FileSink):
+    """Period rollup CSV (analytics_V23.rollup): flows summed, Starting Cash from the first
+    month, End Cash / Loan Balance (End) / Units Owned from the last. Months are buffered
+    per column and rolled up every ``flush_months`` at a period boundary, so only that
+    many months are held at a time."""
+
+    def __init__(self, path, period="year", flush_months=1200):
+        super().__init__(path)
+        self.period = period
+        self.flush_months = flush_months
+        self._w = None
+        self._buf = _ColumnBuffer()
+        self._key = None
+
+    def _flush(self):
+        if not self._buf.n:
+            return
+        table = analytics.rollup(self._buf.take(), self.period)
+        if self._w is None:
+            self._w = csv.DictWriter(self._open(), fieldnames=list(table))
+            self._w.writeheader()
+        self._w.writerows(analytics.table_rows(table))
+
+    def feed(self, row):
+        key = analytics.period_key(row["YYYY-MM"], self.period)
+        if key != self._key and self._buf.n >= self.flush_months:
+            self._flush()
+        self._key = key
+        self._buf.add(row)
+
+    def close(self):
+        self._flush()
+        return super().close() if self._f is not None else str(self.path)
+
+# ---- T-* invariant checks ----
+class InvariantCheck:
+    """T-DS-1 / T-AMORT-1 / T-CASH-1 (analytics_V23.check_invariants) over the streamed
+    rows. Buffers at most ``flush_months`` months of the ledger columns the identities
+    use and checks them a chunk at a time (analytics_V23.InvariantState carries the
+    previous month across chunks); ``tol`` is in cents."""
+    id = "T-*"
+    COLUMNS = ["YYYY-MM", "Starting Cash", "Savings In", "Yield Income", "Ops Net", "Debt Service (Total)",
+               "Scheduled Principal", "Feeder Prepay", "Purchase Out (Total)", "New Loan Principal", "Refi Draw",
+               "Refi Costs", "Loan Balance (End)", "End Cash"]
+
+    def __init__(self, tol=1, flush_months=1200):
+        self.tol = tol
+        self.flush_months = flush_months
+        self._buf = _ColumnBuffer(self.COLUMNS)
+        self._state = analytics.InvariantState(tol)
+
+    def feed(self, r):
+        self._buf.add(r)
+        if self._buf.n >= self.flush_months:
+            self._flush()
+
+    def _flush(self):
+        if self._buf.n:
+            self._state.add(self._buf.take())
+
+    def report(self):
+        self._flush()
+        return self._state.report()
+
+    def close(self):
+        return analytics.assert_report(self.report())
+
+def default_checks(tol=1):
+    """The T-* checks as stream sinks; tol is in cents (0 for the exact-cents ledger)."""
+    return [InvariantCheck(tol)]
+
+def run_stream(rows, sinks):
+    """Feed every row to every sink, then close them in order.
+
+    Returns {check id: result} for sinks that carry an ``id`` plus {"rows": n}. On any
+    exception the file sinks are aborted (no partial outputs) and the error re-raised.
+    """
+    n = 0
+    try:
+        for r in rows:
+            for s in sinks:
+                s.feed(r)
+            n += 1
+        out = {"rows": n}
+        # checks first: a failing invariant must not publish any output file
+        for s in sorted(sinks, key=lambda s: not getattr(s, "id", None)):
+            res = s.close()
+            if isinstance(res, dict):  # several checks from one sink
+                out.update(res)
+            elif getattr(s, "id", None):
+                out[s.id] = res
+        return out
+    except BaseException:
+        for s in sinks:
+            if hasattr(s, "abort"):
+                s.abort()
+        raise
@@ -0,0 +1,198 @@
+# solve_V23.py — goal-seek over one engine parameter
+#
+#   python runner/solve_V23.py --param constants.financial.annualSavings --lo 10000 --hi 200000 \
+#       --target "units>=3@10"
+#   python runner/solve_V23.py --param constants.debt.mortgageRate --lo 0.02 --hi 0.15 \
+#       --target "debtfree@20"
+#   python runner/solve_V23.py --param constants.operations.adrBaseline2BR --lo 150 --hi 250 \
+#       --target "Gross Revenue@24=4000" --method secant
+#
+# Targets are decided on the monthly stream: each trial run stops at the first month
+# where the outcome is known (units reached, horizon passed, metric month hit) instead
+# of running to mmax. Boolean targets are bisected to the feasibility boundary and the
+# feasible edge is returned (so "min savings" and "max rate" are the same call);
+# numeric targets use bracketed secant (Illinois false position).
+
+import os, re, argparse, json
+from pathlib import Path
+
+try:
+    from runner import run_suite_full_V23 as simmod
+    from runner import overrides_V23 as overrides
+    from runner.sweep_V23 import get_path
+except ImportError:  # executed from inside runner/
+    import run_suite_full_V23 as simmod
+    import overrides_V23 as overrides
+    from sweep_V23 import get_path
+
+# -------- targets --------
+class UnitsBy:
+    """Units Owned >= n by the end of year ``year``."""
+    numeric = False
+
+    def __init__(self, n, year):
+        self.n = int(n); self.horizon = int(year)*12
+
+    def decide(self, t, row):
+        if row["Units Owned"] >= self.n: return True
+        if t >= self.horizon: return False
+        return None
+
+    def __str__(self):
+        return f"units>={self.n}@{self.horizon//12}"
+
+class DebtFreeBy:
+    """Loan Balance (End) == 0 while owning >= min_units units, by the end of year ``year``."""
+    numeric = False
+
+    def __init__(self, year, min_units=1):
+        self.horizon = int(year)*12; self.min_units = int(min_units)
+
+    def decide(self, t, row):
+        if row["Units Owned"] >= self.min_units and row["Loan Balance (End)"] == 0: return True
+        if t >= self.horizon: return False
+        return None
+
+    def __str__(self):
+        return f"debtfree:{self.min_units}@{self.horizon//12}"
+
+class MetricAt:
+    """Numeric target: ``column`` at month ``month`` minus ``value`` (root = exact hit)."""
+    numeric = True
+
+    def __init__(self, column, month, value):
+        self.column = column; self.horizon = int(month); self.value = float(value)
+
+    def decide(self, t, row):
+        return row[self.column] - self.value if t >= self.horizon else None
+
+    def __str__(self):
+        return f"{self.column}@{self.horizon}={self.value:g}"
+
+def parse_target(spec):
+    """units>=N@YEAR | debtfree[:MIN_UNITS]@YEAR | <column>@MONTH=VALUE"""
+    s = spec.strip()
+    m = re.fullmatch(r"units\s*>=\s*(\d+)\s*@\s*(\d+)", s)
+    if m: return UnitsBy(m.group(1), m.group(2))
+    m = re.fullmatch(r"debtfree(?::(\d+))?\s*@\s*(\d+)", s)
+    if m: return DebtFreeBy(m.group(2), m.group(1) or 1)
+    m = re.fullmatch(r"(.+?)\s*@\s*(\d+)\s*=\s*(-?[\d.eE+-]+)", s)
+    if m and m.group(1) in simmod.MONTHLY_COLUMNS: return MetricAt(m.group(1), m.group(2), m.group(3))
+    raise ValueError(f"unrecognised target {spec!r}")
+
+# -------- trials --------
+def run_trial(e, target, mmax=None):
+    """Simulate until ``target`` is decided; returns (outcome, months simulated)."""
+    horizon = min(target.horizon, mmax) if mmax else target.horizon
+    # jump idle months where the engine has them (no refis / yields)
+    gen = simmod.iter_simulate(e, mmax=horizon, event_driven=simmod.engine_params(e).idle_spans_on())
+    t = 0
+    try:
+        for row in gen:
+            t += 1
+            d = target.decide(t, row)
+            if d is not None:
+                return d, t
+    finally:
+        gen.close()
+    return (None if target.numeric else False), t
+
+def solve(base, path, target, lo, hi, method=None, tol=None, ftol=0.005, max_iter=60, mmax=None):
+    """Goal-seek ``path`` in [lo, hi] against ``target``.
+
+    ``tol`` bounds the final bracket width on the parameter; numeric targets also stop
+    once |residual| <= ``ftol`` (half a cent by default). Returns {"value", "feasible",
+    "status", "trials", "months", "history"}. When [lo, hi] does not straddle the target
+    value is None and status is "not bracketed"; for a boolean target ``feasible`` then
+    says whether both ends pass or both fail (neither end is the edge being sought).
+    If ``max_iter`` trials run out before tol / ftol is met, status is "max_iter" and
+    value is the last estimate (numeric targets often jump where a purchase moves a month).
+    """
+    integral = isinstance(get_path(base, path), int)
+    method = method or ("secant" if target.numeric else "bisect")
+    if tol is None:
+        tol = 1 if integral else abs(hi - lo) * 1e-6
+    history = []; months = [0]
+
+    def f(x):
+        if integral: x = int(round(x))
+        e = overrides.Overlay(base, {path: x})
+        out, t = run_trial(e, target, mmax)
+        months[0] += t; history.append((x, out, t))
+        return out
+
+    def result(value, feasible, status="bracketed"):
+        return {"value": value, "feasible": feasible, "status": status, "trials": len(history), "months": months[0], "history": history}
+
+    flo, fhi = f(lo), f(hi)
+    if not target.numeric:
+        if flo == fhi:
+            return result(None, bool(flo), "not bracketed")
+        ok, bad = (lo, hi) if flo else (hi, lo)
+        for _ in range(max_iter):
+            if abs(ok - bad) <= tol: break
+            mid = (ok + bad) / 2
+            if integral:
+                mid = int(round(mid))
+                if mid in (ok, bad): break
+            if f(mid): ok = mid
+            else: bad = mid
+        else:
+            return result(ok, True, "max_iter")
+        return result(ok, True)
+
+    if flo is None or fhi is None or flo*fhi > 0:
+        return result(None, False, "not bracketed")
+    a, b, fa, fb = lo, hi, flo, fhi
+    x = a
+    for _ in range(max_iter):
+        x = (a + b) / 2 if method == "bisect" else (a*fb - b*fa) / (fb - fa)
+        fx = f(x)
+        if abs(fx) <= ftol: break
+        if fx*fb < 0:
+            a, fa = b, fb
+        elif method != "bisect":
+            fa /= 2  # Illinois step: keeps the stale endpoint from stalling convergence
+        b, fb = x, fx
+        if abs(b - a) <= tol: break
+    else:
+        return result(int(round(x)) if integral else x, True, "max_iter")
+    return result(int(round(x)) if integral else x, True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Goal-seek one engine parameter against a target.")
+    ap.add_argument("--engine", default=os.getenv("ENGINE_PATH", str(simmod.DEFAULT_ENGINE)))
+    ap.add_argument("--param", required=True, help="dotted engine path, e.g. constants.debt.mortgageRate")
+    ap.add_argument("--lo", type=float, required=True)
+    ap.add_argument("--hi", type=float, required=True)
+    ap.add_argument("--target", required=True, help='units>=N@YEAR | debtfree[:U]@YEAR | "<column>@MONTH=VALUE"')
+    ap.add_argument("--method", choices=["bisect", "secant"], default=None)
+    ap.add_argument("--tol", type=float, default=None, help="absolute tolerance on the parameter")
+    ap.add_argument("--max-iter", type=int, default=60)
+    ap.add_argument("--json", action="store_true", help="print the full result as JSON")
+    a = ap.parse_args(argv)
+
+    base = simmod.load_eng(Path(a.engine))
+    try:
+        overrides.check_path(base, a.param)
+        target = parse_target(a.target)
+    except ValueError as ex:
+        ap.error(str(ex))
+    res = solve(base, a.param, target, a.lo, a.hi, method=a.method, tol=a.tol, max_iter=a.max_iter)
+    if a.json:
+        print(json.dumps(res, indent=2))
+    else:
+        print("TARGET:", target)
+        print("PARAM:", a.param)
+        if res["status"] == "bracketed":
+            print("VALUE:", res["value"])
+        elif res["status"] == "max_iter":
+            print("VALUE:", res["value"], f"(not converged after --max-iter {a.max_iter}; widen --tol or the range)")
+        else:
+            edge = " (feasible at both ends)" if res["feasible"] else ""
+            print(f"VALUE: not bracketed in [lo, hi]{edge}")
+        print(f"TRIALS: {res['trials']}  MONTHS SIMULATED: {res['months']}")
+    print("DONE")
+
+if __name__ == "__main__":
+    main()
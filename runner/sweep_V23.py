@@ -0,0 +1,194 @@
+# sweep_V23.py — parallel parameter sweep over a base engine
+#
+#   python runner/sweep_V23.py --engine engines/OB_STR_ENGINE_V2_3.json \
+#       --grid constants.debt.mortgageRate=0.055,0.0685,0.08 \
+#       --range constants.operations.adrBaseline2BR=200:350:16 \
+#       --months 240 --out runner/V2_3_Sweep.npz [--series] [--period year] [--workers 8] [--chunk 512]
+#
+# The cartesian product of all --grid/--range axes is split into chunks; each chunk
+# runs through the vectorized batch engine in a worker process. Results land in one
+# compressed columnar .npz: param:<path> columns, kpi:<column> final-month values and,
+# with --series, series:<column> (S, months) arrays; with --period year|quarter,
+# period:<column> (S, periods) closing values per period (analytics_V23 segments,
+# labels in period_names).
+
+import os, argparse, itertools, time
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from runner import run_suite_full_V23 as simmod
+    from runner import batch_V23 as batch
+    from runner import overrides_V23 as overrides
+    from runner import analytics_V23 as analytics
+except ImportError:  # executed from inside runner/
+    import run_suite_full_V23 as simmod
+    import batch_V23 as batch
+    import overrides_V23 as overrides
+    import analytics_V23 as analytics
+
+KPI_COLUMNS = ["End Cash", "Units Owned", "Loan Balance (End)"]
+DEFAULT_OUT = simmod.REPO_ROOT / "runner" / "V2_3_Sweep.npz"
+
+# -------- dotted paths --------
+def get_path(e, path, default=None):
+    cur = e
+    for k in path.split("."):
+        if not isinstance(cur, dict) or k not in cur:
+            return default
+        cur = cur[k]
+    return cur
+
+_MISSING = object()
+
+def check_paths(e, paths):
+    """ValueError naming the first dotted path ``e`` does not have."""
+    e = e.materialize() if hasattr(e, "materialize") else e
+    for p in paths:
+        if get_path(e, p, _MISSING) is _MISSING:
+            raise ValueError(f"unknown engine path {p!r}: not in the base engine")
+
+def set_path(e, path, value):
+    """Set an existing dotted path; a path the engine does not have is a ValueError
+    (a typo would otherwise add a key the loader never reads)."""
+    keys = path.split(".")
+    cur = e
+    for i, k in enumerate(keys):
+        if not isinstance(cur, dict) or k not in cur:
+            raise ValueError(f"unknown engine path {path!r}: no {'.'.join(keys[:i+1])!r} in the base engine")
+        if i < len(keys) - 1:
+            cur = cur[k]
+    cur[keys[-1]] = value
+
+# -------- axis parsing --------
+def _num(s):
+    v = float(s)
+    return int(v) if v.is_integer() and "." not in s and "e" not in s.lower() else v
+
+def parse_grid(spec):
+    """``path=v1,v2,...`` -> (path, [values])"""
+    path, _, vals = spec.partition("=")
+    if not vals:
+        raise ValueError(f"--grid expects path=v1,v2,... (got {spec!r})")
+    return path.strip(), [_num(v.strip()) for v in vals.split(",") if v.strip()]
+
+def parse_range(spec):
+    """``path=start:stop:num`` (inclusive linspace) -> (path, [values])"""
+    path, _, rng = spec.partition("=")
+    parts = rng.split(":")
+    if len(parts) != 3:
+        raise ValueError(f"--range expects path=start:stop:num (got {spec!r})")
+    start, stop, num = float(parts[0]), float(parts[1]), int(parts[2])
+    return path.strip(), np.linspace(start, stop, num).tolist()
+
+def grid_points(axes):
+    """Cartesian product of [(path, values)] -> (paths, (S, P) float array)."""
+    paths = [p for p, _ in axes]
+    pts = np.array(list(itertools.product(*[v for _, v in axes])), dtype=float)
+    return paths, pts.reshape(-1, len(paths))
+
+# -------- workers --------
+_BASE = None
+
+def _init_worker(base):
+    global _BASE
+    _BASE = base
+
+def _run_chunk(args):
+    lo, paths, pts, mmax, series, period = args
+    # overlays, not engine copies: each point compiles straight to a Params record
+    res = batch.simulate_batch(list(overrides.ScenarioSet(_BASE, paths, pts)), mmax=mmax, record=KPI_COLUMNS)
+    kpis = {c: res.final(c) for c in KPI_COLUMNS}
+    per = None
+    if period:
+        # every KPI column is a closing snapshot: the last month of each period
+        starts, _ = analytics.month_segments(mmax, period)
+        per = {c: analytics.reduce_segments(res.columns[c], starts, "last", axis=1) for c in KPI_COLUMNS}
+    return lo, kpis, (res.columns if series else None), per
+
+def run_sweep(base, axes, mmax=simmod.MAX_MONTHS, workers=None, chunk=512, series=False, period=None):
+    """Evaluate every grid point; returns a dict of columns ready for ``save_sweep``.
+    ``period`` ("year" / "quarter") adds period:<column> closing values per period."""
+    paths, pts = grid_points(axes)
+    check_paths(base, paths)  # before any worker starts
+    S = len(pts)
+    out = {"param_names": np.array(paths)}
+    for i, p in enumerate(paths):
+        out[f"param:{p}"] = pts[:, i]
+    for c in KPI_COLUMNS:
+        out[f"kpi:{c}"] = np.zeros(S, dtype=np.int64 if c == "Units Owned" else float)
+        if series:
+            out[f"series:{c}"] = np.zeros((S, mmax), dtype=out[f"kpi:{c}"].dtype)
+    if period:
+        _, names = analytics.month_segments(mmax, period)
+        out["period_names"] = np.array(names)
+        for c in KPI_COLUMNS:
+            out[f"period:{c}"] = np.zeros((S, len(names)), dtype=out[f"kpi:{c}"].dtype)
+    jobs = [(lo, paths, pts[lo:lo+chunk], mmax, series, period) for lo in range(0, S, chunk)]
+
+    def collect(results):
+        for lo, kpis, cols, per in results:
+            hi = lo + len(kpis[KPI_COLUMNS[0]])
+            for c in KPI_COLUMNS:
+                out[f"kpi:{c}"][lo:hi] = kpis[c]
+                if series:
+                    out[f"series:{c}"][lo:hi] = cols[c]
+                if period:
+                    out[f"period:{c}"][lo:hi] = per[c]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        _init_worker(base)
+        collect(map(_run_chunk, jobs))
+    else:
+        from concurrent.futures import ProcessPoolExecutor  # only multi-worker runs pay for it
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(base,)) as pool:
+            collect(pool.map(_run_chunk, jobs))
+    out["months"] = np.array(mmax)
+    return out
+
+def save_sweep(out, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as f:
+        np.savez_compressed(f, **out)
+    return path
+
+def load_sweep(path):
+    with np.load(path) as z:
+        return {k: z[k] for k in z.files}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Parallel parameter sweep over the V2_3 engine.")
+    ap.add_argument("--engine", default=os.getenv("ENGINE_PATH", str(simmod.DEFAULT_ENGINE)))
+    ap.add_argument("--grid", action="append", default=[], help="path=v1,v2,... (repeatable)")
+    ap.add_argument("--range", action="append", default=[], dest="ranges", help="path=start:stop:num (repeatable)")
+    ap.add_argument("--months", type=int, default=int(os.getenv("MAX_MONTHS", simmod.MAX_MONTHS)))
+    ap.add_argument("--out", default=os.getenv("OUT_SWEEP", str(DEFAULT_OUT)))
+    ap.add_argument("--series", action="store_true", help="also store monthly KPI series")
+    ap.add_argument("--period", choices=sorted(analytics.PERIODS), default=None,
+                    help="also store closing KPI values per year / quarter")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--chunk", type=int, default=512)
+    a = ap.parse_args(argv)
+
+    axes = [parse_grid(g) for g in a.grid] + [parse_range(r) for r in a.ranges]
+    if not axes:
+        ap.error("give at least one --grid or --range axis")
+    base = simmod.load_eng(Path(a.engine))
+    try:
+        check_paths(base, [p for p, _ in axes])
+    except ValueError as ex:
+        ap.error(str(ex))
+    n = int(np.prod([len(v) for _, v in axes]))
+    print("ENGINE:", a.engine)
+    print(f"POINTS: {n}  MONTHS: {a.months}  WORKERS: {a.workers or os.cpu_count()}")
+    t0 = time.perf_counter()
+    out = run_sweep(base, axes, mmax=a.months, workers=a.workers, chunk=a.chunk, series=a.series, period=a.period)
+    p = save_sweep(out, a.out)
+    print(f"OUT: {p}  ({time.perf_counter()-t0:.2f}s)")
+    print("DONE")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# view_V23.py — payload shaping for the app's results view
+#
+#   idx = downsample_index([end_cash, balance], max_points=400)   # min/max per bucket
+#   df = chart_frame({"Base": end_cash, "What-if": other}, max_points=400)
+#   tbl = arrow_table(monthly_df, ["YYYY-MM", "End Cash"], year=12)
+#   yoy = rollup_frame(rows, "quarter")                            # the app's rolled-up table
+#
+# Charts get at most ~max_points rows per series: the month axis is cut into buckets and
+# each bucket keeps the months where any plotted series hits its minimum or maximum (plus
+# the first and last month), so spikes, purchases and payoff dates survive the thinning.
+# Tables go out as column-pruned Arrow tables (pyarrow, listed in requirements.txt), one
+# year at a time when drilled down.
+
+import numpy as np
+
+try:
+    from runner import analytics_V23 as analytics
+except ImportError:  # executed from inside runner/
+    import analytics_V23 as analytics
+
+CHART_POINTS = 400
+
+def downsample_index(series, max_points=CHART_POINTS):
+    """Sorted month indices (0-based) that keep every series' per-bucket min and max."""
+    series = [np.asarray(s, dtype=float) for s in series]
+    n = len(series[0]) if series else 0
+    if n <= max_points:
+        return np.arange(n)
+    buckets = max(1, (max_points - 2) // (2*len(series)))
+    w = -(-n // buckets)
+    keep = [np.array([0, n - 1])]
+    starts = np.arange(buckets)*w
+    for s in series:
+        pad = np.concatenate([s, np.full(buckets*w - n, s[-1])]).reshape(buckets, w)
+        keep.append(np.minimum(starts + pad.argmin(axis=1), n - 1))
+        keep.append(np.minimum(starts + pad.argmax(axis=1), n - 1))
+    return np.unique(np.concatenate(keep))
+
+def chart_frame(columns, max_points=CHART_POINTS, index_name="Month"):
+    """Downsampled DataFrame for st.line_chart/area_chart: {name: (T,) array} -> rows at
+    the kept months, indexed by 1-based month number."""
+    import pandas as pd
+    names = list(columns)
+    arrays = [np.asarray(columns[k], dtype=float) for k in names]
+    idx = downsample_index(arrays, max_points)
+    df = pd.DataFrame({k: a[idx] for k, a in zip(names, arrays)}, index=pd.Index(idx + 1, name=index_name))
+    return df
+
+def arrow_table(df, columns=None, year=None):
+    """pyarrow.Table of ``columns`` (all by default), optionally only rows of ``year``."""
+    import pyarrow as pa
+    if year is not None and "YYYY-MM" in df.columns:
+        df = df[df["YYYY-MM"].str.startswith(f"Y{int(year)}-")]
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def rollup_frame(rows, period="year"):
+    """analytics_V23.rollup as a DataFrame with Units Owned moved next to the labels."""
+    import pandas as pd
+    if not rows:
+        return pd.DataFrame()
+    out = pd.DataFrame(analytics.rollup(rows, period))
+    preferred = ["YYYY-MM", "UnitID", "Units Owned"]
+    return out[preferred + [c for c in out.columns if c not in preferred]]
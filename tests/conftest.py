@@ -0,0 +1,48 @@
+# tests import the runner modules as runner.<name>_V23, like app.py does
+import copy
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import runner.run_suite_full_V23 as simmod
+
+# The shipped V2_3 engine and an edge engine (zero mortgage rate, a 60-loan book filled
+# by higher savings), both with cash-out refis and reserve yields on, and "plain"
+# variants with those off (where event-driven runs jump idle spans).
+
+def shipped():
+    return json.loads(simmod.DEFAULT_ENGINE.read_text())  # no engine cache writes
+
+def edge():
+    e = shipped()
+    C = e["constants"]
+    C["debt"]["mortgageRate"] = 0.0
+    C["portfolio"]["maxLoans"] = 60
+    C["financial"]["annualSavings"] = 120000
+    return e
+
+def plain(e):
+    e = copy.deepcopy(e)
+    C = e["constants"]
+    C.pop("reserveYields", None); C.pop("savings", None)
+    C["banking"] = {k: v for k, v in C["banking"].items() if k not in ("advanceRate", "refiLTVTrigger")}
+    return e
+
+ENGINES = {"shipped": shipped, "edge": edge,
+           "shipped-plain": lambda: plain(shipped()), "edge-plain": lambda: plain(edge())}
+
+@pytest.fixture(params=sorted(ENGINES))
+def engine(request):
+    return ENGINES[request.param]()
+
+@pytest.fixture(params=["shipped-plain", "edge-plain"])
+def plain_engine(request):
+    return ENGINES[request.param]()
+
+@pytest.fixture(params=["shipped", "edge"])
+def refi_engine(request):
+    return ENGINES[request.param]()
@@ -0,0 +1,61 @@
+# test_analytics.py — period rollups and the T-* checks, whole and chunk by chunk
+#
+#   python -m pytest -q tests/test_analytics.py
+
+from decimal import Decimal
+
+import pytest
+
+import runner.run_suite_full_V23 as simmod
+import runner.analytics_V23 as analytics
+from conftest import ENGINES
+
+MONTHS = 240
+
+def _reference_rollup(rows, size):
+    # the per-row Decimal loop the rollup replaced
+    out = []
+    for i in range(0, len(rows), size):
+        seg = rows[i:i+size]
+        r = {}
+        for c in seg[0]:
+            if c in ("YYYY-MM", "UnitID"): continue
+            if c in analytics.FIRST_COLUMNS: r[c] = seg[0][c]
+            elif c in analytics.LAST_COLUMNS: r[c] = seg[-1][c]
+            else: r[c] = float(sum(Decimal(str(x[c])) for x in seg))
+        out.append(r)
+    return out
+
+@pytest.mark.parametrize("period", ["year", "quarter"])
+def test_rollup_matches_the_row_loop(engine, period):
+    rows = simmod.simulate(engine, MONTHS)
+    got = analytics.table_rows(analytics.rollup(rows, period))
+    ref = _reference_rollup(rows, analytics.PERIODS[period])
+    assert len(got) == len(ref) == MONTHS // analytics.PERIODS[period]
+    assert got[0]["YYYY-MM"] == ("Year 1" if period == "year" else "Year 1 Q1")
+    for g, r in zip(got, ref):
+        assert {c: g[c] for c in r} == r
+    # the columnar result rolls up to the same table
+    assert analytics.table_rows(analytics.rollup(simmod.simulate(engine, MONTHS, columnar=True), period)) == got
+
+def test_chunked_checks_match_one_pass(engine):
+    rows = simmod.simulate(engine, MONTHS)
+    rows[100] = {**rows[100], "End Cash": rows[100]["End Cash"] + 5}  # one T-CASH-1 violation
+    st = analytics.InvariantState()
+    for i in range(0, MONTHS, 37):
+        st.add(rows[i:i+37])
+    whole = analytics.check_invariants(rows)
+    assert st.report() == whole
+    assert whole["T-CASH-1"]["months"] == [rows[100]["YYYY-MM"]] and whole["T-CASH-1"]["n"] == 1
+
+def test_ds_months_stay_bounded():
+    # at a zero rate a prepay ends the schedule: DS stays 0 after every purchase
+    rows = simmod.simulate(ENGINES["edge-plain"](), 1200)
+    st = analytics.InvariantState()
+    for i in range(0, len(rows), 120):
+        st.add(rows[i:i+120])
+    rep = st.report()["T-DS-1"]
+    assert not rep["ok"] and rep["n"] > 1000
+    assert len(rep["months"]) == analytics.DS_MONTHS_KEPT
+    with pytest.raises(AssertionError, match="T-DS-1"):
+        analytics.assert_report(st.report())
@@ -0,0 +1,25 @@
+# test_batch.py — the vectorized batch engine against one simulate() per scenario
+#
+#   python -m pytest -q tests/test_batch.py
+
+import numpy as np
+
+import runner.run_suite_full_V23 as simmod
+import runner.batch_V23 as batch
+from conftest import ENGINES
+
+MONTHS = 360
+
+def _same_columns(a, b):
+    assert set(a) == set(b)
+    for c in a:
+        np.testing.assert_array_equal(np.asarray(a[c]), np.asarray(b[c]), err_msg=c)
+
+def test_batch_matches_scalar(engine):
+    other = ENGINES["shipped"]()
+    res = batch.simulate_batch([engine, other, engine], MONTHS)
+    ref = simmod.simulate(engine, MONTHS, columnar=True)
+    for i in (0, 2):
+        _same_columns({c: res.columns[c][i] for c in res.columns}, ref.columns)
+        assert res.rows(i) == simmod.simulate(engine, MONTHS)
+    assert res.rows(1) == simmod.simulate(other, MONTHS)
@@ -0,0 +1,63 @@
+# test_branch.py — checkpoints resume bit for bit; forks share their prefixes
+#
+#   python -m pytest -q tests/test_branch.py
+
+import copy
+import json
+
+import pytest
+
+import runner.run_suite_full_V23 as simmod
+import runner.branch_V23 as branch
+from runner.sweep_V23 import set_path
+from conftest import shipped
+
+MONTHS = 240
+RATE = {"constants.debt.mortgageRate": 0.085}
+SAV = {"constants.financial.annualSavings": 90000}
+
+@pytest.mark.parametrize("month", [1, 97, 200])
+def test_checkpoint_resume_matches_straight_run(engine, month):
+    straight = simmod.simulate(engine, MONTHS)
+    head, states = simmod.checkpoint(engine, month)
+    st = simmod.SimState.from_dict(json.loads(json.dumps(states[month].to_dict())))
+    assert head + simmod.simulate(engine, MONTHS, state=st) == straight
+
+def _straight(forks, mmax=MONTHS):
+    # each segment on a deep-copied engine, resumed from the state going into its fork
+    rows, st, e = [], None, shipped()
+    bounds = [1] + [at for at, _ in forks] + [mmax + 1]
+    for j in range(len(bounds) - 1):
+        if j:
+            e = copy.deepcopy(e)
+            for p, v in forks[j - 1][1].items(): set_path(e, p, v)
+        hi = bounds[j + 1] - 1; got = {}
+        raw = simmod._iter_raw(e, hi, state=st, snap_at={hi}, on_state=lambda s: got.setdefault("s", s))
+        rows += list(simmod._iter_simulate_rows(raw))
+        st = got.get("s")
+    return rows
+
+def test_forks_match_straight_runs_and_share_prefixes():
+    cache = branch.ForkCache()
+    base = shipped()
+    assert cache.run(base, [(85, RATE)], MONTHS) == _straight([(85, RATE)])
+    assert cache.months_simulated == MONTHS
+    # the same prefix forked again at 150: resumes from the state kept at month 144
+    assert cache.run(base, [(85, RATE), (150, SAV)], MONTHS) == _straight([(85, RATE), (150, SAV)])
+    assert cache.months_simulated == MONTHS + (MONTHS - 144)
+    # the first branch again, after its prefix list was read by the second
+    assert cache.run(base, [(85, RATE)], MONTHS) == _straight([(85, RATE)])
+    assert cache.run(base, [], MONTHS) == simmod.simulate(base, MONTHS)
+
+def test_returned_rows_do_not_alias_the_cache():
+    cache = branch.ForkCache()
+    rows = cache.run(shipped(), [(85, RATE)], MONTHS)
+    rows.clear()
+    assert cache.run(shipped(), [(85, RATE)], MONTHS) == _straight([(85, RATE)])
+
+def test_eviction_drops_a_prefix_with_its_last_state():
+    cache = branch.ForkCache(max_states=4)
+    cache.run(shipped(), [(85, RATE)], MONTHS)
+    assert len(cache._states) == 4
+    assert set(cache._rows) == {pid for pid, _ in cache._states}
+    assert max(len(r) for r in cache._rows.values()) == MONTHS
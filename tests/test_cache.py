@@ -0,0 +1,64 @@
+# test_cache.py — result cache hits, LRU eviction and the filled manifest
+#
+#   python -m pytest -q tests/test_cache.py
+
+import json
+import os
+
+import pytest
+
+import runner.run_suite_full_V23 as simmod
+import runner.cache_V23 as rcache
+from conftest import shipped
+
+def _rows(n):
+    return [{"YYYY-MM": f"Y1-{i+1:02d}", "End Cash": float(i)} for i in range(n)]
+
+def test_put_get_round_trip(tmp_path):
+    cache = rcache.ResultCache(tmp_path)
+    assert cache.get("ab" * 32) is None
+    cache.put("ab" * 32, _rows(5), meta={"tests": {"T-CASH-1": "PASS"}})
+    hit = cache.get("ab" * 32)
+    assert hit["meta"] == {"tests": {"T-CASH-1": "PASS"}}
+    assert hit["rows"] == _rows(5)
+
+def test_rows_are_parsed_only_when_read(tmp_path):
+    cache = rcache.ResultCache(tmp_path)
+    d = cache.put("cd" * 32, _rows(3), meta={"months": 3})
+    (d / "rows.json").write_text("not json")
+    hit = cache.get("cd" * 32)
+    assert hit["meta"]["months"] == 3 and hit["dir"] == d
+    with pytest.raises(ValueError):
+        hit["rows"]
+
+def test_lru_eviction_keeps_recent_hits(tmp_path):
+    cache = rcache.ResultCache(tmp_path, max_bytes=10**9)
+    keys = [f"{i:02d}" * 32 for i in range(4)]
+    for i, k in enumerate(keys):
+        d = cache.put(k, _rows(200))
+        os.utime(d, (1000 + i, 1000 + i))  # oldest first
+    size = sum(s for _, s, _ in cache.entries()) // 4
+    assert cache.get(keys[0]) is not None  # a hit makes the oldest entry the newest
+    cache.max_bytes = 2*size
+    cache.evict()
+    assert [cache.get(k) is not None for k in keys] == [True, False, False, True]
+
+def test_cached_simulate_and_key(tmp_path):
+    cache = rcache.ResultCache(tmp_path)
+    e = shipped()
+    rows, hit = rcache.cached_simulate(e, 120, cache=cache)
+    assert not hit and rows == simmod.simulate(e, 120)
+    again, hit = rcache.cached_simulate(e, 120, cache=cache)
+    assert hit and again == rows
+    assert rcache.cache_key(e, 120) != rcache.cache_key(e, 121) != rcache.cache_key(e, 120, money="cents")
+    e["constants"]["debt"]["mortgageRate"] += 0.001
+    assert rcache.cache_key(e, 120) != rcache.cache_key(shipped(), 120)
+
+def test_manifest_lists_every_runner_module(tmp_path):
+    out = tmp_path / "monthly.csv"; out.write_text("a,b\n1,2\n")
+    mp = rcache.write_manifest(tmp_path / "m.json", simmod.DEFAULT_ENGINE, {"monthly_csv": out}, {"T-CASH-1": "PASS"})
+    m = json.loads(mp.read_text())
+    assert m["engine"]["sha256"] == rcache.sha256_file(simmod.DEFAULT_ENGINE)
+    assert [x["path"] for x in m["runner"]["modules"]] == list(rcache.RUNNER_MODULES)
+    assert m["outputs"]["monthly_csv"]["sha256"] == rcache.sha256_file(out)
+    assert m["tests"] == [{"id": "T-CASH-1", "result": "PASS"}]
@@ -0,0 +1,29 @@
+# test_event_driven.py — event_driven jumps idle months without changing a row
+#
+#   python -m pytest -q tests/test_event_driven.py
+
+import pytest
+
+import runner.run_suite_full_V23 as simmod
+from conftest import plain, shipped
+
+MONTHS = 360
+
+def test_event_driven_matches_monthly(plain_engine):
+    assert simmod.simulate(plain_engine, MONTHS, event_driven=True) == simmod.simulate(plain_engine, MONTHS)
+
+def test_event_driven_with_a_book_that_buys_most_months():
+    # debt-free (savings clear every loan) and buying nearly every month: few idle
+    # months, so most span attempts are skipped or come back empty
+    e = plain(shipped())
+    e["constants"]["portfolio"]["maxLoans"] = 1000
+    e["constants"]["financial"]["annualSavings"] = 5e6
+    rows = simmod.simulate(e, 600)
+    assert rows[-1]["Units Owned"] > 300
+    assert simmod.simulate(e, 600, event_driven=True) == rows
+
+def test_event_driven_is_ignored_with_refis_or_yields(refi_engine):
+    assert not simmod.engine_params(refi_engine).idle_spans_on()
+    with pytest.warns(UserWarning, match="event_driven ignored"):
+        rows = simmod.simulate(refi_engine, MONTHS, event_driven=True)
+    assert rows == simmod.simulate(refi_engine, MONTHS)
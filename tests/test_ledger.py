@@ -0,0 +1,68 @@
+# test_ledger.py — the per-unit ledger file: totals, queries and scenarios
+#
+#   python -m pytest -q tests/test_ledger.py
+
+import numpy as np
+import pytest
+
+import runner.run_suite_full_V23 as simmod
+import runner.ledger_V23 as ledger
+from conftest import ENGINES
+
+MONTHS = 240
+# ledger column -> the monthly TOTAL column it sums to
+TOTALS = {"Gross Revenue": "Gross Revenue", "Insurance": "Insurance", "Debt Service": "Debt Service (Total)",
+          "Scheduled Principal": "Scheduled Principal", "Interest Portion": "Interest Portion",
+          "Feeder Prepay": "Feeder Prepay", "New Loan Principal": "New Loan Principal",
+          "Refi Draw": "Refi Draw", "Loan Balance (End)": "Loan Balance (End)"}
+
+@pytest.fixture(scope="module")
+def written(tmp_path_factory):
+    # two scenarios in small chunks, so queries have chunks to skip
+    path = tmp_path_factory.mktemp("ledger") / "units.obl"
+    w = ledger.LedgerWriter(path, chunk_rows=256, meta={"months": MONTHS})
+    rows = {}
+    for name in ("shipped", "edge"):
+        w.scenario(name)
+        rows[name] = simmod.simulate(ENGINES[name](), MONTHS, ledger=w)
+    w.close()
+    return ledger.LedgerReader(path), rows
+
+def test_ledger_leaves_the_rows_alone(written):
+    _, rows = written
+    for name in rows:
+        assert rows[name] == simmod.simulate(ENGINES[name](), MONTHS)
+
+def test_units_sum_to_the_monthly_totals(written):
+    r, rows = written
+    assert r.meta == {"months": MONTHS} and r.scenarios == ["shipped", "edge"] and len(r.chunks) > 2
+    for name, rs in rows.items():
+        d = r.read(scenario=name)
+        assert "scenario" not in d
+        assert np.bincount(d["month"], minlength=MONTHS + 1)[1:].tolist() == [x["Units Owned"] for x in rs]
+        for lc, rc in TOTALS.items():
+            tot = np.zeros(MONTHS + 1); np.add.at(tot, d["month"], d[lc])
+            np.testing.assert_allclose(np.round(tot[1:], 2), [x[rc] for x in rs], atol=0.011, err_msg=lc)
+
+def test_query_filters_match_a_full_read(written):
+    r, _ = written
+    full = r.read(scenario=0)
+    q = r.read(units=["U3"], months=(100, 140), columns=["Interest Portion"], scenario="shipped")
+    m = (full["unit"] == r.units.index("U3")) & (full["month"] >= 100) & (full["month"] <= 140)
+    assert set(q) == {"month", "unit", "Interest Portion"}
+    np.testing.assert_array_equal(q["month"], full["month"][m])
+    np.testing.assert_array_equal(q["Interest Portion"], full["Interest Portion"][m])
+    both = r.read(columns=[], months=(1, 12))
+    assert both["scenario"].tolist() == sorted(both["scenario"].tolist())
+    assert len(r.read(units=["U999"])["month"]) == 0
+    with pytest.raises(KeyError):
+        r.read(columns=["No Such Column"])
+
+def test_abort_leaves_no_file(tmp_path):
+    w = ledger.LedgerWriter(tmp_path / "x.obl")
+    w.month(1, ["U1"], {c: [1.0] for c in ledger.LEDGER_COLUMNS})
+    w.abort()
+    assert list(tmp_path.iterdir()) == []
+    (tmp_path / "bad.obl").write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        ledger.LedgerReader(tmp_path / "bad.obl")
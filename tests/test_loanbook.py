@@ -0,0 +1,56 @@
+# test_loanbook.py — LoanBook against the per-unit Loan objects it replaced
+#
+#   python -m pytest -q tests/test_loanbook.py
+
+import numpy as np
+import pytest
+
+import runner.run_suite_full_V23 as simmod
+
+def _months(n_loans, months=360):
+    # buy a loan every month up to n_loans, accrue, and prepay the largest balance; the
+    # book and a list of Loan objects must agree bit for bit every month
+    book = simmod.LoanBook(4); loans = []
+    for t in range(1, months + 1):
+        if len(loans) < n_loans:
+            p, rate = 200000.0 + 137.5*t, 0.05 + 0.0001*(t % 7)
+            book.add(f"U{t}", p, p*0.75, rate, 30, t); loans.append(simmod.Loan(f"U{t}", p*0.75, rate, 30))
+        tot = [0.0, 0.0, 0.0]
+        for L in loans:
+            for k, v in enumerate(L.accrue()): tot[k] += v
+        assert book.accrue() == tuple(tot)
+        i = max(range(len(loans)), key=lambda j: loans[j].balance)
+        assert book.largest() == i
+        amount = 1500.0 + 10*t
+        assert book.prepay(i, amount) == loans[i].prepay(amount)
+        assert book.total_balance() == sum(L.balance for L in loans)
+        if t % 50 == 0:  # reading the arrays mid-run sees every change so far
+            assert book.balance[:book.n].tolist() == [L.balance for L in loans]
+            assert book.n_left[:book.n].tolist() == [L.n_left for L in loans]
+    return book, loans
+
+@pytest.mark.parametrize("n_loans", [7, simmod.SCALAR_BOOK_MAX, 120])
+def test_book_matches_loans(n_loans):
+    book, loans = _months(n_loans)
+    assert book.ids == [L.unit_id for L in loans]
+    assert book.balance[:book.n].tolist() == [L.balance for L in loans]
+    assert book.n_left[:book.n].tolist() == [L.n_left for L in loans]
+
+def test_array_writes_reach_the_small_path():
+    book = simmod.LoanBook(8)
+    for j in range(3):
+        book.add(f"U{j+1}", 300000.0, 225000.0, 0.06, 30)
+    book.accrue()
+    book.balance[1] = 1000.0  # e.g. SimState.loan_book / a refi writing the arrays
+    assert book.largest() == 0
+    assert book.prepay(1, 5000.0) == 1000.0
+    assert book.balance[1] == 0.0 and book.n_left[1] == 0
+
+def test_simstate_round_trip_keeps_small_book():
+    e = simmod.load_eng(simmod.DEFAULT_ENGINE)
+    rows, states = simmod.checkpoint(e, 120)
+    book = states[120].loan_book(7)
+    again = simmod.SimState.capture(121, 11, 1, states[120].HOA_Y, states[120].cash,
+                                    states[120].next_unit_id, book)
+    assert again.units == states[120].units
+    assert np.isfinite(book.total_balance())
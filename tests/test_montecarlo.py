@@ -0,0 +1,59 @@
+# test_montecarlo.py — quantile sketches, seeded paths and percentile bands
+#
+#   python -m pytest -q tests/test_montecarlo.py
+
+import math
+
+import numpy as np
+import pytest
+
+import runner.montecarlo_V23 as mc
+from conftest import shipped
+
+SPEC = {"adr": {"model": "gbm", "drift": 0.02, "vol": 0.10},
+        "occupancy": {"model": "ou", "reversion": 2.0, "vol": 0.06, "min": 0.30, "max": 0.95}}
+
+def test_sketch_merge_tracks_exact_quantiles():
+    rng = np.random.default_rng(3)
+    X = rng.lognormal(size=(20000, 4))
+    sk = mc.QuantileSketch(4, k=201)
+    for i in range(0, len(X), 256):
+        sk.add(X[i:i+256])
+    assert sk.n == len(X)
+    np.testing.assert_allclose(sk.mean(), X.mean(axis=0))
+    for p in (0.05, 0.5, 0.95):
+        got = sk.quantile(p)
+        # within the sketch's rank resolution (~1/k) of the exact quantile
+        lo, hi = np.quantile(X, max(p - 0.01, 0), axis=0), np.quantile(X, min(p + 0.01, 1), axis=0)
+        assert np.all((lo <= got) & (got <= hi))
+
+def test_nearest_rank_returns_sample_values():
+    X = np.repeat(np.arange(5.0), 200)[:, None] + np.zeros((1, 3))
+    sk = mc.QuantileSketch(3, k=101).add(X)
+    for p in (0.05, 0.3, 0.55, 0.95):
+        v = sk.quantile(p, nearest=True)
+        assert np.all(v == np.floor(v))
+        assert v[0] == np.quantile(X[:, 0], p, method="nearest")
+
+def test_ou_clips_every_month():
+    # a huge upward shock: the next month reverts from the cap, not from above it
+    z = np.zeros((1, 4)); z[0, 1] = 50.0
+    cfg = {"model": "ou", "reversion": 12.0, "vol": 0.12, "mean": 0.5, "min": 0.3, "max": 0.95}
+    x = mc._process(cfg, 0.5, z)
+    assert x[0, 1] == 0.95
+    assert x[0, 2] == pytest.approx(0.95 + (0.5 - 0.95))  # kappa = 1/month: straight back to the mean
+
+def test_bands_independent_of_chunking():
+    base = shipped()
+    a = mc.bands(mc.run_montecarlo(base, 700, mmax=120, seed=5, spec=SPEC, workers=1, chunk=256))
+    b = mc.bands(mc.run_montecarlo(base, 700, mmax=120, seed=5, spec=SPEC, workers=1, chunk=4096))
+    for c in mc.KPI_COLUMNS:
+        for s in a[c]:
+            np.testing.assert_array_equal(a[c][s], b[c][s], err_msg=f"{c} {s}")
+
+def test_unit_bands_are_whole_units():
+    bd = mc.bands(mc.run_montecarlo(shipped(), 500, mmax=120, seed=1, spec=SPEC, workers=1))
+    for s, v in bd["Units Owned"].items():
+        if s != "Mean":
+            assert np.all(v == np.floor(v)), s
+    assert not math.isnan(bd["Units Owned"]["Mean"][-1])
@@ -0,0 +1,46 @@
+# test_overrides.py — layered overrides: strict paths, shared base, compiled Params
+#
+#   python -m pytest -q tests/test_overrides.py
+
+import copy
+
+import numpy as np
+import pytest
+
+import runner.run_suite_full_V23 as simmod
+import runner.cache_V23 as rcache
+import runner.overrides_V23 as overrides
+from runner.sweep_V23 import set_path
+from conftest import shipped
+
+RATE = "constants.debt.mortgageRate"
+ADR = "constants.operations.adrBaseline2BR"
+LOANS = "constants.portfolio.maxLoans"
+
+def test_unknown_paths_are_rejected():
+    base = shipped()
+    with pytest.raises(ValueError, match="constants.debt.rateTypo"):
+        overrides.Overlay(base, {"constants.debt.rateTypo": 0.05})
+    with pytest.raises(ValueError, match="nope"):
+        overrides.Overlay(base).derive({"nope": 1})
+    with pytest.raises(ValueError, match="rateTypo"):
+        overrides.ScenarioSet(base, ["constants.debt.rateTypo"], [0.05])
+    with pytest.raises(ValueError):
+        overrides.check_path(base, "constants.debt.mortgageRate.x")
+
+def test_overlay_matches_a_deep_copy_and_leaves_the_base_alone():
+    base = shipped(); before = copy.deepcopy(base)
+    hi = overrides.Overlay(base, {RATE: 0.085}).derive({ADR: 300, RATE: 0.09})
+    e = copy.deepcopy(base); set_path(e, RATE, 0.09); set_path(e, ADR, 300)
+    assert hi.materialize() == e and base == before
+    assert list(hi.deltas()) == [ADR, RATE]  # the re-set path applies last
+    assert hi.get(RATE) == 0.09 and hi.get("nope", "d") == "d"
+    assert hi.materialize()["calendar"] is base["calendar"]  # untouched sections are shared
+    assert hi.engine_hash() == rcache.engine_hash(e)
+    assert simmod.simulate(hi, 120) == simmod.simulate(e, 120)
+
+def test_scenario_set_keeps_integer_paths_integral():
+    S = overrides.ScenarioSet(shipped(), [LOANS, RATE], np.array([[3, 0.05], [9, 0.07]]))
+    assert len(S) == 2 and S.nbytes() == 32
+    assert S.delta(1) == {LOANS: 9, RATE: 0.07} and type(S.delta(1)[LOANS]) is int
+    assert [o.params().maxLoans for o in S] == [3, 9]
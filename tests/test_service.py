@@ -0,0 +1,78 @@
+# test_service.py — job intake, in-flight dedupe, streamed rows and error events
+#
+#   python -m pytest -q tests/test_service.py
+
+import asyncio
+
+import pytest
+
+import runner.run_suite_full_V23 as simmod
+import runner.overrides_V23 as overrides
+import runner.service_V23 as service
+
+RATE = {"constants.debt.mortgageRate": 0.071}
+
+@pytest.fixture(autouse=True)
+def _cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("OB_STR_CACHE_DIR", str(tmp_path))  # workers fork after this
+
+def _run(*batches, workers=2):
+    # A fresh service living in one event loop; the jobs of each batch run concurrently.
+    # Returns (service, [{job id: events}] per batch); each event is paired with whether
+    # any job was still running when it was emitted.
+    out = []
+
+    async def main():
+        svc = service.Service(workers=workers)
+        try:
+            for jobs in batches:
+                got = {}
+
+                async def one(job):
+                    evs = got.setdefault(job.get("id"), [])
+                    async def emit(ev):
+                        evs.append((ev, bool(svc._inflight)))
+                    await svc.events(job, emit)
+                await asyncio.gather(*(one(j) for j in jobs))
+                out.append(got)
+        finally:
+            svc.close()
+        return svc
+    return asyncio.run(main()), out
+
+def _rows(evs):
+    return [r for ev, _ in evs if ev["event"] == "rows" for r in ev["rows"]]
+
+def test_identical_jobs_run_once_and_both_get_every_row():
+    svc, (out,) = _run([{"id": "a", "set": RATE, "months": 600}, {"id": "b", "set": RATE, "months": 600}])
+    expected = simmod.simulate(overrides.Overlay(svc._engine(None), RATE).materialize(), 600)
+    for jid in ("a", "b"):
+        assert _rows(out[jid]) == expected
+        done = out[jid][-1][0]
+        assert done["event"] == "done" and done["months"] == 600
+        assert done["summary"]["End Cash"] == expected[-1]["End Cash"]
+    assert sorted(ev["shared"] for ev, _ in (out["a"][0], out["b"][0])) == [False, True]
+    assert svc.stats["deduped"] == 1 and svc.stats["completed"] == 1
+    assert not svc._streams
+
+def test_rows_arrive_before_the_job_finishes():
+    job = {"id": "long", "months": 6000}
+    _, (first, repeat) = _run([job], [job])
+    evs, again = first["long"], repeat["long"]
+    running = [still for ev, still in evs if ev["event"] == "rows"]
+    assert len(running) == 6000 // service.ROW_BATCH and running[0]
+    # a repeat is a cache hit and streams the same rows
+    assert again[-1][0]["cached"] and _rows(again) == _rows(evs)
+
+@pytest.mark.parametrize("job, message", [
+    ({"set": {"constants.nope": 1}}, "unknown engine path"),
+    ({"months": 0}, "months must be"),
+    ({"money": "gold"}, "money must be"),
+    ({"engine": "engines/missing.json"}, "engine not found"),
+])
+def test_bad_jobs_fail_with_an_error_event(job, message):
+    svc, (out,) = _run([{"id": "x", **job}], workers=1)
+    evs = out["x"]
+    assert [ev["event"] for ev, _ in evs] == ["error"]
+    assert message in evs[0][0]["error"]
+    assert svc.stats["submitted"] == 0
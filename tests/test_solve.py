@@ -0,0 +1,51 @@
+# test_solve.py — goal seek: targets, bracketing and the CLI's error paths
+#
+#   python -m pytest -q tests/test_solve.py
+
+import pytest
+
+import runner.run_suite_full_V23 as simmod
+import runner.overrides_V23 as overrides
+import runner.solve_V23 as solve
+from conftest import shipped
+
+ADR = "constants.operations.adrBaseline2BR"
+SAVINGS = "constants.financial.annualSavings"
+
+def test_parse_target():
+    assert str(solve.parse_target("units >= 3 @ 10")) == "units>=3@10"
+    assert str(solve.parse_target("debtfree:2@20")) == "debtfree:2@20"
+    assert str(solve.parse_target("End Cash@120=250000")) == "End Cash@120=250000"
+    with pytest.raises(ValueError):
+        solve.parse_target("No Such Column@12=1")
+
+def test_boolean_target_returns_the_feasible_edge():
+    base = shipped(); target = solve.parse_target("units>=3@10")
+    res = solve.solve(base, SAVINGS, target, 10000, 200000, tol=1)
+    assert res["status"] == "bracketed"
+    edge = res["value"]
+    assert solve.run_trial(overrides.Overlay(base, {SAVINGS: edge}), target)[0] is True
+    assert solve.run_trial(overrides.Overlay(base, {SAVINGS: edge - 1}), target)[0] is False
+
+def test_not_bracketed_reports_which_side():
+    res = solve.solve(shipped(), SAVINGS, solve.parse_target("units>=3@10"), 150000, 200000)
+    assert res["status"] == "not bracketed" and res["value"] is None and res["feasible"] is True
+
+def test_numeric_target_hits_the_value():
+    target = solve.parse_target("Gross Revenue@24=4000")
+    for method in ("secant", "bisect"):
+        res = solve.solve(shipped(), ADR, target, 150, 250, method=method)
+        assert res["status"] == "bracketed"
+        row = simmod.simulate(overrides.Overlay(shipped(), {ADR: res["value"]}), 24)[-1]
+        assert row["Gross Revenue"] == pytest.approx(4000, abs=0.01)
+
+def test_running_out_of_iterations_is_not_bracketed():
+    # Ops Net jumps where a purchase moves by a month; 3 trials cannot converge
+    res = solve.solve(shipped(), ADR, solve.parse_target("Ops Net@120=500"), 150, 500, max_iter=3)
+    assert res["status"] == "max_iter" and res["value"] is not None
+
+def test_cli_rejects_an_unknown_param(capsys):
+    with pytest.raises(SystemExit) as ex:
+        solve.main(["--param", "constants.debt.nope", "--lo", "0", "--hi", "1", "--target", "units>=3@10"])
+    assert ex.value.code == 2
+    assert "constants.debt.nope" in capsys.readouterr().err
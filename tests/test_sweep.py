@@ -0,0 +1,54 @@
+# test_sweep.py — dotted engine paths, axis parsing and the sweep against simulate()
+#
+#   python -m pytest -q tests/test_sweep.py
+
+import numpy as np
+import pytest
+
+import runner.run_suite_full_V23 as simmod
+import runner.sweep_V23 as sweep
+from conftest import shipped
+
+RATE = "constants.debt.mortgageRate"
+ADR = "constants.operations.adrBaseline2BR"
+MONTHS = 120
+
+def test_set_path_only_sets_existing_keys():
+    e = shipped()
+    sweep.set_path(e, RATE, 0.05)
+    assert sweep.get_path(e, RATE) == 0.05
+    with pytest.raises(ValueError, match="constants.debt.rateTypo"):
+        sweep.set_path(e, "constants.debt.rateTypo", 0.05)
+    with pytest.raises(ValueError, match="nope"):
+        sweep.check_paths(e, [RATE, "nope.x"])
+    assert sweep.get_path(e, "nope.x", "missing") == "missing"
+
+def test_axis_parsing():
+    assert sweep.parse_grid(f"{RATE}=0.05, 0.07") == (RATE, [0.05, 0.07])
+    assert sweep.parse_grid("constants.portfolio.maxLoans=3,7") == ("constants.portfolio.maxLoans", [3, 7])
+    assert sweep.parse_range(f"{ADR}=200:300:3") == (ADR, [200.0, 250.0, 300.0])
+    for bad in (f"{RATE}", f"{ADR}=200:300"):
+        with pytest.raises(ValueError):
+            (sweep.parse_grid if ":" not in bad else sweep.parse_range)(bad)
+    paths, pts = sweep.grid_points([(RATE, [0.05, 0.07]), (ADR, [200.0, 250.0, 300.0])])
+    assert paths == [RATE, ADR] and pts.shape == (6, 2) and list(pts[1]) == [0.05, 250.0]
+
+def test_sweep_matches_simulate_per_point(tmp_path):
+    base = shipped()
+    axes = [(RATE, [0.05, 0.0685]), (ADR, [220.0, 300.0])]
+    out = sweep.run_sweep(base, axes, mmax=MONTHS, workers=1, chunk=3, series=True, period="year")
+    for i in range(4):
+        e = shipped()
+        sweep.set_path(e, RATE, out[f"param:{RATE}"][i]); sweep.set_path(e, ADR, out[f"param:{ADR}"][i])
+        cols = simmod.simulate(e, MONTHS, columnar=True).columns  # the .npz stays unrounded
+        for c in sweep.KPI_COLUMNS:
+            assert out[f"kpi:{c}"][i] == cols[c][-1]
+            np.testing.assert_array_equal(out[f"series:{c}"][i], cols[c])
+            np.testing.assert_array_equal(out[f"period:{c}"][i], cols[c][11::12])
+    back = sweep.load_sweep(sweep.save_sweep(out, tmp_path / "s.npz"))
+    assert set(back) == set(out)
+    np.testing.assert_array_equal(back["kpi:End Cash"], out["kpi:End Cash"])
+
+def test_sweep_rejects_unknown_paths_before_running():
+    with pytest.raises(ValueError, match="unknown engine path"):
+        sweep.run_sweep(shipped(), [("constants.debt.rateTypo", [0.05])], mmax=12, workers=1)